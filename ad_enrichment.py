@@ -0,0 +1,139 @@
+import logging
+import re
+import asyncio
+import discord
+from cache import TTLCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# roblox.com/games/<id>, /catalog/<id>, /groups/<id> (and the newer /communities/<id>)
+ROBLOX_LINK_RE = re.compile(
+    r"(?:https?://)?(?:www\.|web\.)?roblox\.com/(games|catalog|groups|communities)/(\d+)",
+    re.IGNORECASE,
+)
+LINK_KINDS = {"games": "game", "catalog": "catalog", "groups": "group", "communities": "group"}
+MAX_PREVIEWS = 5
+
+
+def extract_roblox_links(text):
+    """Return ordered, de-duplicated (kind, id) pairs for every Roblox link in `text`"""
+    seen = {}
+    for path, raw_id in ROBLOX_LINK_RE.findall(text):
+        seen.setdefault((LINK_KINDS[path.lower()], int(raw_id)), None)
+    return list(seen)
+
+
+class AdEnricher:
+    """Resolves Roblox links in ad text to game/catalog/group info.
+
+    All uncached IDs of a kind are resolved together: games in one
+    multiget-place-details call, catalog items in one items/details call and
+    groups concurrently. Results are cached with a TTL, and lookups already in
+    flight are shared, so a game linked from many ads is fetched once. IDs the
+    lookup didn't return are only cached for MISS_TTL: the fetchers log and
+    skip Roblox errors, so a miss may be an outage rather than a deleted game.
+    Nothing is cached when a fetch raises.
+    """
+
+    MISS_TTL = 60
+
+    def __init__(self, roblox_api, ttl=Config.ROBLOX_INFO_CACHE_TTL):
+        self.roblox_api = roblox_api
+        self.cache = TTLCache(ttl)  # (kind, id): info | None
+        self._inflight = {}  # (kind, id): Future
+        self._fetchers = {
+            "game": roblox_api.get_games_info,
+            "catalog": roblox_api.get_ugc_items_info,
+            "group": roblox_api.get_groups_info,
+        }
+
+    async def _fetch_kind(self, kind, futures):
+        ids = list(futures)
+        try:
+            try:
+                found = await self._fetchers[kind](ids)
+                failed = False
+            except Exception as e:
+                logger.warning("Failed to resolve %s ids %s: %s", kind, ids, e)
+                found, failed = {}, True
+            for id_, future in futures.items():
+                info = found.get(id_)
+                if info is not None:
+                    self.cache.set((kind, id_), info)
+                elif not failed:
+                    self.cache.set((kind, id_), None, ttl=self.MISS_TTL)
+                self._inflight.pop((kind, id_), None)
+                future.set_result(info)
+        finally:
+            self._abandon(kind, futures)
+
+    def _abandon(self, kind, futures):
+        """Release lookups left unresolved by a cancelled resolve(); their waiters treat them as misses"""
+        for id_, future in futures.items():
+            if not future.done():
+                self._inflight.pop((kind, id_), None)
+                future.cancel()
+
+    async def resolve(self, links):
+        """Resolve (kind, id) pairs; returns infos in link order, skipping unresolvable ones"""
+        loop = asyncio.get_running_loop()
+        waiting = []
+        missing = {}  # kind: {id: Future}
+        for key in links:
+            if key in self.cache:
+                continue
+            if key in self._inflight:
+                waiting.append(self._inflight[key])
+            else:
+                # Register before awaiting so concurrent resolves share this lookup
+                future = self._inflight[key] = loop.create_future()
+                missing.setdefault(key[0], {})[key[1]] = future
+
+        try:
+            await asyncio.gather(*(self._fetch_kind(kind, futures) for kind, futures in missing.items()))
+        finally:
+            # A fetch cancelled before it started never reaches its own cleanup
+            for kind, futures in missing.items():
+                self._abandon(kind, futures)
+        if waiting:
+            # wait() rather than gather(): a lookup cancelled by its owner is just a miss here
+            await asyncio.wait(waiting)
+        infos = [self.cache.get(key) for key in links]
+        return [info for info in infos if info]
+
+    async def enrich(self, text):
+        links = extract_roblox_links(text)[:MAX_PREVIEWS]
+        if not links:
+            return []
+        return await self.resolve(links)
+
+
+def _shorten(text, limit):
+    text = (text or "").strip()
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def build_preview_embeds(infos):
+    """Rich preview embeds for resolved Roblox links"""
+    colors = {"game": discord.Color.green(), "catalog": discord.Color.purple(), "group": discord.Color.blue()}
+    labels = {"game": "🎮 Game", "catalog": "🛍️ Catalog Item", "group": "👥 Group"}
+    embeds = []
+    for info in infos[:MAX_PREVIEWS]:
+        embed = discord.Embed(
+            title=_shorten(info.get("name") or info.get("title"), 256),
+            url=info.get("url"),
+            description=_shorten(info.get("description"), 300) or None,
+            color=colors.get(info.get("type"), discord.Color.default()),
+        )
+        embed.set_author(name=labels.get(info.get("type"), "Roblox"))
+        embed.add_field(name="Creator", value=_shorten(str(info.get("creator") or "Unknown"), 1024), inline=True)
+        if info.get("type") == "catalog" and info.get("price") is not None:
+            embed.add_field(name="Price", value=f"R$ {info['price']}", inline=True)
+        if info.get("type") == "group" and info.get("members") is not None:
+            embed.add_field(name="Members", value=f"{info['members']:,}", inline=True)
+        thumbnail = info.get("thumbnail_url")
+        if isinstance(thumbnail, str) and thumbnail.startswith("http"):
+            embed.set_thumbnail(url=thumbnail)
+        embeds.append(embed)
+    return embeds
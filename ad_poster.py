@@ -0,0 +1,215 @@
+import logging
+import os
+import json
+import time
+import asyncio
+import hashlib
+import discord
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def ad_text_hash(text):
+    """Hash of the ad text with case and whitespace normalised, used for dedupe"""
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class AdPostScheduler:
+    """Durable, rate-limited queue for posting approved advertisements.
+
+    Approved ads are appended to a JSON-backed queue and posted by a background
+    task, at most one per `spacing` seconds per channel. Advertisers take turns
+    (the least recently served advertiser goes next), failed posts are retried
+    with exponential backoff, and identical ad text is rejected while it is
+    queued or within the dedupe window after posting. Entries stay in the file
+    until their post succeeds, so a restart resumes where it left off.
+    """
+
+    def __init__(self, bot, resolve_channel, on_posted=None, on_failed=None,
+                 path=Config.AD_POST_QUEUE_FILE,
+                 spacing=Config.AD_POST_SPACING_SECONDS,
+                 channel_spacing=None,
+                 max_attempts=Config.AD_POST_MAX_ATTEMPTS,
+                 retry_base_seconds=Config.AD_POST_RETRY_BASE_SECONDS,
+                 dedupe_window_seconds=Config.AD_POST_DEDUPE_HOURS * 3600):
+        self.bot = bot
+        self.resolve_channel = resolve_channel  # (guild_id, channel_name) -> channel | None
+        self.on_posted = on_posted
+        self.on_failed = on_failed
+        self.path = path
+        self.spacing = spacing
+        self.channel_spacing = channel_spacing or {}
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.dedupe_window_seconds = dedupe_window_seconds
+
+        self.queue = []  # entries, in enqueue order
+        self.posted_hashes = {}  # "guild_id:hash": posted_at
+        self.last_post = {}  # "guild_id:channel": timestamp
+        self.last_served = {}  # "guild_id:channel": {user_id: timestamp}
+        self._task = None
+        self._wakeup = asyncio.Event()
+        self._load()
+
+    # ===== Persistence =====
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.error("Failed to load queue %s: %s", self.path, e)
+            return
+        self.queue = state.get("queue", [])
+        self.posted_hashes = state.get("posted_hashes", {})
+        self.last_post = state.get("last_post", {})
+        self.last_served = state.get("last_served", {})
+        if self.queue:
+            logger.info("Resuming with %d queued advertisement(s)", len(self.queue))
+
+    def _save(self):
+        state = {
+            "queue": self.queue,
+            "posted_hashes": self.posted_hashes,
+            "last_post": self.last_post,
+            "last_served": self.last_served,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.error("Failed to save queue: %s", e)
+
+    # ===== Queueing =====
+    def _prune_hashes(self, now):
+        cutoff = now - self.dedupe_window_seconds
+        self.posted_hashes = {k: t for k, t in self.posted_hashes.items() if t >= cutoff}
+
+    def is_duplicate(self, guild_id, text):
+        key = f"{guild_id}:{ad_text_hash(text)}"
+        if any(e["dedupe_key"] == key for e in self.queue):
+            return True
+        posted_at = self.posted_hashes.get(key)
+        return posted_at is not None and posted_at >= time.time() - self.dedupe_window_seconds
+
+    def enqueue(self, ad_id, guild_id, channel_name, user_id, text, content, embeds=None):
+        """Queue a post; returns False if identical ad text is already queued or was recently posted"""
+        if any(e["ad_id"] == ad_id for e in self.queue):
+            return True
+        if self.is_duplicate(guild_id, text):
+            return False
+        self.queue.append({
+            "ad_id": ad_id,
+            "guild_id": guild_id,
+            "channel_name": channel_name,
+            "user_id": user_id,
+            "content": content,
+            "embeds": embeds or [],
+            "dedupe_key": f"{guild_id}:{ad_text_hash(text)}",
+            "attempts": 0,
+            "next_attempt_at": 0,
+            "enqueued_at": time.time(),
+        })
+        self._save()
+        self._wakeup.set()
+        return True
+
+    def pending_count(self, guild_id=None):
+        return sum(1 for e in self.queue if guild_id is None or e["guild_id"] == guild_id)
+
+    # ===== Scheduling =====
+    @staticmethod
+    def _channel_key(entry):
+        return f"{entry['guild_id']}:{entry['channel_name']}"
+
+    def _spacing_for(self, channel_name):
+        return self.channel_spacing.get(channel_name, self.spacing)
+
+    def _pick_next(self, now):
+        """Return the next entry to post (fair across advertisers), or (None, seconds_to_wait)"""
+        by_channel = {}
+        for entry in self.queue:
+            by_channel.setdefault(self._channel_key(entry), []).append(entry)
+
+        wait = None
+        for key, entries in by_channel.items():
+            ready_at = self.last_post.get(key, 0) + self._spacing_for(entries[0]["channel_name"])
+            ready = [e for e in entries if e["next_attempt_at"] <= now]
+            if not ready:
+                soonest = min(e["next_attempt_at"] for e in entries)
+                ready_at = max(ready_at, soonest)
+            if ready and ready_at <= now:
+                served = self.last_served.get(key, {})
+                # Earliest entry of the advertiser who was served longest ago
+                return min(ready, key=lambda e: (served.get(str(e["user_id"]), 0), e["enqueued_at"])), 0
+            wait = ready_at - now if wait is None else min(wait, ready_at - now)
+        return None, wait
+
+    async def _post(self, entry):
+        channel = self.resolve_channel(entry["guild_id"], entry["channel_name"])
+        if channel is None:
+            raise LookupError(f"#{entry['channel_name']} not found in guild {entry['guild_id']}")
+        embeds = [discord.Embed.from_dict(e) for e in entry.get("embeds") or []]
+        return await channel.send(entry["content"], embeds=embeds)
+
+    @staticmethod
+    def _is_permanent(error):
+        return isinstance(error, (discord.Forbidden, discord.NotFound))
+
+    async def _run_once(self, entry, now):
+        key = self._channel_key(entry)
+        entry["attempts"] += 1
+        try:
+            message = await self._post(entry)
+        except Exception as e:
+            if self._is_permanent(e) or entry["attempts"] >= self.max_attempts:
+                logger.error("Giving up on %s after %d attempt(s): %s", entry["ad_id"], entry["attempts"], e)
+                self.queue.remove(entry)
+                self._save()
+                if self.on_failed:
+                    await self.on_failed(entry, e)
+            else:
+                delay = self.retry_base_seconds * (2 ** (entry["attempts"] - 1))
+                entry["next_attempt_at"] = now + delay
+                logger.warning("Post of %s failed (%s); retrying in %.0fs", entry["ad_id"], e, delay)
+                self._save()
+            return
+
+        self.queue.remove(entry)
+        self.last_post[key] = now
+        self.last_served.setdefault(key, {})[str(entry["user_id"])] = now
+        self.posted_hashes[entry["dedupe_key"]] = now
+        self._prune_hashes(now)
+        self._save()
+        if self.on_posted:
+            await self.on_posted(entry, message)
+
+    async def _loop(self):
+        await self.bot.wait_until_ready()
+        while not self.bot.is_closed():
+            now = time.time()
+            try:
+                entry, wait = self._pick_next(now)
+                if entry is not None:
+                    await self._run_once(entry, now)
+                    continue
+            except Exception:
+                # A failing callback or queue write mustn't stop posting until the next restart
+                logger.exception("Advertisement posting loop error; backing off %.0fs", self.retry_base_seconds)
+                await asyncio.sleep(self.retry_base_seconds)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait if wait is not None else None)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
@@ -0,0 +1,199 @@
+"""Incrementally maintained advertisement statistics.
+
+    python -m ad_stats [--ads advertisement_requests.json] [--archive data/ad_archive] [--output data/ad_stats.json]
+
+rebuilds the aggregates from the raw advertisement records, archived ones
+included (use it if they ever drift, e.g. after editing the JSON by hand).
+"""
+import logging
+import os
+import json
+import bisect
+import argparse
+from datetime import datetime, timedelta
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("pending", "approved", "denied")
+# Upper bounds (seconds) of the time-to-decision histogram buckets; the last bucket is open-ended
+DECISION_BUCKETS = (60, 300, 900, 1800, 3600, 2 * 3600, 4 * 3600, 8 * 3600, 12 * 3600,
+                    24 * 3600, 48 * 3600, 72 * 3600, 7 * 24 * 3600)
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.rstrip("Z"))
+    except ValueError:
+        return None
+
+
+def _day(value):
+    parsed = _parse_time(value)
+    return parsed.strftime("%Y-%m-%d") if parsed else "unknown"
+
+
+def _empty_guild():
+    return {
+        "status": {s: 0 for s in STATUSES},  # current count per status
+        "days": {},  # "YYYY-MM-DD": {"submitted": n, "approved": n, "denied": n}
+        "decision_histogram": [0] * (len(DECISION_BUCKETS) + 1),
+        "decision_seconds_total": 0.0,
+        "advertisers": {},  # user_id: {"username", "submitted", "approved", "denied"}
+    }
+
+
+class AdStats:
+    """Per-guild advertisement aggregates, updated as ads are submitted and decided.
+
+    Counts are kept per status and per (day, event), with a histogram of
+    time-to-decision and per-advertiser totals, so summary() never touches
+    the ad history. Everything lives in one small JSON file written after
+    each change. rebuild() recomputes it all from the raw records.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.AD_STATS_FILE
+        self.missing = not os.path.exists(self.path)  # never built: rebuild from the ad history once
+        self.data = self._load()
+
+    # ===== Persistence =====
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if isinstance(data.get("guilds"), dict):
+                return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Ignoring unreadable ad stats file %s: %s", self.path, e)
+        return {"guilds": {}, "rebuilt_at": None}
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump(self.data, f, separators=(",", ":"))
+        except Exception as e:
+            logger.error("Failed to save ad stats: %s", e)
+
+    def _guild(self, guild_id):
+        return self.data["guilds"].setdefault(str(guild_id), _empty_guild())
+
+    # ===== Updates =====
+    def _apply_submission(self, record):
+        guild = self._guild(record.get("guild_id"))
+        guild["status"]["pending"] += 1
+        day = guild["days"].setdefault(_day(record.get("submitted_at")), {})
+        day["submitted"] = day.get("submitted", 0) + 1
+        advertiser = guild["advertisers"].setdefault(str(record.get("user_id")), {"submitted": 0, "approved": 0, "denied": 0})
+        advertiser["username"] = record.get("username")
+        advertiser["submitted"] += 1
+
+    def _apply_decision(self, record):
+        status = record.get("status")
+        if status not in ("approved", "denied"):
+            return
+        guild = self._guild(record.get("guild_id"))
+        guild["status"]["pending"] = max(0, guild["status"]["pending"] - 1)
+        guild["status"][status] += 1
+        day = guild["days"].setdefault(_day(record.get("processed_at")), {})
+        day[status] = day.get(status, 0) + 1
+        advertiser = guild["advertisers"].setdefault(str(record.get("user_id")), {"submitted": 0, "approved": 0, "denied": 0})
+        advertiser[status] += 1
+
+        submitted, processed = _parse_time(record.get("submitted_at")), _parse_time(record.get("processed_at"))
+        if submitted and processed:
+            seconds = max(0.0, (processed - submitted).total_seconds())
+            guild["decision_histogram"][bisect.bisect_left(DECISION_BUCKETS, seconds)] += 1
+            guild["decision_seconds_total"] += seconds
+
+    def record_submission(self, record):
+        self._apply_submission(record)
+        self.save()
+
+    def record_decisions(self, records):
+        """Count records that just left "pending" (one save for the batch)"""
+        for record in records:
+            self._apply_decision(record)
+        if records:
+            self.save()
+
+    def rebuild(self, records):
+        """Recompute every aggregate from the raw ad records (any iterable); returns the number counted"""
+        self.data = {"guilds": {}, "rebuilt_at": datetime.utcnow().isoformat() + "Z"}
+        counted = 0
+        for record in records:
+            self._apply_submission(record)
+            self._apply_decision(record)
+            counted += 1
+        self.missing = False
+        self.save()
+        return counted
+
+    # ===== Reads =====
+    def summary(self, guild_id, days=30, top=5):
+        guild = self.data["guilds"].get(str(guild_id)) or _empty_guild()
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        window = {"submitted": 0, "approved": 0, "denied": 0}
+        for day, counts in guild["days"].items():
+            if day != "unknown" and day >= since:
+                for key in window:
+                    window[key] += counts.get(key, 0)
+
+        decided = guild["status"]["approved"] + guild["status"]["denied"]
+        decided_recent = window["approved"] + window["denied"]
+        advertisers = sorted(((user_id, s) for user_id, s in guild["advertisers"].items() if user_id.isdigit()),
+                             key=lambda kv: kv[1]["submitted"], reverse=True)
+        histogram = guild["decision_histogram"]
+        return {
+            "status": dict(guild["status"]),
+            "window_days": days,
+            "window": window,
+            "approval_rate": guild["status"]["approved"] / decided if decided else None,
+            "approval_rate_window": window["approved"] / decided_recent if decided_recent else None,
+            "median_decision_seconds": self._histogram_percentile(histogram, 0.5),
+            "p90_decision_seconds": self._histogram_percentile(histogram, 0.9),
+            "mean_decision_seconds": guild["decision_seconds_total"] / sum(histogram) if sum(histogram) else None,
+            "top_advertisers": [(int(user_id), stats) for user_id, stats in advertisers[:top]],
+            "rebuilt_at": self.data.get("rebuilt_at"),
+        }
+
+    @staticmethod
+    def _histogram_percentile(histogram, q):
+        """Estimate a percentile by interpolating inside its histogram bucket"""
+        total = sum(histogram)
+        if not total:
+            return None
+        target = q * total
+        seen = 0
+        for i, count in enumerate(histogram):
+            if count and seen + count >= target:
+                low = DECISION_BUCKETS[i - 1] if i > 0 else 0
+                high = DECISION_BUCKETS[i] if i < len(DECISION_BUCKETS) else low * 2
+                return low + (high - low) * (target - seen) / count
+            seen += count
+        return float(DECISION_BUCKETS[-1])
+
+
+def main(argv=None):
+    import ad_store
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ads", default=ad_store.AD_DB_FILE, help="advertisement records to rebuild from")
+    parser.add_argument("--archive", default=ad_store.AD_ARCHIVE_DIR, help="archived advertisement partitions")
+    parser.add_argument("--output", default=Config.AD_STATS_FILE)
+    args = parser.parse_args(argv)
+
+    ad_store.AD_DB_FILE = args.ads
+    ad_store.AD_ARCHIVE_DIR = args.archive
+    stats = AdStats(args.output)
+    counted = stats.rebuild(ad_store.iter_all_ads())
+    print(f"Rebuilt ad stats for {len(stats.data['guilds'])} guild(s) from {counted} record(s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
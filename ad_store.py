@@ -0,0 +1,195 @@
+import logging
+import os
+import gzip
+import json
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# ===== PERSISTENCE (Advertisement Requests) =====
+AD_DB_FILE = "advertisement_requests.json"
+
+
+def load_ads():
+    try:
+        with open(AD_DB_FILE, "r") as f:
+            return json.load(f)
+    except Exception:
+        return []
+
+
+def save_ads(data):
+    try:
+        with open(AD_DB_FILE, "w") as f:
+            json.dump(data, f, indent=2)
+    except Exception as e:
+        logger.error("Save failed: %s", e)
+
+
+def append_ad(item):
+    data = load_ads()
+    data.append(item)
+    save_ads(data)
+
+
+def update_ad(ad_id, updater):
+    data = load_ads()
+    for rec in data:
+        if rec.get("id") == ad_id:
+            updater(rec)
+            break
+    save_ads(data)
+
+
+def update_ads(ad_ids, updater, only_pending=True):
+    """Apply `updater` to every record in `ad_ids` with a single load/save.
+
+    Returns the updated records. With `only_pending`, records that were already
+    decided (e.g. by another staff member) are skipped.
+    """
+    wanted = set(ad_ids)
+    data = load_ads()
+    updated = []
+    for rec in data:
+        if rec.get("id") in wanted:
+            if only_pending and rec.get("status") != "pending":
+                continue
+            updater(rec)
+            updated.append(rec)
+    if updated:
+        save_ads(data)
+    return updated
+
+
+def get_ad(ad_id):
+    """Find an ad in the live store, then in the archive"""
+    return next((r for r in load_ads() if r.get("id") == ad_id), None) or find_archived_ad(ad_id)
+
+
+def guild_pending_ads(guild_id):
+    return [a for a in load_ads() if a.get("guild_id") == guild_id and a.get("status") == "pending"]
+
+
+# ===== ARCHIVE (decided advertisements, gzipped JSON partitioned by month decided) =====
+AD_ARCHIVE_DIR = "data/ad_archive"
+ARCHIVE_INDEX_FILE = "index.json"  # {"ads": {ad_id: partition}, "users": {user_id: [partition, ...]}}
+
+
+def _partition_key(rec):
+    return (rec.get("processed_at") or rec.get("submitted_at") or "unknown")[:7]
+
+
+def _partition_path(key):
+    return os.path.join(AD_ARCHIVE_DIR, f"ads-{key}.json.gz")
+
+
+def _write_atomic(path, data, compress=False):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with (gzip.open(tmp_path, "wt", encoding="utf-8") if compress else open(tmp_path, "w")) as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_partition(key):
+    try:
+        with gzip.open(_partition_path(key), "rt", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def load_archive_index():
+    try:
+        with open(os.path.join(AD_ARCHIVE_DIR, ARCHIVE_INDEX_FILE), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"ads": {}, "users": {}}
+
+
+def archive_partitions():
+    try:
+        names = os.listdir(AD_ARCHIVE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(n[len("ads-"):-len(".json.gz")] for n in names if n.startswith("ads-") and n.endswith(".json.gz"))
+
+
+def select_for_archive(older_than_days):
+    """Decided ads whose decision is older than `older_than_days`, as {partition: [records]}"""
+    cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).isoformat() + "Z"
+    batches = {}
+    for rec in load_ads():
+        decided_at = rec.get("processed_at") or rec.get("submitted_at")
+        if rec.get("status") != "pending" and decided_at and decided_at < cutoff:
+            batches.setdefault(_partition_key(rec), []).append(rec)
+    return batches
+
+
+def write_archive(batches):
+    """Merge {partition: [records]} into the archive files and index; safe to repeat for the same records.
+
+    Touches only the archive, so it can run in a thread while the live store keeps changing.
+    """
+    index = load_archive_index()
+    for key, records in batches.items():
+        partition = read_partition(key)
+        known = {r.get("id") for r in partition}
+        partition.extend(r for r in records if r.get("id") not in known)
+        _write_atomic(_partition_path(key), partition, compress=True)
+        for r in records:
+            index["ads"][r["id"]] = key
+            partitions = index["users"].setdefault(str(r.get("user_id")), [])
+            if key not in partitions:
+                partitions.append(key)
+    _write_atomic(os.path.join(AD_ARCHIVE_DIR, ARCHIVE_INDEX_FILE), index)
+
+
+def drop_ads(ad_ids):
+    """Remove `ad_ids` from the live store (after they were archived); returns how many were removed"""
+    drop = set(ad_ids)
+    data = load_ads()
+    kept = [r for r in data if r.get("id") not in drop]
+    if len(kept) != len(data):
+        save_ads(kept)
+    return len(data) - len(kept)
+
+
+def archive_processed(older_than_days):
+    """Move ads decided more than `older_than_days` ago from the live store to the archive"""
+    batches = select_for_archive(older_than_days)
+    if not batches:
+        return 0
+    write_archive(batches)
+    return drop_ads(r["id"] for records in batches.values() for r in records)
+
+
+def find_archived_ads(ad_ids):
+    index = load_archive_index()["ads"]
+    by_partition = {}
+    for ad_id in ad_ids:
+        if ad_id in index:
+            by_partition.setdefault(index[ad_id], set()).add(ad_id)
+    return [r for key, wanted in by_partition.items() for r in read_partition(key) if r.get("id") in wanted]
+
+
+def find_archived_ad(ad_id):
+    found = find_archived_ads([ad_id])
+    return found[0] if found else None
+
+
+def archived_user_ads(user_id):
+    partitions = load_archive_index()["users"].get(str(user_id), [])
+    return [r for key in sorted(partitions) for r in read_partition(key) if r.get("user_id") == user_id]
+
+
+def iter_archived_ads():
+    """Yield every archived ad, one partition in memory at a time"""
+    for key in archive_partitions():
+        yield from read_partition(key)
+
+
+def iter_all_ads():
+    """Archived ads, then the live store (for rebuilding derived data)"""
+    yield from iter_archived_ads()
+    yield from load_ads()
@@ -0,0 +1,169 @@
+import logging
+import os
+import json
+import asyncio
+from datetime import datetime, timezone
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+AUDIT_TABLE = "audit_events"
+AUDIT_COLUMNS = ("occurred_at", "source", "action", "actor_id", "target_id", "target", "guild_id", "details")
+
+SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS {AUDIT_TABLE} (
+        id BIGSERIAL PRIMARY KEY,
+        occurred_at TIMESTAMPTZ NOT NULL,
+        source TEXT NOT NULL,
+        action TEXT NOT NULL,
+        actor_id BIGINT,
+        target_id BIGINT,
+        target TEXT,
+        guild_id BIGINT,
+        details JSONB
+    );
+    CREATE INDEX IF NOT EXISTS {AUDIT_TABLE}_time_idx ON {AUDIT_TABLE} (occurred_at DESC);
+    CREATE INDEX IF NOT EXISTS {AUDIT_TABLE}_actor_idx ON {AUDIT_TABLE} (actor_id, occurred_at DESC);
+    CREATE INDEX IF NOT EXISTS {AUDIT_TABLE}_target_id_idx ON {AUDIT_TABLE} (target_id, occurred_at DESC);
+    CREATE INDEX IF NOT EXISTS {AUDIT_TABLE}_target_idx ON {AUDIT_TABLE} (LOWER(target), occurred_at DESC);
+    CREATE OR REPLACE RULE {AUDIT_TABLE}_no_update AS ON UPDATE TO {AUDIT_TABLE} DO INSTEAD NOTHING;
+    CREATE OR REPLACE RULE {AUDIT_TABLE}_no_delete AS ON DELETE TO {AUDIT_TABLE} DO INSTEAD NOTHING;
+"""
+
+
+class AuditLog:
+    """Append-only audit trail written to Postgres in batches.
+
+    record() only appends to an in-memory buffer. A background task writes the
+    buffer with one COPY every `flush_interval` seconds, or as soon as
+    `flush_every` events are waiting. If the database is unreachable the batch
+    is kept and retried; beyond `max_buffer` events the oldest are dropped.
+    Without DATABASE_URL events only go to the application log.
+    """
+
+    def __init__(self, source, dsn=None, flush_every=200, flush_interval=2.0, max_buffer=20000):
+        self.source = source
+        self.dsn = dsn if dsn is not None else os.getenv("DATABASE_URL")
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.pool = None
+        self._buffer = []
+        self._pool_lock = None
+        self._flush_lock = None
+        self._task = None
+        self._wakeup = None
+        self.stats = {"recorded": 0, "written": 0, "batches": 0, "dropped": 0, "failed_batches": 0}
+
+    # ===== Recording =====
+    def record(self, action, actor=None, target=None, target_id=None, guild=None, **details):
+        """Queue one event. `actor`/`guild` may be objects with an `.id` or raw IDs."""
+        self.stats["recorded"] += 1
+        actor_id = getattr(actor, "id", actor)
+        guild_id = getattr(guild, "id", guild)
+        if not self.dsn:
+            logger.info("audit %s target=%s %s", action, target, details,
+                        extra={"bot": self.source, "user_id": actor_id, "guild_id": guild_id})
+            return
+        self._buffer.append((
+            datetime.now(timezone.utc), self.source, action,
+            int(actor_id) if actor_id is not None else None,
+            int(target_id) if target_id is not None else None,
+            str(target) if target is not None else None,
+            int(guild_id) if guild_id is not None else None,
+            json.dumps(details, default=str) if details else None,
+        ))
+        if len(self._buffer) > self.max_buffer:
+            overflow = len(self._buffer) - self.max_buffer
+            del self._buffer[:overflow]
+            self.stats["dropped"] += overflow
+        self._ensure_started()
+        if len(self._buffer) >= self.flush_every:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    # ===== Writing =====
+    async def _get_pool(self):
+        if self.pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self.pool is None:
+                    pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+                    async with pool.acquire() as conn:
+                        await conn.execute(SCHEMA)
+                    self.pool = pool
+        return self.pool
+
+    async def flush(self):
+        """Write everything buffered so far; returns the number of events written"""
+        if not self._buffer or not self.dsn:
+            return 0
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            try:
+                pool = await self._get_pool()
+                async with pool.acquire() as conn:
+                    await conn.copy_records_to_table(AUDIT_TABLE, records=batch, columns=AUDIT_COLUMNS)
+            except Exception as e:
+                # Put the batch back in front of anything recorded meanwhile
+                self._buffer[:0] = batch
+                self.stats["failed_batches"] += 1
+                logger.warning("Failed to write %d audit event(s): %s", len(batch), e)
+                return 0
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+            return len(batch)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            written = await self.flush()
+            if not written and self._buffer:
+                # Back off while the database is unavailable
+                await asyncio.sleep(self.flush_interval * 5)
+
+    # ===== Querying =====
+    async def query(self, actor_id=None, target=None, target_id=None, action=None, since=None, limit=20):
+        """Return the newest matching events as asyncpg Records.
+
+        `target` matches the target text case-insensitively; `target_id` also
+        matches events where that ID was the actor, so one user's whole trail
+        comes back.
+        """
+        await self.flush()
+        pool = await self._get_pool()
+        clauses, args = [], []
+
+        def arg(value):
+            args.append(value)
+            return f"${len(args)}"
+
+        if actor_id is not None:
+            clauses.append(f"actor_id = {arg(actor_id)}")
+        if target_id is not None:
+            placeholder = arg(target_id)
+            clauses.append(f"(target_id = {placeholder} OR actor_id = {placeholder})")
+        if target is not None:
+            clauses.append(f"LOWER(target) = LOWER({arg(target)})")
+        if action is not None:
+            clauses.append(f"action = {arg(action)}")
+        if since is not None:
+            clauses.append(f"occurred_at >= {arg(since)}")
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT id, {', '.join(AUDIT_COLUMNS)} FROM {AUDIT_TABLE} {where} "
+               f"ORDER BY occurred_at DESC LIMIT {arg(int(limit))}")
+        async with pool.acquire() as conn:
+            return await conn.fetch(sql, *args)
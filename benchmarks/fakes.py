@@ -0,0 +1,127 @@
+import itertools
+import discord
+
+_ids = itertools.count(10**17)
+
+
+def next_id():
+    return next(_ids)
+
+
+class FakeMessage:
+    def __init__(self, channel, content=None, embed=None, embeds=None):
+        self.id = next_id()
+        self.channel = channel
+        self.content = content
+        self.embeds = embeds or ([embed] if embed else [])
+
+
+class FakeMessageable:
+    """Records everything sent to it instead of calling Discord"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(self, content, kwargs.get("embed"), kwargs.get("embeds"))
+        self.sent.append(message)
+        return message
+
+
+class FakeRole:
+    def __init__(self, guild, name):
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+
+
+class FakeTextChannel(FakeMessageable):
+    def __init__(self, guild, name):
+        super().__init__()
+        self.id = next_id()
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+
+
+class FakeUser(FakeMessageable):
+    def __init__(self, name, user_id=None, closed_dms=False):
+        super().__init__()
+        self.id = user_id or next_id()
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.closed_dms = closed_dms
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, **kwargs):
+        if self.closed_dms:
+            raise discord.Forbidden(_FakeResponse(403), "Cannot send messages to this user")
+        return await super().send(content, **kwargs)
+
+    async def create_dm(self):
+        return self
+
+
+class FakeMember(FakeUser):
+    def __init__(self, guild, name, user_id=None, roles=(), closed_dms=False):
+        super().__init__(name, user_id, closed_dms)
+        self.guild = guild
+        self.roles = list(roles)
+
+    async def add_roles(self, *roles, reason=None):
+        self.roles.extend(r for r in roles if r not in self.roles)
+
+    async def remove_roles(self, *roles, reason=None):
+        self.roles = [r for r in self.roles if r not in roles]
+
+
+class FakeGuild:
+    def __init__(self, name="Benchmark Guild", role_names=(), channel_names=()):
+        self.id = next_id()
+        self.name = name
+        self.roles = [FakeRole(self, n) for n in role_names]
+        self.text_channels = [FakeTextChannel(self, n) for n in channel_names]
+        self.members = {}
+
+    def add_member(self, name, **kwargs):
+        member = FakeMember(self, name, **kwargs)
+        self.members[member.id] = member
+        return member
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    async def fetch_member(self, member_id):
+        member = self.members.get(member_id)
+        if member is None:
+            raise discord.NotFound(_FakeResponse(404), "Unknown Member")
+        return member
+
+    def get_channel(self, channel_id):
+        return next((c for c in self.text_channels if c.id == channel_id), None)
+
+
+class FakeContext(FakeMessageable):
+    """Enough of commands.Context for the code paths under benchmark"""
+
+    def __init__(self, author, guild=None, channel=None):
+        super().__init__()
+        self.author = author
+        self.guild = guild
+        self.channel = channel or author
+        self.replies = self.sent
+
+    async def reply(self, content=None, **kwargs):
+        kwargs.pop("mention_author", None)
+        return await self.send(content, **kwargs)
+
+
+class _FakeResponse:
+    """Minimal aiohttp response shape for constructing discord.HTTPException"""
+
+    def __init__(self, status):
+        self.status = status
+        self.reason = "Benchmark"
@@ -0,0 +1,99 @@
+import os
+import sys
+import math
+import json
+import time
+import asyncio
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """Throughput and latency percentiles (ms) for one scenario"""
+    ordered = sorted(latencies)
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "operations": len(ordered),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops_s": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else 0.0,
+    }
+
+
+async def measure(operation, items, concurrency=1):
+    """Await operation(item) for every item with at most `concurrency` in flight.
+
+    An operation that raises, or returns False, counts as an error.
+    """
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                ok = await operation(item)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if ok is False:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def environment():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                  capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        revision = None
+    return {
+        "git_revision": revision,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def write_results(path, suite, results, settings):
+    report = {"suite": suite, "environment": environment(), "settings": settings, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def print_table(results):
+    header = f"{'scenario':<24}{'ops':>8}{'err':>6}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<24}{r['operations']:>8}{r['errors']:>6}{r['throughput_ops_s']:>10}"
+              f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
@@ -0,0 +1,274 @@
+"""Offline benchmarks for the verification, advertisement and embed code paths.
+
+    python -m benchmarks.run [--iterations N] [--concurrency C] [--output results.json]
+
+Everything runs locally: Discord objects are fakes, Roblox is served by
+roblox_emulator and the database is SQLite unless --database-url points at Postgres.
+Runs happen in a temporary working directory so data/ files are not touched.
+"""
+import os
+import sys
+import random
+import asyncio
+import argparse
+import tempfile
+
+from benchmarks.harness import REPO_ROOT, measure, print_table, write_results
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+import discord
+from discord.ext import commands
+from logging_setup import setup_logging
+from benchmarks.fakes import FakeContext, FakeGuild, FakeUser
+from roblox_emulator import RobloxEmulator
+from benchmarks.sqlite_pool import create_pool
+
+VERIFIED_ROLE_NAME = "Verified"
+AD_WORDS = ("join", "our", "new", "obby", "tycoon", "simulator", "group", "today", "free", "ugc", "limited",
+            "event", "update", "trading", "hangout", "roleplay", "clan", "tryouts", "hiring", "builders")
+# Openings many ads share, so unrelated ads still overlap the way real ones do
+AD_BOILERPLATE = (
+    "join our game now free ugc every weekend trading and events come play with friends",
+    "we are hiring builders scripters and modelers for our new roleplay game payment in robux",
+    "clan tryouts open today join the group for free rewards and giveaways",
+    "new update is out limited items codes and double xp weekend dont miss it",
+    "hangout and chill with the community voice chat enabled join today",
+)
+
+
+async def make_verification_manager(database_url, pool_size, dm_rate=0):
+    from verification_manager import VerificationManager
+    from dm_delivery import DMDelivery
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    # Fake DMs are instant, so the DM queue is unpaced unless a scenario asks for Discord's pacing
+    manager = VerificationManager(bot, DMDelivery("benchmark", rate=dm_rate, workers=None if dm_rate else 8))
+    manager.db_url = None  # the benchmark attaches its own pool below
+    manager.pool = await create_pool(database_url, size=pool_size)
+    await manager.ensure_schema()
+    return manager
+
+
+def random_ad(rng, i):
+    words = " ".join(rng.choice(AD_WORDS) for _ in range(rng.randint(12, 40)))
+    return f"{words} https://www.roblox.com/games/{1000 + i % 300}/place #{i}"
+
+
+# ===== Scenarios =====
+async def bench_verification(manager, roblox, users, concurrency):
+    results = {}
+    contexts = {u.id: FakeContext(u) for u in users}
+
+    async def start(item):
+        n, user = item
+        await manager.start_verification(contexts[user.id], f"BenchUser{n}")
+        return user.id in manager.codes
+
+    results["verify_start"] = await measure(start, list(enumerate(users, start=1)), concurrency)
+
+    for n, user in enumerate(users, start=1):
+        roblox.set_bio(n, f"Hello! {manager.codes[user.id]} is my code")
+
+    async def check(user):
+        verified, _, _ = await manager.check_verification(contexts[user.id])
+        return verified
+
+    results["verify_check"] = await measure(check, users, concurrency)
+    return results
+
+
+async def bench_revoke(manager, users, concurrency):
+    guild = FakeGuild(role_names=[VERIFIED_ROLE_NAME])
+    role = guild.roles[0]
+    for user in users:
+        guild.add_member(user.name, user_id=user.id, roles=[role])
+
+    # Alternate between the two lookup paths: by mention and by Roblox username
+    targets = [f"<@{u.id}>" if n % 2 else f"benchuser{n}" for n, u in enumerate(users, start=1)]
+
+    async def revoke(target):
+        removed, _, _ = await manager.revoke_verification(guild, target, VERIFIED_ROLE_NAME)
+        return removed
+
+    return {"revoke": await measure(revoke, targets, concurrency)}
+
+
+async def bench_ads(iterations, concurrency, rng):
+    import ad_store
+    from ad_similarity import AdSimilarityIndex
+
+    ad_store.AD_DB_FILE = os.path.join(os.getcwd(), "advertisement_requests.json")
+    index = AdSimilarityIndex()
+    guild_id = 1
+    ads = [(f"{guild_id}-{1000 + i}-{i}", 1000 + i % 50, random_ad(rng, i)) for i in range(iterations)]
+
+    async def submit(ad):
+        # Mirrors !advertise after the DM: duplicate check, store append, index update
+        ad_id, user_id, text = ad
+        index.query(text, limit=10)
+        ad_store.append_ad({"id": ad_id, "guild_id": guild_id, "user_id": user_id, "username": f"member{user_id}",
+                            "ad_text": text, "status": "pending", "submitted_at": "2026-01-01T00:00:00Z"})
+        index.add(ad_id, text, status="pending", user_id=user_id, guild_id=guild_id)
+
+    async def list_queue(_):
+        # Mirrors !adreq building its first page
+        return bool(ad_store.guild_pending_ads(guild_id))
+
+    batches = [[ad_id for ad_id, _, _ in ads[i:i + 25]] for i in range(0, len(ads), 25)]
+
+    async def decide(batch):
+        # Mirrors a multi-select approve from the queue view
+        return bool(ad_store.update_ads(batch, lambda r: r.update({"status": "approved"})))
+
+    return {
+        "ad_submit": await measure(submit, ads, concurrency),
+        "adreq_list": await measure(list_queue, range(max(1, iterations // 10)), concurrency),
+        "ad_decide_batch": await measure(decide, batches, concurrency),
+    }
+
+
+async def bench_ad_similarity(iterations, index_ads, rng):
+    from ad_similarity import AdSimilarityIndex, shingles
+
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+
+    def boilerplate_ad(i):
+        words = " ".join(rng.choice(vocab) for _ in range(rng.randint(8, 30)))
+        return f"{rng.choice(AD_BOILERPLATE)} {words} https://www.roblox.com/games/{1000 + i}/place"
+
+    def reword(text):
+        words = text.split()
+        for _ in range(max(1, int(len(words) * rng.uniform(0.05, 0.3)))):
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+        return " ".join(words)
+
+    corpus = [boilerplate_ad(i) for i in range(index_ads)]
+    index = AdSimilarityIndex()
+    for i, text in enumerate(corpus):
+        index.add(i, text)
+    queries = []
+    for source in rng.sample(range(index_ads), min(iterations, index_ads)):
+        text = reword(corpus[source])
+        a, b = shingles(text), shingles(corpus[source])
+        queries.append((source, text, len(a & b) / len(a | b)))
+
+    async def query(item):
+        # Mirrors the duplicate check on !advertise against a large history
+        index.query(item[1], limit=10)
+
+    results = {"ad_similarity_query": await measure(query, queries)}
+    # Rewordings of an indexed ad right around the threshold: how many does query() still report?
+    near = [(source, text) for source, text, jaccard in queries if 0.6 <= jaccard < 0.7]
+    found = sum(any(ad_id == source for ad_id, _, _ in index.query(text, limit=len(index))) for source, text in near)
+    results["ad_similarity_query"].update(indexed_ads=len(index), recall_at_threshold=round(found / len(near), 3) if near else None)
+    return results
+
+
+async def bench_username_index(iterations, index_users, rng):
+    from username_index import UsernameIndex
+
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    names = list({"".join(rng.choice(letters) for _ in range(rng.randint(4, 12))) + str(rng.randint(0, 999))
+                  for _ in range(index_users)})
+    index = UsernameIndex().load(enumerate(names))
+    for discord_id in range(0, len(names), 2):
+        index.set_discord(discord_id, f"member{discord_id}")
+    sample = rng.sample(names, min(iterations, len(names)))
+
+    async def autocomplete(name):
+        # What staff have typed so far into /info or /revoke
+        return bool(index.suggest(name[:rng.randint(1, 5)]))
+
+    async def typo(name):
+        # A mistyped full name: no prefix match, so the fuzzy fallback answers
+        i = rng.randrange(len(name))
+        return bool(index.suggest("x" + name[:i] + name[i + 1:]))
+
+    return {
+        "username_autocomplete": await measure(autocomplete, sample),
+        "username_fuzzy": await measure(typo, sample),
+    }
+
+
+async def bench_embeds(iterations, concurrency):
+    import bot2
+
+    embed_data = {"title": "Weekly update", "description": "Lots of news " * 20, "footer": "Blox Entertainment",
+                  "color": "Blue"}
+
+    async def build(_):
+        bot2.build_embed(embed_data)
+
+    author = FakeUser("staff")
+    bot2.templates.save("bench", {**embed_data, "title": "Week {week} update"}, author)
+
+    async def render(i):
+        return bot2.templates.render("bench", {"week": i % 52}) is not None
+
+    return {
+        "embed_build": await measure(build, range(iterations), concurrency),
+        "template_render": await measure(render, range(iterations), concurrency),
+    }
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    roblox = await RobloxEmulator(users=args.iterations, latency=args.roblox_latency_ms / 1000).start()
+    manager = await make_verification_manager(args.database_url, args.pool_size)
+    users = [FakeUser(f"member{i}") for i in range(args.iterations)]
+    results = {}
+    try:
+        results.update(await bench_verification(manager, roblox, users, args.concurrency))
+        results.update(await bench_revoke(manager, users, args.concurrency))
+        results.update(await bench_ads(args.iterations, args.concurrency, rng))
+        results.update(await bench_embeds(args.iterations, args.concurrency))
+        results.update(await bench_username_index(args.iterations, args.index_users, rng))
+        results.update(await bench_ad_similarity(args.iterations, args.index_ads, rng))
+    finally:
+        await manager.roblox_api.close_session()
+        await roblox.stop()
+        for task in asyncio.all_tasks() - {asyncio.current_task()}:
+            task.cancel()  # pending code-expiry timers
+    results["verify_check"]["roblox_requests"] = dict(roblox.requests)
+    results["verify_check"]["pool_waits"] = getattr(manager.pool, "waits", None)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--roblox-latency-ms", type=float, default=0.0)
+    parser.add_argument("--index-users", type=int, default=100000, help="verified users in the username index scenario")
+    parser.add_argument("--index-ads", type=int, default=100000, help="indexed advertisements in the similarity scenario")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"),
+                        help="postgres:// URL to benchmark against Postgres (default: in-memory SQLite)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+    os.environ.setdefault("LOG_LEVELS", "discord=CRITICAL")
+    os.environ.setdefault("LOG_FORMAT", "text")
+    setup_logging()
+    output = os.path.abspath(args.output)
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        previous = os.getcwd()
+        os.chdir(workdir)
+        try:
+            results = asyncio.run(run(args))
+        finally:
+            os.chdir(previous)
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("output", "database_url")}
+    settings["database"] = "postgres" if args.database_url else "sqlite"
+    write_results(output, "offline", results, settings)
+    print_table(results)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import re
+import time
+import sqlite3
+import asyncio
+from contextlib import asynccontextmanager
+
+_PLACEHOLDER_RE = re.compile(r"\$(\d+)")
+
+
+class SQLiteConnection:
+    """asyncpg-style execute/fetch/fetchrow/fetchval on top of sqlite3.
+
+    `$n` placeholders become `?n`, which SQLite supports natively, so the
+    production SQL runs unchanged.
+    """
+
+    def __init__(self, db):
+        self._db = db
+
+    def _run(self, sql, args):
+        return self._db.execute(_PLACEHOLDER_RE.sub(r"?\1", sql), args)
+
+    async def execute(self, sql, *args):
+        if not args and ";" in sql.strip().rstrip(";"):
+            self._db.executescript(sql)
+            return "OK"
+        cursor = self._run(sql, args)
+        self._db.commit()
+        return f"OK {cursor.rowcount}"
+
+    async def fetch(self, sql, *args):
+        return self._run(sql, args).fetchall()
+
+    async def fetchrow(self, sql, *args):
+        return self._run(sql, args).fetchone()
+
+    async def fetchval(self, sql, *args):
+        row = self._run(sql, args).fetchone()
+        return row[0] if row else None
+
+
+class SQLitePool:
+    """Stand-in for an asyncpg pool backed by one SQLite database.
+
+    `size` connections' worth of slots are handed out through a semaphore, so
+    acquire() waits the way it would on a saturated Postgres pool; the waits
+    are counted in `acquires`, `waits` and `wait_seconds`.
+    """
+
+    def __init__(self, path=":memory:", size=10):
+        self._db = sqlite3.connect(path, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        self._db.row_factory = sqlite3.Row
+        self._slots = asyncio.Semaphore(size)
+        self.size = size
+        self.acquires = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquires += 1
+        if self._slots.locked():
+            self.waits += 1
+            started = time.perf_counter()
+            await self._slots.acquire()
+            self.wait_seconds += time.perf_counter() - started
+        else:
+            await self._slots.acquire()
+        try:
+            # Yield once so concurrent callers interleave as they would on a real pool
+            await asyncio.sleep(0)
+            yield SQLiteConnection(self._db)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        self._db.close()
+
+
+async def create_pool(dsn=None, size=10):
+    """Return a real asyncpg pool for postgres:// DSNs, otherwise an SQLite stand-in"""
+    if dsn and dsn.startswith(("postgres://", "postgresql://")):
+        import asyncpg
+        return await asyncpg.create_pool(dsn, min_size=1, max_size=size)
+    return SQLitePool(dsn or ":memory:", size=size)
@@ -0,0 +1,240 @@
+"""Verification flood: many members running !verify -> bio edit -> !check at once.
+
+    python -m benchmarks.verify_flood --users 2000 --duration 60 --curve spike --multiplier 10
+
+Each simulated member runs !verify at a time drawn from the arrival curve,
+edits their bio after a think time, and runs !check repeatedly (sometimes
+before the bio is saved) until it passes or they give up. --time-scale
+shrinks the arrival window and think times for quick runs; note that it also
+raises the request rate by the same factor, so use 1.0 for SLO numbers.
+
+The report covers end-to-end verification time, Roblox requests, DB pool
+waits, event-loop lag and memory growth. It is checked against
+--slo-p95-seconds (measured in unscaled seconds); the exit status is 1 when
+the SLO is missed.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import resource
+import tracemalloc
+
+from benchmarks.harness import REPO_ROOT, summarize, write_results
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from logging_setup import setup_logging
+from benchmarks.fakes import FakeContext, FakeUser
+from roblox_emulator import RobloxEmulator
+from benchmarks.run import make_verification_manager
+
+CURVES = ("constant", "ramp", "spike", "poisson")
+
+
+def arrival_times(curve, users, duration, rng):
+    """Offsets in seconds (0..duration) at which each user runs !verify"""
+    if curve == "constant":
+        return [duration * i / users for i in range(users)]
+    if curve == "ramp":
+        # Arrival rate grows linearly, so the CDF is t^2
+        return [duration * ((i / users) ** 0.5) for i in range(users)]
+    if curve == "spike":
+        # An announcement: 80% arrive in the first 10% of the window, the rest trickle in
+        head = int(users * 0.8)
+        return sorted([rng.uniform(0, duration * 0.1) for _ in range(head)]
+                      + [rng.uniform(duration * 0.1, duration) for _ in range(users - head)])
+    if curve == "poisson":
+        rate, t, times = users / duration, 0.0, []
+        for _ in range(users):
+            t += rng.expovariate(rate)
+            times.append(min(t, duration))
+        return times
+    raise ValueError(f"Unknown arrival curve: {curve}")
+
+
+class LoopLagMonitor:
+    """Samples how late a short sleep wakes up, i.e. how long the loop was blocked"""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+
+async def simulate_member(n, user, manager, roblox, args, rng, outcome):
+    ctx = FakeContext(user)
+    scale = args.time_scale
+    started = time.perf_counter()
+    await manager.start_verification(ctx, f"BenchUser{n}")
+    code = manager.codes.get(user.id)
+    if not user.sent or code is None:
+        outcome["abandoned"] += 1
+        return
+
+    edit_after = rng.uniform(*args.edit_seconds) * scale
+    first_check = edit_after + rng.uniform(-args.early_check_seconds, args.check_interval) * scale
+
+    async def edit_bio():
+        await asyncio.sleep(edit_after)
+        roblox.set_bio(n, f"Hi there {code}")
+
+    edit_task = asyncio.create_task(edit_bio())
+    await asyncio.sleep(max(0.0, first_check))
+    for attempt in range(1, args.max_checks + 1):
+        outcome["checks"] += 1
+        verified, _, _ = await manager.check_verification(FakeContext(user))
+        if verified:
+            outcome["latencies"].append((time.perf_counter() - started) / scale)
+            outcome["attempts"].append(attempt)
+            break
+        await asyncio.sleep(args.check_interval * scale)
+    else:
+        outcome["failed"] += 1
+    edit_task.cancel()
+
+
+async def flood(args):
+    rng = random.Random(args.seed)
+    users_total = args.users * args.multiplier
+    roblox = await RobloxEmulator(users=users_total, latency=args.roblox_latency_ms / 1000).start()
+    manager = await make_verification_manager(args.database_url, args.pool_size, dm_rate=args.dm_rate)
+    users = [FakeUser(f"member{i}", closed_dms=rng.random() < args.closed_dm_rate) for i in range(users_total)]
+    offsets = arrival_times(args.curve, users_total, args.duration * args.time_scale, rng)
+    outcome = {"latencies": [], "attempts": [], "checks": 0, "failed": 0, "abandoned": 0}
+
+    monitor = LoopLagMonitor()
+    tracemalloc.start()
+    memory_before, _ = tracemalloc.get_traced_memory()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    monitor.start()
+    started = time.perf_counter()
+
+    async def arrive(n, user, offset):
+        await asyncio.sleep(offset)
+        await simulate_member(n, user, manager, roblox, args, random.Random(args.seed + n), outcome)
+
+    try:
+        await asyncio.gather(*(arrive(n, u, o) for n, (u, o) in enumerate(zip(users, offsets), start=1)))
+    finally:
+        elapsed = time.perf_counter() - started
+        monitor.stop()
+        memory_after, memory_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        await manager.roblox_api.close_session()
+        await roblox.stop()
+        for task in asyncio.all_tasks() - {asyncio.current_task()}:
+            task.cancel()  # pending code-expiry timers
+
+    lag = summarize(monitor.samples, elapsed)
+    e2e = summarize(outcome["latencies"], elapsed / args.time_scale, outcome["failed"] + outcome["abandoned"])
+    pool = manager.pool
+    report = {
+        "users": users_total,
+        "verified": len(outcome["latencies"]),
+        "failed": outcome["failed"],
+        "abandoned_closed_dms": outcome["abandoned"],
+        "wall_clock_s": round(elapsed, 3),
+        "end_to_end_s": {k.replace("_ms", "_s"): round(v / 1000, 3) if k.endswith("_ms") else v
+                         for k, v in e2e.items()},
+        "checks": outcome["checks"],
+        "checks_per_verified_user": round(outcome["checks"] / max(1, len(outcome["latencies"])), 2),
+        "roblox_requests": dict(roblox.requests),
+        "roblox_requests_per_verified_user": round(sum(roblox.requests.values()) / max(1, len(outcome["latencies"])), 2),
+        "db_pool": {
+            "size": getattr(pool, "size", args.pool_size),
+            "acquires": getattr(pool, "acquires", None),
+            "waits": getattr(pool, "waits", None),
+            "wait_seconds": round(getattr(pool, "wait_seconds", 0.0), 3),
+        },
+        "dm_delivery": {k: v for k, v in manager.dm_delivery.snapshot().items() if k != "depth_by_priority"},
+        "event_loop_lag_ms": {k: lag[k] for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")},
+        "memory": {
+            "traced_growth_kib": round((memory_after - memory_before) / 1024, 1),
+            "traced_peak_kib": round(memory_peak / 1024, 1),
+            "max_rss_growth_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+        },
+    }
+    p95 = report["end_to_end_s"]["p95_s"]
+    report["slo"] = {
+        "p95_target_s": args.slo_p95_seconds,
+        "p95_s": p95,
+        "met": bool(outcome["latencies"]) and p95 <= args.slo_p95_seconds and not outcome["failed"],
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500, help="members at normal load")
+    parser.add_argument("--multiplier", type=int, default=1, help="load multiplier, e.g. 10 for 10x")
+    parser.add_argument("--duration", type=float, default=120, help="arrival window in unscaled seconds")
+    parser.add_argument("--curve", choices=CURVES, default="spike")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="multiplier applied to the arrival window and all think times")
+    parser.add_argument("--edit-seconds", type=float, nargs=2, default=(20, 90), metavar=("MIN", "MAX"),
+                        help="time between !verify and saving the bio")
+    parser.add_argument("--early-check-seconds", type=float, default=15,
+                        help="how far before the bio edit a first !check may come")
+    parser.add_argument("--check-interval", type=float, default=10, help="seconds between repeated !check")
+    parser.add_argument("--max-checks", type=int, default=10)
+    parser.add_argument("--closed-dm-rate", type=float, default=0.02)
+    parser.add_argument("--dm-rate", type=float, default=0,
+                        help="DMs/second through the DM queue, e.g. 10 for the bots' default (0: unpaced)")
+    parser.add_argument("--roblox-latency-ms", type=float, default=80)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument("--slo-p95-seconds", type=float, default=180,
+                        help="target p95 from !verify to a passing !check")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results_flood.json")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+    os.environ.setdefault("LOG_LEVELS", "discord=CRITICAL")
+    os.environ.setdefault("LOG_FORMAT", "text")
+    setup_logging()
+    output = os.path.abspath(args.output)
+    with tempfile.TemporaryDirectory(prefix="flood-") as workdir:
+        previous = os.getcwd()
+        os.chdir(workdir)
+        try:
+            report = asyncio.run(flood(args))
+        finally:
+            os.chdir(previous)
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("output", "database_url")}
+    settings["database"] = "postgres" if args.database_url else "sqlite"
+    write_results(output, "verify_flood", report, settings)
+
+    e2e, slo = report["end_to_end_s"], report["slo"]
+    print(f"{report['verified']}/{report['users']} verified ({report['failed']} failed, "
+          f"{report['abandoned_closed_dms']} closed DMs) in {report['wall_clock_s']}s wall clock")
+    print(f"end-to-end p50/p95/p99: {e2e['p50_s']}s / {e2e['p95_s']}s / {e2e['p99_s']}s")
+    print(f"roblox requests: {report['roblox_requests']} ({report['roblox_requests_per_verified_user']}/user)")
+    print(f"db pool waits: {report['db_pool']['waits']} ({report['db_pool']['wait_seconds']}s)")
+    print(f"event-loop lag p99/max: {report['event_loop_lag_ms']['p99_ms']}ms / {report['event_loop_lag_ms']['max_ms']}ms")
+    print(f"memory growth: {report['memory']['traced_growth_kib']} KiB (peak {report['memory']['traced_peak_kib']} KiB)")
+    print(f"SLO p95 <= {slo['p95_target_s']}s: {'MET' if slo['met'] else 'MISSED'}")
+    print(f"\nResults written to {output}")
+    return 0 if slo["met"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,78 +1,68 @@
+import logging
 import os
+import io
+import asyncio
 import discord
+from discord import app_commands
 from discord.ext import commands
-from datetime import datetime
-import aiohttp
+from datetime import datetime, timedelta, timezone
+from config import Config
 from verification_manager import VerificationManager  # updated version using Supabase
+from log_dispatcher import LogDispatcher
+from audit_log import AuditLog
+from single_flight import REGISTRY as SINGLE_FLIGHTS, SingleFlight
+from guild_settings import SETTINGS, GuildSettings
+from cache_snapshot import CacheSnapshot
+from sharding import make_bot, shard_summary
+from gateway_meter import METERS as GATEWAY_METERS, GatewayEventMeter
+from dm_delivery import DELIVERIES as DM_DELIVERIES, DMDelivery
+from profiler import PROFILER
+from logging_setup import install_command_logging, setup_logging
+
+logger = logging.getLogger(__name__)
 
 # ===== TOKEN (Render Secret) =====
 TOKEN = os.getenv("BOT1_TOKEN")  # Set in Render > Environment > Secrets
 DATABASE_URL = os.getenv("DATABASE_URL")  # Supabase Postgres URL
 
 if TOKEN:
-    print("✅ Token loaded from Render secret BOT1_TOKEN.")
+    logger.info("Token loaded from Render secret BOT1_TOKEN.")
 else:
-    print("❌ No token found. Set BOT1_TOKEN in Render Environment secrets.")
+    logger.error("No token found. Set BOT1_TOKEN in Render Environment secrets.")
 
 if DATABASE_URL:
-    print("✅ Database URL loaded from Render secret DATABASE_URL.")
+    logger.info("Database URL loaded from Render secret DATABASE_URL.")
 else:
-    print("❌ No DATABASE_URL found. Set DATABASE_URL in Render Environment secrets.")
-
-# ===== CONFIG (update IDs/names to your server) =====
-GUILD_ID = 1406058084484518021
-VERIFY_CHANNEL_ID = 1406090150953615372
-VERIFIED_ROLE_NAME = "Verified"
-OWNER_ROLE_NAME = "Blox Entertainment Staff"
-VERIFICATION_LOG_CHANNEL_ID = 1406142661752131634
-ADMIN_LOG_CHANNEL_ID = 1406145134558711920
+    logger.error("No DATABASE_URL found. Set DATABASE_URL in Render Environment secrets.")
 
 # ===== BOT SETUP =====
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-
-bot = commands.Bot(command_prefix="!", intents=intents)
-verification_manager = VerificationManager(bot)
+# Channel IDs, role names and expiry are per guild: see guild_settings.py and !settings.
+# Intents and prefix/slash commands follow COMMAND_MODE (see sharding.bot_intents).
+bot = make_bot("bot1", command_prefix="!")
+install_command_logging(bot, "bot1")
+gateway_meter = GatewayEventMeter(bot, "bot1", log_interval=Config.GATEWAY_METER_LOG_SECONDS)
+guild_settings = GuildSettings()
+dm_delivery = DMDelivery("bot1")
+verification_manager = VerificationManager(bot, dm_delivery, index_usernames=True)
+log_dispatcher = LogDispatcher(bot)
+audit_log = AuditLog("bot1")
+cache_snapshot = CacheSnapshot("bot1")
+cache_snapshot.register("roblox_users", verification_manager.roblox_api.users)
+cache_snapshot.register("thumbnails", verification_manager.roblox_api.thumbnails.cache)
+cache_snapshot.register("verified", verification_manager.verified_cache)
+check_flight = SingleFlight("check", cooldown=Config.CHECK_COOLDOWN_SECONDS)
+verify_flight = SingleFlight("verify", cooldown=Config.VERIFY_COOLDOWN_SECONDS)
 
 # ===== ROBLOX HELPERS =====
-ROBLOX_HEADSHOT = "https://thumbnails.roblox.com/v1/users/avatar-headshot"
 ROBLOX_PROFILE_FMT = "https://www.roblox.com/users/{}/profile"
 
 async def fetch_roblox_id(username: str) -> int | None:
-    url = "https://users.roblox.com/v1/usernames/users"
-    payload = {"usernames": [username], "excludeBannedUsers": True}
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload, timeout=10) as resp:
-                if resp.status != 200:
-                    return None
-                data = await resp.json()
-                if not data.get("data"):
-                    return None
-                return int(data["data"][0]["id"])
-    except Exception:
-        return None
+    # Shares the username -> ID cache (and its warm-start snapshot) with !check
+    user = await verification_manager.roblox_api.get_user_by_username(username)
+    return int(user["id"]) if user and user.get("id") else None
 
 async def fetch_headshot_url(user_id: int) -> str | None:
-    params = {
-        "userIds": str(user_id),
-        "size": "150x150",
-        "format": "Png",
-        "isCircular": "true",
-    }
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(ROBLOX_HEADSHOT, params=params, timeout=10) as resp:
-                if resp.status != 200:
-                    return None
-                data = await resp.json()
-                items = data.get("data") or []
-                if not items:
-                    return None
-                return items[0].get("imageUrl")
-    except Exception:
-        return None
+    return await verification_manager.roblox_api.thumbnails.get("headshot", user_id)
 
 def roblox_profile_url(user_id: int | None) -> str | None:
     return ROBLOX_PROFILE_FMT.format(user_id) if user_id else None
@@ -96,17 +86,25 @@ def format_verified_at(raw_value) -> str:
 # ===== EVENTS =====
 @bot.event
 async def on_ready():
-    print(f"✅ Logged in as {bot.user}")
+    logger.info("Logged in as %s", bot.user)
+    await guild_settings.start()
+    # Discord names of verified members, for !info/!revoke suggestions (the Roblox names load with the DB)
+    verification_manager.index_discord_names(bot.get_all_members())
     if DATABASE_URL:
         await verification_manager.connect_db(DATABASE_URL)
 
+@bot.event
+async def on_user_update(before: discord.User, after: discord.User):
+    if before.name != after.name:
+        verification_manager.usernames.set_discord(after.id, after.name)
+
 @bot.event
 async def on_message(message: discord.Message):
     if message.author == bot.user:
         return
 
     if message.content.startswith("!verify"):
-        if message.guild is None or message.channel.id != VERIFY_CHANNEL_ID:
+        if message.guild is None or not guild_settings.is_channel(message.channel, "verify"):
             await message.channel.send("❌ Please use !verify only in the verify channel.")
             return
 
@@ -118,49 +116,78 @@ async def on_message(message: discord.Message):
     await bot.process_commands(message)
 
 # ===== COMMANDS =====
-@bot.command()
+# Hybrid commands: `!verify` as before, and `/verify` when application commands are enabled
+@bot.hybrid_command(description="Start verifying your Roblox account")
+@app_commands.describe(roblox_username="Your Roblox username")
+@app_commands.guild_only()
 async def verify(ctx: commands.Context, roblox_username: str = None):
-    if ctx.guild is None or ctx.channel.id != VERIFY_CHANNEL_ID:
+    if ctx.guild is None or not guild_settings.is_channel(ctx.channel, "verify"):
         await ctx.reply("❌ Please use this command only in the verify channel.", mention_author=True)
         return
     if roblox_username is None:
         await ctx.reply("❌ Please provide your Roblox username. Example: `!verify Builderman`", mention_author=True)
         return
-    await verification_manager.start_verification(ctx, roblox_username)
+    # The DM waits its turn in the delivery queue, which can outlast an interaction's 3 seconds
+    await ctx.defer()
+    # Repeats within the cooldown reuse the code already sent instead of DMing a new one
+    expiry_minutes = guild_settings.get(ctx.guild)["code_expiry_minutes"]
+    # Only a delivered DM starts the cooldown: after a failure (DMs closed, queue full) a retry sends again
+    dm_sent, source = await verify_flight.run(
+        (ctx.author.id, roblox_username.lower()),
+        lambda: verification_manager.start_verification(ctx, roblox_username, expiry_minutes),
+        cache_if=bool
+    )
+    if source != "executed":
+        await ctx.reply(verification_manager.DM_SENT_REPLY if dm_sent else verification_manager.DM_FAILED_REPLY,
+                        mention_author=True)
 
-@bot.command()
+@bot.hybrid_command(description="Finish verification after adding the code to your Roblox bio")
 async def check(ctx: commands.Context):
-    if ctx.guild is not None:
+    # /check may be used anywhere since its reply is ephemeral; !check stays DM-only
+    if ctx.guild is not None and ctx.interaction is None:
         await ctx.reply("❌ Please use this command only in DMs.", mention_author=True)
         return
 
+    await ctx.defer(ephemeral=True)
+    # One Roblox lookup per user at a time; spammed !check calls share its answer. Only a success
+    # is reused afterwards, so a member who just fixed their bio gets a fresh check
+    (_, reply), _ = await check_flight.run(ctx.author.id, lambda: _run_check(ctx),
+                                           cache_if=lambda result: result[0])
+    await ctx.send(reply, ephemeral=True)
+
+async def _run_check(ctx: commands.Context) -> tuple:
+    """Run one verification check and return (verified, reply for the user)"""
+    # The guild !verify was run in; read before the check clears the pending state
+    guild_id = verification_manager.guild_ids.get(ctx.author.id) or Config.HOME_GUILD_ID
     verified, roblox_user, roblox_user_id = await verification_manager.check_verification(ctx)
     if not verified:
-        await ctx.send("❌ Verification failed or you have not completed verification yet. Please make sure you've added the code to your Roblox bio.")
-        return
+        return False, "❌ Verification failed or you have not completed verification yet. Please make sure you've added the code to your Roblox bio."
 
-    guild = bot.get_guild(GUILD_ID) or await bot.fetch_guild(GUILD_ID)
+    guild = bot.get_guild(guild_id) or await bot.fetch_guild(guild_id)
     try:
         member = guild.get_member(ctx.author.id) or await guild.fetch_member(ctx.author.id)
     except discord.NotFound:
-        await ctx.send("❌ Could not find your member record in the server.")
-        return
+        return False, "❌ Could not find your member record in the server."
 
-    role = discord.utils.get(guild.roles, name=VERIFIED_ROLE_NAME)
+    verified_role_name = guild_settings.get(guild)["verified_role_name"]
+    role = verification_manager.guild_index.get_role(guild, verified_role_name)
     if role is None:
-        await ctx.send(f"❌ The role '{VERIFIED_ROLE_NAME}' does not exist.")
-        return
+        return False, f"❌ The role '{verified_role_name}' does not exist."
 
+    verification_manager.usernames.set_discord(member.id, member.name)
     try:
         await member.add_roles(role, reason="User verified successfully")
     except discord.Forbidden:
-        await ctx.send("❌ I don't have permission to give you that role. Please contact an admin.")
-        return
+        return False, "❌ I don't have permission to give you that role. Please contact an admin."
 
-    await ctx.send(f"✅ You are now verified as **{roblox_user}** and have been given the '{VERIFIED_ROLE_NAME}' role!")
+    audit_log.record("verify", actor=ctx.author, target=roblox_user, target_id=ctx.author.id, guild=guild,
+                     roblox_user_id=roblox_user_id)
+    asyncio.create_task(_log_verification(ctx, guild, roblox_user, roblox_user_id))
+    return True, f"✅ You are now verified as **{roblox_user}** and have been given the '{verified_role_name}' role!"
 
+async def _log_verification(ctx: commands.Context, guild, roblox_user, roblox_user_id):
     # Build rich log
-    log_channel = bot.get_channel(VERIFICATION_LOG_CHANNEL_ID)
+    log_channel = guild_settings.channel(guild, "verification_log", verification_manager.guild_index)
     if log_channel:
         profile_url = roblox_profile_url(roblox_user_id)
         avatar_url = await fetch_headshot_url(roblox_user_id) if roblox_user_id else None
@@ -179,31 +206,53 @@ async def check(ctx: commands.Context):
             embed.url = profile_url
         if avatar_url:
             embed.set_thumbnail(url=avatar_url)
-        await log_channel.send(embed=embed)
+        log_dispatcher.dispatch(log_channel, embed)
+
+# ===== USERNAME SUGGESTIONS =====
+def _suggestion_label(match) -> str:
+    label = match["roblox_username"]
+    if match["discord_name"]:
+        label += f" (@{match['discord_name']})"
+    return label[:100]
+
+def _did_you_mean(target: str) -> str:
+    """Suggestions to append to a "not found" reply, from the username index"""
+    matches = verification_manager.usernames.suggest(target, limit=5)
+    if not matches:
+        return ""
+    return "\nDid you mean: " + ", ".join(f"`{_suggestion_label(m)}`" for m in matches) + "?"
+
+async def verified_user_autocomplete(interaction: discord.Interaction, current: str):
+    """Verified Roblox usernames and Discord names starting with (or close to) what staff typed"""
+    if not guild_settings.is_staff(interaction.user):
+        return []
+    return [app_commands.Choice(name=_suggestion_label(m), value=m["roblox_username"])
+            for m in verification_manager.usernames.suggest(current)]
 
 # ===== INFO COMMAND =====
-@bot.command()
+@bot.hybrid_command(description="Look up a member's verification (staff)")
+@app_commands.describe(target="Roblox username or @mention")
+@app_commands.guild_only()
 async def info(ctx: commands.Context, target: str = None):
-    if OWNER_ROLE_NAME not in [role.name for role in getattr(ctx.author, "roles", [])]:
+    if not guild_settings.is_staff(ctx.author):
         await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
         return
     if not target:
         await ctx.reply("❌ Please provide a Roblox username or Discord mention.", mention_author=True)
         return
+    await ctx.defer()
 
     discord_id = None
     member = None
-    guild = bot.get_guild(GUILD_ID) or await bot.fetch_guild(GUILD_ID)
+    result = None
+    guild = ctx.guild
 
     if target.startswith("<@") and target.endswith(">"):
         discord_id = int(target.replace("<@", "").replace(">", "").replace("!", ""))
         member = guild.get_member(discord_id) or await guild.fetch_member(discord_id)
     else:
         try:
-            result = await verification_manager.db.fetchrow(
-                "SELECT discord_id, roblox_username FROM verifications WHERE LOWER(roblox_username) = LOWER($1)",
-                target
-            )
+            result = await verification_manager.find_verification(target)
             if result:
                 discord_id = result["discord_id"]
                 member = guild.get_member(discord_id) or await guild.fetch_member(discord_id)
@@ -211,7 +260,7 @@ async def info(ctx: commands.Context, target: str = None):
             pass
 
     if discord_id is None or not member:
-        await ctx.reply(f"❌ No verification record found for {target}.", mention_author=True)
+        await ctx.reply(f"❌ No verification record found for {target}.{_did_you_mean(target)}", mention_author=True)
         return
 
     roblox_username = result["roblox_username"] if result else "Unknown"
@@ -235,8 +284,10 @@ async def info(ctx: commands.Context, target: str = None):
     embed.add_field(name="🕒 Verified at", value=format_verified_at(datetime.utcnow()), inline=False)
 
     await ctx.reply(embed=embed)
+    audit_log.record("info_lookup", actor=ctx.author, target=roblox_username, target_id=member.id, guild=guild,
+                     query=target, roblox_user_id=roblox_user_id)
 
-    log_channel = bot.get_channel(ADMIN_LOG_CHANNEL_ID)
+    log_channel = guild_settings.channel(guild, "admin_log", verification_manager.guild_index)
     if log_channel:
         log_embed = discord.Embed(
             title="Info Command Executed",
@@ -252,33 +303,281 @@ async def info(ctx: commands.Context, target: str = None):
             log_embed.url = profile_url
         if avatar_url:
             log_embed.set_thumbnail(url=avatar_url)
-        await log_channel.send(embed=log_embed)
+        log_dispatcher.dispatch(log_channel, log_embed)
+
+info.autocomplete("target")(verified_user_autocomplete)
 
 # ===== REVOKE COMMAND =====
-@bot.command()
+@bot.hybrid_command(description="Revoke a member's verification (staff)")
+@app_commands.describe(target="Roblox username or @mention")
+@app_commands.guild_only()
 async def revoke(ctx: commands.Context, target: str = None):
     if target is None:
         await ctx.reply("❌ Please provide a Roblox username or Discord mention. Example: `!revoke Builderman` or `!revoke @User`", mention_author=True)
         return
-    if OWNER_ROLE_NAME not in [role.name for role in getattr(ctx.author, "roles", [])]:
+    if not guild_settings.is_staff(ctx.author):
         await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
         return
 
-    guild = bot.get_guild(GUILD_ID) or await bot.fetch_guild(GUILD_ID)
-
+    guild = ctx.guild
+    await ctx.defer()
     removed, affected_discord_user, affected_roblox_username = await verification_manager.revoke_verification(
-        guild, target, VERIFIED_ROLE_NAME
+        guild, target, guild_settings.get(guild)["verified_role_name"]
     )
 
     if not removed:
-        await ctx.reply(f"❌ Could not find any verification record for `{target}`.", mention_author=True)
+        await ctx.reply(f"❌ Could not find any verification record for `{target}`.{_did_you_mean(target)}",
+                        mention_author=True)
         return
 
+    if affected_discord_user is not None:
+        # Don't hand a cooled-down "you are now verified" back to the revoked member
+        check_flight.forget(affected_discord_user.id)
     await ctx.reply(f"✅ Verification revoked for `{target}` and role removed if applicable.", mention_author=True)
+    audit_log.record("revoke", actor=ctx.author, target=affected_roblox_username,
+                     target_id=getattr(affected_discord_user, "id", None), guild=guild, query=target)
+
+revoke.autocomplete("target")(verified_user_autocomplete)
+
+# ===== AUDIT COMMAND =====
+AUDIT_ACTION_ICONS = {"verify": "✅", "revoke": "⛔", "info_lookup": "🔎", "embed_send": "📢",
+                      "ad_submit": "📝", "ad_approve": "🟢", "ad_deny": "🔴",
+                      "credits_grant": "💳", "credits_refund": "💳", "settings_change": "⚙️"}
+
+def _format_audit_event(event) -> str:
+    when = int(event["occurred_at"].timestamp())
+    actor = f"<@{event['actor_id']}>" if event["actor_id"] else "system"
+    target = event["target"] or (f"<@{event['target_id']}>" if event["target_id"] else "—")
+    icon = AUDIT_ACTION_ICONS.get(event["action"], "•")
+    return f"<t:{when}:R> {icon} `{event['action']}` {actor} → {target}"
+
+@bot.hybrid_command(description="Show recent audit events (staff)")
+@app_commands.describe(target="@mention, Roblox username or other target to filter by", hours="How far back to look (default 24)")
+@app_commands.guild_only()
+async def audit(ctx: commands.Context, target: str = None, hours: int = 24):
+    """Show recent audit events, optionally for one @user or Roblox username/target"""
+    if not guild_settings.is_staff(ctx.author):
+        await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
+        return
+    if not audit_log.dsn:
+        await ctx.reply("❌ Audit events are not stored (DATABASE_URL not set).", mention_author=True)
+        return
+
+    await ctx.defer()
+    since = datetime.now(timezone.utc) - timedelta(hours=max(1, hours))
+    filters = {"since": since, "limit": 25}
+    if target and target.startswith("<@") and target.endswith(">"):
+        filters["target_id"] = int(target.strip("<@!>"))
+    elif target:
+        filters["target"] = target
+    try:
+        events = await audit_log.query(**filters)
+    except Exception as e:
+        logger.warning("Audit query failed: %s", e)
+        await ctx.reply("❌ Could not query the audit log right now.", mention_author=True)
+        return
+
+    if not events:
+        await ctx.reply(f"📭 No audit events in the last {hours}h" + (f" for `{target}`." if target else "."), mention_author=True)
+        return
+    embed = discord.Embed(
+        title="Audit Log" + (f" — {target}" if target else ""),
+        description="\n".join(_format_audit_event(e) for e in events)[:4096],
+        color=discord.Color.dark_grey(),
+        timestamp=datetime.utcnow()
+    )
+    embed.set_footer(text=f"Newest {len(events)} event(s) in the last {hours}h")
+    await ctx.reply(embed=embed, mention_author=True)
+
+# ===== GUARD STATS COMMAND =====
+@bot.hybrid_command(description="Duplicate command runs collapsed by the guards (staff)")
+@app_commands.guild_only()
+async def guardstats(ctx: commands.Context):
+    """Show how many duplicate !verify/!check/!advertise runs were collapsed"""
+    if not guild_settings.is_staff(ctx.author):
+        await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
+        return
+    embed = discord.Embed(title="Duplicate Command Guards", color=discord.Color.dark_grey(), timestamp=datetime.utcnow())
+    for name, flight in sorted(SINGLE_FLIGHTS.items()):
+        st = flight.stats
+        embed.add_field(
+            name=f"!{name} (cooldown {flight.cooldown:g}s)",
+            value=(f"Calls: {st['calls']} • Executed: {st['executed']} • Errors: {st['errors']}\n"
+                   f"Avoided: **{flight.avoided}** (shared {st['shared']}, cooldown {st['cooldown']}, busy {st['busy']})"),
+            inline=False
+        )
+    await ctx.reply(embed=embed, mention_author=True)
+
+# ===== GUILD SETTINGS COMMAND =====
+async def setting_key_autocomplete(interaction: discord.Interaction, current: str):
+    current = current.lower()
+    return [app_commands.Choice(name=key, value=key) for key in SETTINGS if current in key][:25]
+
+@bot.hybrid_command(name="settings", description="Show or change this server's settings (staff or Manage Server)")
+@app_commands.describe(key="Setting to change; leave empty to list them all", value="New value, or `default` to reset")
+@app_commands.autocomplete(key=setting_key_autocomplete)
+@app_commands.guild_only()
+async def settings_command(ctx: commands.Context, key: str = None, *, value: str = None):
+    """Show this server's settings, or change one: `!settings verify_channel_id #verify` (`default` to reset)"""
+    if ctx.guild is None:
+        await ctx.reply("❌ Please use this command in a server.", mention_author=True)
+        return
+    # Server managers can always configure, so a new partner guild can name its staff role first
+    if not (guild_settings.is_staff(ctx.author) or ctx.author.guild_permissions.manage_guild):
+        await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
+        return
+
+    if key is None:
+        current, overridden = guild_settings.get(ctx.guild), guild_settings.overrides(ctx.guild)
+        lines = [f"{'**' if k in overridden else ''}`{k}`{'**' if k in overridden else ''} = `{current[k]}`"
+                 for k in SETTINGS]
+        embed = discord.Embed(title=f"Settings — {ctx.guild.name}", description="\n".join(lines),
+                              color=discord.Color.dark_grey(), timestamp=datetime.utcnow())
+        embed.set_footer(text="Bold settings are set for this server; the rest are defaults.")
+        await ctx.reply(embed=embed, mention_author=True)
+        return
+
+    key = key.lower()
+    if key not in SETTINGS:
+        await ctx.reply(f"❌ Unknown setting `{key}`. Run `!settings` to list them.", mention_author=True)
+        return
+    if value is None:
+        await ctx.reply(f"❌ Please provide a value, or `default` to reset. Example: `!settings {key} default`",
+                        mention_author=True)
+        return
+    try:
+        parsed = await guild_settings.set(ctx.guild.id, key, value, actor_id=ctx.author.id)
+    except ValueError:
+        await ctx.reply(f"❌ `{key}` expects a number, ID or mention.", mention_author=True)
+        return
+    except Exception as e:
+        logger.warning("Failed to save guild setting %s: %s", key, e, extra={"guild_id": ctx.guild.id})
+        await ctx.reply("❌ Could not save the setting right now.", mention_author=True)
+        return
+
+    shown = "default" if parsed is None else f"`{parsed}`"
+    await ctx.reply(f"✅ `{key}` set to {shown}.", mention_author=True)
+    audit_log.record("settings_change", actor=ctx.author, target=key, guild=ctx.guild, value=parsed)
+
+# ===== SHARDS COMMAND =====
+@bot.hybrid_command(description="Latency and guild count per gateway shard (staff)")
+@app_commands.guild_only()
+async def shards(ctx: commands.Context):
+    """Show latency and guild count per gateway shard"""
+    if not guild_settings.is_staff(ctx.author):
+        await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
+        return
+    rows = shard_summary(bot)
+    lines = [f"Shard {shard_id}: {latency if latency is not None else '—'} ms, {guilds} guild(s)"
+             for shard_id, latency, guilds in rows]
+    await ctx.reply(f"🧩 {len(bot.guilds)} guild(s) on {len(rows)} shard(s)\n```\n" + "\n".join(lines) + "\n```",
+                    mention_author=True)
+
+# ===== GATEWAY EVENTS COMMAND =====
+@bot.hybrid_command(description="Gateway events per second for each bot (staff)")
+@app_commands.describe(action="`reset` to start a new measurement")
+@app_commands.guild_only()
+async def gateway(ctx: commands.Context, action: str = None):
+    """Show gateway events/second per bot and event type; `!gateway reset` starts a new measurement"""
+    if not guild_settings.is_staff(ctx.author):
+        await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
+        return
+    if action == "reset":
+        for meter in GATEWAY_METERS.values():
+            meter.reset()
+        await ctx.reply("✅ Gateway event counters reset.", mention_author=True)
+        return
+
+    embed = discord.Embed(title="Gateway Events", color=discord.Color.dark_grey(), timestamp=datetime.utcnow())
+    for name, meter in sorted(GATEWAY_METERS.items()):
+        snap = meter.snapshot()
+        top = "\n".join(f"`{event}` {stats['per_second']}/s ({stats['count']})"
+                        for event, stats in list(snap["by_type"].items())[:8])
+        embed.add_field(
+            name=f"{name}: {snap['per_second']}/s (last {meter.window}s: {snap['per_second_recent']}/s)",
+            value=f"{snap['events']} event(s) in {snap['uptime_s']:.0f}s\n{top}"[:1024],
+            inline=False
+        )
+    embed.set_footer(text=f"COMMAND_MODE={Config.COMMAND_MODE}")
+    await ctx.reply(embed=embed, mention_author=True)
+
+# ===== DM DELIVERY COMMAND =====
+@bot.hybrid_command(description="DM queue depth, delivery latency and outcomes (staff)")
+@app_commands.guild_only()
+async def dmqueue(ctx: commands.Context):
+    """Show DM queue depth, delivery latency and outcomes for each bot"""
+    if not guild_settings.is_staff(ctx.author):
+        await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
+        return
+    embed = discord.Embed(title="DM Delivery", color=discord.Color.dark_grey(), timestamp=datetime.utcnow())
+    for name, delivery in sorted(DM_DELIVERIES.items()):
+        snap = delivery.snapshot()
+        queued = ", ".join(f"{kind} {n}" for kind, n in snap["depth_by_priority"].items())
+        latency = "\n".join(f"{kind}: p50 {lat['p50_ms']}ms • p95 {lat['p95_ms']}ms ({lat['samples']})"
+                             for kind, lat in snap["latency"].items() if lat["samples"])
+        embed.add_field(
+            name=f"{name}: {snap['depth']} queued (max {snap['max_depth']}/{snap['max_queued']})",
+            value=(f"Queued: {queued}\n"
+                   f"{snap['workers']} worker(s) at {snap['rate']:g}/s • Sent {snap['sent']} • Closed {snap['closed']} "
+                   f"({snap['closed_skipped']} skipped) • Failed {snap['failed']} • Overloaded {snap['overloaded']}\n"
+                   f"{latency or 'No deliveries yet'}")[:1024],
+            inline=False
+        )
+    await ctx.reply(embed=embed, mention_author=True)
+
+# ===== PROFILER COMMAND =====
+@bot.hybrid_command(name="profile", description="Profile the bots' event loop (staff)")
+@app_commands.describe(action="Seconds to sample (default 30), or `start` / `stop`")
+@app_commands.guild_only()
+async def profile_command(ctx: commands.Context, action: str = "30"):
+    """Sample all bots for N seconds (`!profile 60`), or `!profile start` ... `!profile stop`"""
+    if not guild_settings.is_staff(ctx.author):
+        await ctx.reply("❌ You do not have permission to use this command.", mention_author=True)
+        return
+    PROFILER.attach()
+    if action == "start":
+        if not PROFILER.start():
+            await ctx.reply("❌ The profiler is already running.", mention_author=True)
+            return
+        await ctx.reply(f"⏺️ Profiler started. Run `!profile stop` for the results (it stops by itself after "
+                        f"{PROFILER.max_seconds}s).", mention_author=True)
+        return
+    if action == "stop":
+        result = PROFILER.stop()
+        if result is None:
+            await ctx.reply("❌ The profiler is not running.", mention_author=True)
+            return
+    else:
+        try:
+            seconds = PROFILER.window(action)
+        except ValueError:
+            await ctx.reply("❌ Usage: `!profile [seconds]`, `!profile start` or `!profile stop`.", mention_author=True)
+            return
+        await ctx.reply(f"⏺️ Profiling for {seconds:g}s...", mention_author=True)
+        result = await PROFILER.profile(seconds)
+        if result is None:
+            await ctx.reply("❌ The profiler is already running.", mention_author=True)
+            return
+
+    busy = result.samples - result.idle
+    embed = discord.Embed(
+        title="Profile",
+        description=(f"{result.samples} samples over {result.duration:.1f}s • loop busy {result.busy:.1%} • "
+                     f"profiler overhead {result.overhead:.2%}"),
+        color=discord.Color.dark_grey(), timestamp=datetime.utcnow()
+    )
+    embed.add_field(name="By command", inline=False, value="\n".join(
+        f"`{tag}` {count} ({count / busy:.0%})" for tag, count in result.by_tag()[:10])[:1024] or "No busy samples")
+    embed.add_field(name="Self time", inline=False, value="\n".join(
+        f"`{label}` {count} ({count / busy:.0%})" for label, count in result.top_functions(10))[:1024] or "—")
+    embed.set_footer(text="Attached: collapsed stacks for flamegraph.pl or speedscope.app")
+    file = discord.File(io.BytesIO(result.collapsed().encode()),
+                        filename=f"profile-{datetime.utcnow():%Y%m%d-%H%M%S}.txt")
+    await ctx.reply(embed=embed, file=file, mention_author=True)
 
 # ===== PURGE COMMAND =====
 @bot.command()
-@commands.has_role(OWNER_ROLE_NAME)
+@guild_settings.staff_only()
 async def purge(ctx: commands.Context, amount: int):
     if amount < 1:
         await ctx.reply("❌ Please specify a number greater than 0.", mention_author=True)
@@ -290,10 +589,15 @@ async def purge(ctx: commands.Context, amount: int):
 # ===== RUNNER =====
 async def run_bot():
     if not TOKEN:
-        print("❌ bot1: No token — not starting.")
+        logger.error("No token — not starting.")
         return
-    await bot.start(TOKEN)
+    # Warm the caches before connecting so the first commands after a deploy don't all miss
+    await cache_snapshot.start()
+    try:
+        await bot.start(TOKEN)
+    finally:
+        await cache_snapshot.stop()
 
 if __name__ == "__main__":
-    import asyncio
+    setup_logging()
     asyncio.run(run_bot())
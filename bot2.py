@@ -1,14 +1,29 @@
+import logging
 import os
+import re
+import shlex
 import asyncio
 import discord
+from discord import app_commands
 from discord.ext import commands
-from discord.ui import Select, View
+from discord.ui import Modal, Select, TextInput, View
 from datetime import datetime
+from guild_index import GuildIndex
+from broadcast import Broadcaster
+from channel_picker import ChannelPicker, SendableChannelCache
+from embed_templates import EmbedTemplateStore
+from log_dispatcher import LogDispatcher
+from audit_log import AuditLog
+from guild_settings import GuildSettings
+from sharding import make_bot
+from gateway_meter import GatewayEventMeter
+from config import Config
+from logging_setup import install_command_logging
+
+logger = logging.getLogger(__name__)
 
 BOT_NAME = "Blox Entertainment Information"
 BOT_PREFIX = "!"
-OWNER_ROLE_NAME = "Blox Entertainment Staff"
-LOG_CHANNEL_NAME = "administration-logs"
 
 # ===== TOKEN (robust: tries multiple environment variable names) =====
 TOKEN = (
@@ -18,15 +33,20 @@ TOKEN = (
 )
 
 if TOKEN:
-    print("✅ Token loaded (INFORMATION_TICKET/BOT2_TOKEN/DISCORD_BOT_TOKEN).")
+    logger.info("Token loaded (INFORMATION_TICKET/BOT2_TOKEN/DISCORD_BOT_TOKEN).")
 else:
-    print("❌ No token found. Set INFORMATION_TICKET (or BOT2_TOKEN / DISCORD_BOT_TOKEN) in Secrets/Env.")
-
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+    logger.error("No token found. Set INFORMATION_TICKET (or BOT2_TOKEN / DISCORD_BOT_TOKEN) in Secrets/Env.")
 
-bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents)
+bot = make_bot("bot2", command_prefix=BOT_PREFIX)
+install_command_logging(bot, "bot2")
+gateway_meter = GatewayEventMeter(bot, "bot2", log_interval=Config.GATEWAY_METER_LOG_SECONDS)
+guild_settings = GuildSettings()
+staff_only = guild_settings.staff_only  # the staff role is configured per guild
+guild_index = GuildIndex(bot)
+sendable_channels = SendableChannelCache(bot)
+log_dispatcher = LogDispatcher(bot)
+audit_log = AuditLog("bot2")
+broadcaster = Broadcaster(concurrency=int(os.getenv("BROADCAST_CONCURRENCY", "5")))
 
 color_map = {
     "Blue": discord.Color.blue(),
@@ -42,6 +62,8 @@ color_map = {
     "Default": discord.Color.default(),
 }
 
+templates = EmbedTemplateStore(color_map)
+
 async def ask_user(ctx, question, timeout=120):
     await ctx.reply(question, mention_author=True)
     def check(m):
@@ -67,52 +89,77 @@ class ColorSelect(Select):
         self.embed_data["color"] = selected_color
         await interaction.response.send_message(f"✅ Color set to **{selected_color}**.", ephemeral=True)
 
-class ChannelSelect(Select):
-    def __init__(self, embed_data, channels):
-        options = [
-            discord.SelectOption(label=ch.name, value=str(ch.id))
-            for ch in channels
-        ]
-        super().__init__(placeholder="Select target channel", options=options)
-        self.embed_data = embed_data
-
-    async def callback(self, interaction: discord.Interaction):
-        channel_id = int(self.values[0])
-        self.embed_data["channel"] = channel_id
-        await interaction.response.send_message("✅ Channel selected.", ephemeral=True)
-
 def truncate_field(text, limit=1024):
     if text is None:
         return "None"
     return text if len(text) <= limit else text[:limit-3] + "..."
 
-# ===== message command =====
-@bot.command()
-@commands.has_role(OWNER_ROLE_NAME)
-async def message(ctx):
+def build_embed(embed_data):
+    embed = discord.Embed(
+        title=embed_data["title"],
+        description=embed_data["description"],
+        color=color_map.get(embed_data["color"], discord.Color.default()),
+    )
+    if embed_data["footer"]:
+        embed.set_footer(text=embed_data["footer"])
+    return embed
+
+class EmbedContentModal(Modal):
+    """Title, description and footer in one form, for slash commands"""
+    embed_title = TextInput(label="Title", required=False, max_length=256)
+    description = TextInput(label="Description", style=discord.TextStyle.paragraph, required=False, max_length=4000)
+    footer = TextInput(label="Footer", required=False, max_length=2048)
+
+    def __init__(self):
+        super().__init__(title="Embed content", timeout=300)
+        self.interaction = None
+
+    async def on_submit(self, interaction: discord.Interaction):
+        self.interaction = interaction
+        self.stop()
+
+async def collect_embed_data(ctx):
+    """Run the title/description/footer/color wizard; returns embed_data or None if cancelled"""
     embed_data = {
         "title": None,
         "description": None,
         "footer": None,
         "color": "Default",
         "channel": None,
+        "channels": [],
     }
 
+    if ctx.interaction is not None:
+        # 1-3. One modal instead of three message prompts
+        modal = EmbedContentModal()
+        await ctx.interaction.response.send_modal(modal)
+        if await modal.wait() or modal.interaction is None:
+            return None
+        # A modal answers the slash command, so the rest of the wizard replies to the modal submission
+        ctx.interaction = modal.interaction
+        embed_data["title"] = modal.embed_title.value.strip() or None
+        embed_data["description"] = modal.description.value.strip() or None
+        embed_data["footer"] = modal.footer.value.strip() or None
+        return await _select_color(ctx, embed_data)
+
     # 1. Ask for Title
     title = await ask_user(ctx, "Please reply with the embed **title** (or type 'none' to skip):")
-    if title is None: return
+    if title is None: return None
     embed_data["title"] = None if title.lower() == "none" else title
 
     # 2. Ask for Description
     description = await ask_user(ctx, "Please reply with the embed **description** (or type 'none' to skip):")
-    if description is None: return
+    if description is None: return None
     embed_data["description"] = None if description.lower() == "none" else description
 
     # 3. Ask for Footer
     footer = await ask_user(ctx, "Please reply with the embed **footer** (or type 'none' to skip):")
-    if footer is None: return
+    if footer is None: return None
     embed_data["footer"] = None if footer.lower() == "none" else footer
 
+    return await _select_color(ctx, embed_data)
+
+async def _select_color(ctx, embed_data):
     # 4. Color select dropdown
     view = View()
     color_select = ColorSelect(embed_data)
@@ -125,49 +172,66 @@ async def message(ctx):
         await bot.wait_for("interaction", timeout=120, check=color_check)
     except asyncio.TimeoutError:
         await ctx.reply("⌛ You took too long to select a color. Operation cancelled.", mention_author=True)
-        return
+        return None
 
-    # 5. Channel select dropdown
-    guild = ctx.guild
-    channels = [c for c in guild.text_channels if c.permissions_for(guild.me).send_messages]
+    return embed_data
+
+async def select_channels(ctx, embed_data, prompt, max_values=1):
+    """Show the paginated channel picker; returns False if cancelled"""
+    channels = sendable_channels.get(ctx.guild)
     if not channels:
         await ctx.reply("❌ No channels available where I can send messages.", mention_author=True)
-        return
+        return False
 
-    view = View()
-    channel_select = ChannelSelect(embed_data, channels)
-    view.add_item(channel_select)
-    channel_msg = await ctx.reply("Select the **target channel** to send the embed:", view=view, mention_author=True)
-
-    def channel_check(i):
-        return i.user == ctx.author and i.message.id == channel_msg.id
-    try:
-        await bot.wait_for("interaction", timeout=120, check=channel_check)
-    except asyncio.TimeoutError:
+    picker = ChannelPicker(ctx.author, channels, prompt, max_values=max_values)
+    picker_msg = await ctx.reply(picker.status(), view=picker, mention_author=True)
+    await picker.wait()
+    if not picker.completed or not picker.selected:
+        await picker_msg.edit(view=None)
         await ctx.reply("⌛ You took too long to select a channel. Operation cancelled.", mention_author=True)
+        return False
+
+    embed_data["channel"] = picker.selected[0]
+    embed_data["channels"] = list(picker.selected)
+    return True
+
+def _embed_log_fields(log_embed, embed_data):
+    log_embed.add_field(name="Embed Title", value=truncate_field(embed_data["title"]), inline=False)
+    log_embed.add_field(name="Embed Description", value=truncate_field(embed_data["description"]), inline=False)
+    log_embed.add_field(name="Embed Footer", value=truncate_field(embed_data["footer"]), inline=False)
+    log_embed.add_field(name="Embed Color", value=embed_data["color"], inline=False)
+    log_embed.set_footer(text="Embed Logging System")
+
+# ===== message command =====
+@bot.hybrid_command(description="Build an embed and send it to a channel (staff)")
+@app_commands.guild_only()
+@staff_only()
+async def message(ctx):
+    embed_data = await collect_embed_data(ctx)
+    if embed_data is None:
+        return
+
+    # 5. Channel select dropdown
+    if not await select_channels(ctx, embed_data, "Select the **target channel** to send the embed:"):
         return
 
     # 6. Send embed
+    guild = ctx.guild
     channel = guild.get_channel(embed_data["channel"])
     if channel is None:
         await ctx.reply("❌ Invalid channel selected.", mention_author=True)
         return
 
-    embed = discord.Embed(
-        title=embed_data["title"],
-        description=embed_data["description"],
-        color=color_map.get(embed_data["color"], discord.Color.default()),
-    )
-
-    if embed_data["footer"]:
-        embed.set_footer(text=embed_data["footer"])
+    embed = build_embed(embed_data)
 
     try:
         await channel.send(embed=embed)
         await ctx.reply(f"✅ Embed sent to {channel.mention}!", mention_author=True)
+        audit_log.record("embed_send", actor=ctx.author, target=f"#{channel.name}", target_id=channel.id,
+                         guild=guild, command="message", title=embed_data["title"])
 
         # Logging to #administration-logs
-        log_channel = discord.utils.get(guild.text_channels, name=LOG_CHANNEL_NAME)
+        log_channel = guild_settings.channel(guild, "admin_log", guild_index)
         if log_channel:
             log_embed = discord.Embed(
                 title="📢 Embed Sent",
@@ -176,26 +240,220 @@ async def message(ctx):
                             f"Time: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC",
                 color=discord.Color.orange()
             )
-            log_embed.add_field(name="Embed Title", value=truncate_field(embed_data["title"]), inline=False)
-            log_embed.add_field(name="Embed Description", value=truncate_field(embed_data["description"]), inline=False)
-            log_embed.add_field(name="Embed Footer", value=truncate_field(embed_data["footer"]), inline=False)
-            log_embed.add_field(name="Embed Color", value=embed_data["color"], inline=False)
-            log_embed.set_footer(text="Embed Logging System")
-            try:
-                await log_channel.send(embed=log_embed)
-            except discord.HTTPException as e:
-                print(f"❌ Failed to send log embed: {e}")
+            _embed_log_fields(log_embed, embed_data)
+            log_dispatcher.dispatch(log_channel, log_embed)
 
     except Exception as e:
         await ctx.reply(f"❌ Failed to send embed: {e}", mention_author=True)
 
+# ===== broadcast command =====
+def _format_outcome(result):
+    channel = result.channel
+    where = f"{channel.mention} ({channel.guild.name})"
+    if result.ok:
+        retries = f", {result.attempts} attempts" if result.attempts > 1 else ""
+        return f"✅ {where} — {result.elapsed:.1f}s{retries}"
+    return f"❌ {where} — {type(result.error).__name__}: {result.error}"
+
+@bot.hybrid_command(description="Send one embed to many channels (staff)")
+@app_commands.describe(scope="`all` to also target same-named channels in every server")
+@app_commands.guild_only()
+@staff_only()
+async def broadcast(ctx, scope: str = None):
+    """Send one embed to many channels. `!broadcast all` also targets same-named channels in every guild."""
+    all_guilds = scope is not None and scope.lower() in ("all", "global")
+
+    embed_data = await collect_embed_data(ctx)
+    if embed_data is None:
+        return
+
+    if not await select_channels(ctx, embed_data, "Select the **target channels** for the broadcast:", max_values=None):
+        return
+
+    guild = ctx.guild
+    targets = [guild.get_channel(cid) for cid in embed_data["channels"]]
+    targets = [c for c in targets if c is not None]
+    if all_guilds:
+        seen = {c.id for c in targets}
+        for name in [c.name for c in targets]:
+            for channel in guild_index.find_text_channels(name):
+                if channel.id not in seen and channel.permissions_for(channel.guild.me).send_messages:
+                    seen.add(channel.id)
+                    targets.append(channel)
+    if not targets:
+        await ctx.reply("❌ Invalid channel selected.", mention_author=True)
+        return
+
+    started = datetime.utcnow()
+    results = await broadcaster.send(targets, embed=build_embed(embed_data))
+    sent = sum(1 for r in results if r.ok)
+    failed = len(results) - sent
+    elapsed = (datetime.utcnow() - started).total_seconds()
+
+    summary = f"✅ Broadcast sent to {sent}/{len(results)} channels in {elapsed:.1f}s."
+    if failed:
+        summary += f" ❌ {failed} failed — see {guild_settings.channel_label(guild, 'admin_log')}."
+    await ctx.reply(summary, mention_author=True)
+    audit_log.record("embed_send", actor=ctx.author, target=f"{sent}/{len(results)} channels", guild=guild,
+                     command="broadcast", title=embed_data["title"],
+                     channels=[r.channel.id for r in results if r.ok], failed=[r.channel.id for r in results if not r.ok])
+
+    # One consolidated record in #administration-logs
+    log_channel = guild_settings.channel(guild, "admin_log", guild_index)
+    if log_channel:
+        outcomes = "\n".join(_format_outcome(r) for r in results)
+        log_embed = discord.Embed(
+            title="📢 Embed Broadcast",
+            description=truncate_field(
+                f"Sent by: {ctx.author.mention} ({ctx.author.id})\n"
+                f"Delivered: {sent}/{len(results)} in {elapsed:.1f}s\n"
+                f"Time: {started.strftime('%Y-%m-%d %H:%M:%S')} UTC\n\n{outcomes}",
+                limit=4096
+            ),
+            color=discord.Color.orange() if not failed else discord.Color.red()
+        )
+        _embed_log_fields(log_embed, embed_data)
+        log_dispatcher.dispatch(log_channel, log_embed)
+
+# ===== embed templates =====
+CHANNEL_MENTION_RE = re.compile(r"^<#(\d+)>$")
+
+async def template_name_autocomplete(interaction: discord.Interaction, current: str):
+    current = current.lower()
+    return [app_commands.Choice(name=name, value=name) for name in templates.names() if current in name][:25]
+
+@bot.hybrid_group(invoke_without_command=True, fallback="help", description="Saved embed templates (staff)")
+@app_commands.guild_only()
+@staff_only()
+async def template(ctx):
+    await ctx.reply(
+        "Usage: `!template save <name>`, `!template list`, `!template show <name>`, `!template delete <name>`\n"
+        "Send with `!send <name> #channel [#channel ...] [key=value ...]`. "
+        "Use `{key}` in the title, description or footer for variables; `{date}`, `{guild}` and `{author}` are built in.",
+        mention_author=True
+    )
+
+@template.command(name="save", description="Build an embed and save it as a template")
+@app_commands.describe(name="Template name")
+@staff_only()
+async def template_save(ctx, name: str):
+    embed_data = await collect_embed_data(ctx)
+    if embed_data is None:
+        return
+    compiled = templates.save(name, embed_data, ctx.author)
+    variables = ", ".join(f"`{{{v}}}`" for v in sorted(compiled.variables)) or "none"
+    await ctx.reply(f"✅ Template **{compiled.name}** saved. Variables: {variables}", mention_author=True)
+
+@template.command(name="list", description="List saved templates")
+@staff_only()
+async def template_list(ctx):
+    names = templates.names()
+    if not names:
+        await ctx.reply("📭 No embed templates saved yet.", mention_author=True)
+        return
+    await ctx.reply("📑 Templates: " + ", ".join(f"`{n}`" for n in names), mention_author=True)
+
+@template.command(name="show", description="Preview a template")
+@app_commands.autocomplete(name=template_name_autocomplete)
+@staff_only()
+async def template_show(ctx, name: str):
+    compiled = templates.get(name)
+    if compiled is None:
+        await ctx.reply(f"❌ No template named `{name}`.", mention_author=True)
+        return
+    await ctx.reply(f"Preview of **{compiled.name}**:", embed=compiled.render({}), mention_author=True)
+
+@template.command(name="delete", description="Delete a template")
+@app_commands.autocomplete(name=template_name_autocomplete)
+@staff_only()
+async def template_delete(ctx, name: str):
+    if templates.delete(name):
+        await ctx.reply(f"🗑️ Template `{name}` deleted.", mention_author=True)
+    else:
+        await ctx.reply(f"❌ No template named `{name}`.", mention_author=True)
+
+def _parse_send_args(guild, rest):
+    """Split `#channel ... key=value ...` into (channels, values, errors)"""
+    channels, values, errors = [], {}, []
+    for token in shlex.split(rest):
+        match = CHANNEL_MENTION_RE.match(token)
+        if match:
+            channel = guild.get_channel(int(match.group(1)))
+            if channel is None:
+                errors.append(token)
+            else:
+                channels.append(channel)
+        elif "=" in token:
+            key, value = token.split("=", 1)
+            values[key.strip()] = value
+        else:
+            errors.append(token)
+    return channels, values, errors
+
+@bot.hybrid_command(name="send", description="Send a saved template to channels (staff)")
+@app_commands.describe(name="Template name", rest="Target #channels, then key=value variables")
+@app_commands.autocomplete(name=template_name_autocomplete)
+@app_commands.guild_only()
+@staff_only()
+async def send_template(ctx, name: str, *, rest: str = ""):
+    try:
+        channels, values, errors = _parse_send_args(ctx.guild, rest)
+    except ValueError as e:
+        await ctx.reply(f"❌ Could not parse arguments: {e}", mention_author=True)
+        return
+    if errors:
+        await ctx.reply("❌ Unrecognised arguments: " + " ".join(f"`{e}`" for e in errors), mention_author=True)
+        return
+    if not channels:
+        await ctx.reply("❌ Mention at least one target channel. Example: `!send weekly #announcements week=12`", mention_author=True)
+        return
+
+    await ctx.defer()
+    values.setdefault("date", datetime.utcnow().strftime("%Y-%m-%d"))
+    values.setdefault("guild", ctx.guild.name)
+    values.setdefault("author", ctx.author.display_name)
+    embed = templates.render(name, values)
+    if embed is None:
+        await ctx.reply(f"❌ No template named `{name}`. See `!template list`.", mention_author=True)
+        return
+
+    results = await broadcaster.send(channels, embed=embed)
+    sent = [r for r in results if r.ok]
+    await ctx.reply(
+        f"✅ Template **{templates.normalize_name(name)}** sent to {len(sent)}/{len(results)} channel(s).",
+        mention_author=True
+    )
+    audit_log.record("embed_send", actor=ctx.author, target=templates.normalize_name(name), guild=ctx.guild,
+                     command="send", channels=[r.channel.id for r in sent], failed=len(results) - len(sent),
+                     variables=values)
+
+    log_channel = guild_settings.channel(ctx.guild, "admin_log", guild_index)
+    if log_channel:
+        log_embed = discord.Embed(
+            title="📢 Template Sent",
+            description=truncate_field(
+                f"Sent by: {ctx.author.mention} ({ctx.author.id})\n"
+                f"Template: `{templates.normalize_name(name)}`\n"
+                f"Time: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC\n\n"
+                + "\n".join(_format_outcome(r) for r in results),
+                limit=4096
+            ),
+            color=discord.Color.orange()
+        )
+        if values:
+            log_embed.add_field(name="Variables", value=truncate_field(
+                ", ".join(f"{k}={v}" for k, v in sorted(values.items()))), inline=False)
+        log_embed.set_footer(text="Embed Logging System")
+        log_dispatcher.dispatch(log_channel, log_embed)
+
 @bot.event
 async def on_ready():
-    print(f"✅ Logged in as {BOT_NAME} ({bot.user})")
+    logger.info("Logged in as %s (%s)", BOT_NAME, bot.user)
+    await guild_settings.start()
 
 # ===== RUNNER =====
 async def run_bot():
     if not TOKEN:
-        print("❌ bot2: No token — not starting.")
+        logger.error("No token — not starting.")
         return
     await bot.start(TOKEN)
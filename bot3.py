@@ -1,12 +1,32 @@
+import logging
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
-from discord.ui import View, Select
+from discord.ui import View, Select, Button, Modal, TextInput
 import os
-import json
-from datetime import datetime
+import re
+import asyncio
+from datetime import datetime, timedelta
 from verification_manager import VerificationManager  # Keep your existing verification manager
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import ad_store
+from ad_poster import AdPostScheduler
+from ad_similarity import AdSimilarityIndex
+from ad_stats import AdStats
+from ad_enrichment import AdEnricher, build_preview_embeds
+from log_dispatcher import LogDispatcher
+from credits_ledger import CreditLedger, account_key
+from single_flight import SingleFlight
+from cache import TTLCache
+from guild_settings import GuildSettings
+from cache_snapshot import CacheSnapshot
+from sharding import make_bot
+from gateway_meter import GatewayEventMeter
+from dm_delivery import DMDelivery, CLOSED, OVERLOADED, PRIORITY_NOTICE, PRIORITY_PROMPT, SENT
+from audit_log import AuditLog
+from config import Config
+from logging_setup import install_command_logging
+
+logger = logging.getLogger(__name__)
 
 # ===== TOKEN HANDLING =====
 TOKEN = (
@@ -16,355 +36,857 @@ TOKEN = (
 )
 
 if TOKEN:
-    print("✅ Token loaded (BOT3_ADVERTISE / BOT3_TOKEN / DISCORD_BOT3_TOKEN).")
+    logger.info("Token loaded (BOT3_ADVERTISE / BOT3_TOKEN / DISCORD_BOT3_TOKEN).")
 else:
-    print("❌ No token found. Set BOT3_ADVERTISE, BOT3_TOKEN, or DISCORD_BOT3_TOKEN in Secrets/Env.")
-
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+    logger.error("No token found. Set BOT3_ADVERTISE, BOT3_TOKEN, or DISCORD_BOT3_TOKEN in Secrets/Env.")
+
+bot = make_bot("bot3", command_prefix="!")
+install_command_logging(bot, "bot3")
+gateway_meter = GatewayEventMeter(bot, "bot3", log_interval=Config.GATEWAY_METER_LOG_SECONDS)
+guild_settings = GuildSettings()
+dm_delivery = DMDelivery("bot3")
+verif_manager = VerificationManager(bot, dm_delivery)
+ad_enricher = AdEnricher(verif_manager.roblox_api)
+log_dispatcher = LogDispatcher(bot)
+audit_log = AuditLog("bot3")
+cache_snapshot = CacheSnapshot("bot3")
+cache_snapshot.register("roblox_users", verif_manager.roblox_api.users)
+cache_snapshot.register("thumbnails", verif_manager.roblox_api.thumbnails.cache)
+cache_snapshot.register("verified", verif_manager.verified_cache)
+cache_snapshot.register("ad_info", ad_enricher.cache)
+credit_ledger = CreditLedger()
+ad_stats = AdStats()
+advertise_flight = SingleFlight("advertise", cooldown=Config.ADVERTISE_COOLDOWN_SECONDS)
+
+# ===== APPROVED-AD POSTING QUEUE =====
+def _resolve_post_channel(guild_id, channel_name):
+    guild = bot.get_guild(guild_id)
+    return verif_manager.guild_index.get_text_channel(guild, channel_name) if guild else None
+
+async def _on_ad_posted(entry, message):
+    ad_store.update_ad(entry["ad_id"], lambda r: r.update({
+        "posted_at": datetime.utcnow().isoformat() + "Z",
+        "post_message_id": message.id
+    }))
 
-bot = commands.Bot(command_prefix="!", intents=intents)
-verif_manager = VerificationManager(bot)
+async def _on_ad_post_failed(entry, error):
+    ad_store.update_ad(entry["ad_id"], lambda r: r.update({"post_error": str(error)}))
+    guild = bot.get_guild(entry["guild_id"])
+    log_channel = guild_settings.channel(guild, "ad_log", verif_manager.guild_index)
+    log_dispatcher.dispatch(log_channel, discord.Embed(
+        title="⚠️ Advertisement Post Failed",
+        description=f"Failed to post advertisement `{entry['ad_id']}` after {entry['attempts']} attempt(s): {error}",
+        color=discord.Color.red(),
+        timestamp=datetime.utcnow()
+    ))
+
+ad_poster = AdPostScheduler(
+    bot, _resolve_post_channel,
+    on_posted=_on_ad_posted,
+    on_failed=_on_ad_post_failed,
+    channel_spacing=Config.ad_post_channel_spacing()
+)
 
-# ===== STAFF ROLE =====
-ROLE_ID_STAFF = 1406082203393462403  # Blox Entertainment Staff
+# ===== NEAR-DUPLICATE DETECTION =====
+_ad_index = None
+_ad_index_lock = asyncio.Lock()
+
+async def _get_ad_index():
+    """Build the similarity index from the ad store once, off the event loop"""
+    global _ad_index
+    if _ad_index is None:
+        async with _ad_index_lock:
+            if _ad_index is None:
+                index = AdSimilarityIndex(threshold=Config.AD_SIMILARITY_THRESHOLD)
+                # Archived ads only matter to duplicate checks once denied (see _relevant_duplicates)
+                records = ad_store.load_ads()
+                records += await asyncio.to_thread(
+                    lambda: [r for r in ad_store.iter_archived_ads() if r.get("status") == "denied"])
+                _ad_index = await asyncio.to_thread(index.build, records)
+                logger.info("Similarity index built with %d advertisement(s)", len(_ad_index))
+    return _ad_index
+
+def _relevant_duplicates(matches, guild_id):
+    """Keep matches in this guild that were denied or submitted recently"""
+    cutoff = (datetime.utcnow() - timedelta(days=Config.AD_SIMILARITY_RECENT_DAYS)).isoformat()
+    return [
+        (ad_id, similarity, meta) for ad_id, similarity, meta in matches
+        if meta.get("guild_id") == guild_id
+        and (meta.get("status") == "denied" or (meta.get("submitted_at") or "") >= cutoff)
+    ]
+
+def _format_duplicates(similar):
+    return "\n".join(
+        f"`{m['id']}` — {m['similarity']:.0%} similar, {m['status']}, by {m['username']}"
+        for m in similar
+    )
 
-# ===== PERSISTENCE (Advertisement Requests) =====
-AD_DB_FILE = "advertisement_requests.json"
+# ===== STAFF CHECK =====
+def _is_staff(member: discord.Member) -> bool:
+    return guild_settings.is_staff(member)
 
-def _load_ads():
-    try:
-        with open(AD_DB_FILE, "r") as f:
-            return json.load(f)
-    except Exception:
-        return []
+# ===== COMMAND: !credits =====
+MENTION_RE = re.compile(r"^<@!?(\d+)>$")
+ROLE_MENTION_RE = re.compile(r"^<@&(\d+)>$")
 
-def _save_ads(data):
-    try:
-        with open(AD_DB_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print(f"[AD_DB] Save failed: {e}")
+# `/credits balance` for members; `/credits grant` and `/credits refund` for staff
+@bot.hybrid_group(invoke_without_command=True, fallback="balance", description="Show your BEcredits balance")
+@app_commands.guild_only()
+async def credits(ctx):
+    # Only allow in advertisement-commands channel
+    if not guild_settings.is_channel(ctx.channel, "advertise"):
+        await ctx.reply(f"❌ You can only use this command in {_advertise_channel_label(ctx)}.", mention_author=True)
+        return
+    if not credit_ledger.ready:
+        await ctx.reply("⚠️ BEcredits are unavailable right now. Please try again later.", mention_author=True)
+        return
 
-def _append_ad(item):
-    data = _load_ads()
-    data.append(item)
-    _save_ads(data)
+    balance = credit_ledger.balance_for(ctx.author.id)
+    if balance is None:
+        await ctx.reply("ℹ️ You don’t have any BEcredits yet. Verify your Roblox account to get started!", mention_author=True)
+        return
+    await ctx.reply(f"💳 You currently have **{balance} BEcredits** remaining.", mention_author=True)
 
-def _update_ad(ad_id, updater):
-    data = _load_ads()
-    for rec in data:
-        if rec.get("id") == ad_id:
-            updater(rec)
-            break
-    _save_ads(data)
+def _advertise_channel_label(ctx):
+    return guild_settings.channel_label(ctx.guild, "advertise") if ctx.guild else "#advertisement-commands"
 
-def _guild_pending_ads(guild_id):
-    return [a for a in _load_ads() if a.get("guild_id") == guild_id and a.get("status") == "pending"]
+async def _staff_ledger_check(ctx):
+    if not isinstance(ctx.author, discord.Member) or not _is_staff(ctx.author):
+        await ctx.reply("❌ You must be **Blox Entertainment Staff** to use this command.", mention_author=True)
+        return False
+    if not credit_ledger.ready:
+        await ctx.reply("⚠️ BEcredits are unavailable right now. Please try again later.", mention_author=True)
+        return False
+    return True
+
+async def _resolve_credit_targets(guild, targets):
+    """Turn `@user`, `@role`, Roblox usernames and `all` into [(roblox_username, discord_id)] plus unresolved tokens"""
+    resolved, discord_ids, unresolved = {}, [], []
+    for token in targets:
+        if token.lower() == "all":
+            for account in credit_ledger.accounts():
+                resolved.setdefault(account, None)
+        elif (match := MENTION_RE.match(token)):
+            discord_ids.append(int(match.group(1)))
+        elif (match := ROLE_MENTION_RE.match(token)):
+            role = guild.get_role(int(match.group(1)))
+            if role is None:
+                unresolved.append(token)
+            else:
+                discord_ids.extend(m.id for m in role.members)
+        else:
+            resolved.setdefault(account_key(token), None)
 
-# ===== STAFF CHECK =====
-def _is_staff(member: discord.Member) -> bool:
-    return any(r.id == ROLE_ID_STAFF for r in member.roles)
-
-# ===== POSTGRES CONNECTION =====
-POSTGRES_URL = os.getenv("BOT3_POSTGRES_URL")  # put your connection string here in env
-conn = psycopg2.connect(POSTGRES_URL, cursor_factory=RealDictCursor)
-
-# ===== ENSURE CREDITS TABLE =====
-with conn.cursor() as cur:
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS be_credits (
-            discord_id BIGINT PRIMARY KEY,
-            roblox_username TEXT UNIQUE NOT NULL,
-            credits INT NOT NULL DEFAULT 5
-        )
-    """)
-    conn.commit()
+    pending = []
+    for discord_id in discord_ids:
+        account = credit_ledger.account_for(discord_id)
+        if account:
+            resolved[account] = discord_id
+        else:
+            pending.append(discord_id)
+    if pending:
+        # One query for every member without a ledger account yet
+        names = await verif_manager.get_roblox_usernames(pending)
+        for discord_id in pending:
+            if discord_id in names:
+                resolved[account_key(names[discord_id])] = discord_id
+            else:
+                unresolved.append(f"<@{discord_id}>")
+    return list(resolved.items()), unresolved
+
+@credits.command(name="grant", description="Grant (or with a negative amount, deduct) BEcredits (staff)")
+@app_commands.describe(amount="Credits per account; negative to deduct",
+                       targets="@users, @roles, Roblox usernames or `all`, separated by spaces")
+async def credits_grant(ctx, amount: int, *, targets: str = ""):
+    """`!credits grant <amount> <@user|@role|roblox_username|all> ...` — one transaction for every target"""
+    if not await _staff_ledger_check(ctx):
+        return
+    targets = targets.split()
+    if amount == 0 or not targets:
+        await ctx.reply("❌ Usage: `!credits grant <amount> <@user|@role|roblox_username|all> ...`", mention_author=True)
+        return
 
-# ===== COMMAND: !credits =====
-@bot.command()
-async def credits(ctx):
-    # Only allow in advertisement-commands channel
-    if ctx.channel.id != 1406102298463043636:
-        await ctx.reply("❌ You can only use this command in #advertisement-commands.", mention_author=True)
+    await ctx.defer()
+    accounts, unresolved = await _resolve_credit_targets(ctx.guild, targets)
+    updated = await credit_ledger.apply_adjustments(
+        [(name, discord_id, amount, None) for name, discord_id in accounts],
+        reason="staff_grant" if amount > 0 else "staff_deduction", actor_id=ctx.author.id
+    )
+    audit_log.record("credits_grant", actor=ctx.author, target=f"{len(updated)} account(s)", guild=ctx.guild,
+                     amount=amount, targets=list(targets))
+
+    summary = f"✅ Applied **{amount:+d} BEcredits** to **{len(updated)}** account(s)."
+    if unresolved:
+        shown = ", ".join(unresolved[:20])
+        summary += f"\n⚠️ Not verified or not found ({len(unresolved)}): {shown}"
+    await ctx.reply(summary, mention_author=True)
+
+@credits.command(name="refund", description="Return the credit spent on advertisements (staff)")
+@app_commands.describe(ad_ids="Request IDs, separated by spaces")
+async def credits_refund(ctx, *, ad_ids: str = ""):
+    """`!credits refund <ad_id> ...` — return the credit spent on each advertisement (once per ad)"""
+    if not await _staff_ledger_check(ctx):
+        return
+    ad_ids = ad_ids.split()
+    if not ad_ids:
+        await ctx.reply("❌ Usage: `!credits refund <ad_id> [ad_id ...]`", mention_author=True)
         return
 
-    user_id = ctx.author.id
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT credits FROM be_credits WHERE discord_id = %s", (user_id,))
-        row = cur.fetchone()
-        if not row:
-            await ctx.reply("ℹ️ You don’t have any BEcredits yet. Verify your Roblox account to get started!", mention_author=True)
-            return
-        await ctx.reply(f"💳 You currently have **{row['credits']} BEcredits** remaining.", mention_author=True)
+    await ctx.defer()
+    wanted = set(ad_ids)
+    records = [r for r in ad_store.load_ads() if r.get("id") in wanted]
+    if len(records) < len(wanted):
+        records += await asyncio.to_thread(ad_store.find_archived_ads, wanted - {r["id"] for r in records})
+    updated = await credit_ledger.apply_adjustments(
+        [(r["roblox_username"], r["user_id"], r.get("credits_spent", 1), f"refund:{r['id']}")
+         for r in records if r.get("roblox_username")],
+        reason="refund", actor_id=ctx.author.id
+    )
+    audit_log.record("credits_refund", actor=ctx.author, target=f"{len(records)} ad(s)", guild=ctx.guild,
+                     ad_ids=list(ad_ids))
+
+    summary = f"✅ Refunded credits on **{len(updated)}** account(s) for **{len(records)}** advertisement(s)."
+    missing = wanted - {r["id"] for r in records}
+    if missing:
+        summary += "\n⚠️ Unknown request IDs: " + ", ".join(f"`{m}`" for m in sorted(missing)[:20])
+    summary += "\nℹ️ Advertisements that were already refunded are skipped."
+    await ctx.reply(summary, mention_author=True)
 
 # ===== COMMAND: !advertise =====
-@bot.command()
+AD_SUBMITTED_REPLY = "✅ Your advertisement request has been submitted! You have **{remaining} BEcredits** remaining."
+
+class AdvertiseModal(Modal):
+    ad_text = TextInput(
+        label="Your advertisement",
+        style=discord.TextStyle.paragraph,
+        max_length=2000,
+    )
+
+    def __init__(self):
+        super().__init__(title="Submit an advertisement")
+
+    async def on_submit(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        # Repeated submissions within the cooldown are not charged twice
+        result, source = await advertise_flight.run(
+            interaction.user.id,
+            lambda: _check_charge_and_submit(interaction.guild, interaction.user, self.ad_text.value),
+            join=False, cache_if=lambda result: result[0] is not None
+        )
+        if source in ("busy", "cooldown"):
+            await interaction.followup.send("ℹ️ Your advertisement was just submitted. Please wait a moment before starting another.",
+                                            ephemeral=True)
+            return
+        await interaction.followup.send(result[1], ephemeral=True)
+
+@bot.hybrid_command(description="Submit an advertisement for staff review (costs BEcredits)")
+@app_commands.guild_only()
 async def advertise(ctx):
-    if ctx.channel.id != 1406102298463043636:
-        await ctx.reply("❌ You can only use this command in #advertisement-commands.", mention_author=True)
+    if not guild_settings.is_channel(ctx.channel, "advertise"):
+        await ctx.reply(f"❌ You can only use this command in {_advertise_channel_label(ctx)}.", mention_author=True)
         return
 
-    user_id_str = str(ctx.author.id)
-    try:
-        with open(verif_manager.data_file, "r") as f:
-            VERIFICATIONS = json.load(f)
-    except Exception:
-        VERIFICATIONS = {}
-
-    if user_id_str not in VERIFICATIONS:
-        await ctx.reply("❌ You must verify your Roblox account before submitting an advertisement.", mention_author=True)
+    if ctx.interaction is not None:
+        # /advertise collects the text in a modal instead of a DM conversation. The modal must be the
+        # first response, within Discord's 3 seconds, so only in-memory checks run before it; the full
+        # check (DB lookup, welcome grant) runs on submit
+        problem = _advertise_quick_reject(ctx.guild, ctx.author)
+        if problem:
+            await ctx.send(problem, ephemeral=True)
+            return
+        await ctx.interaction.response.send_modal(AdvertiseModal())
         return
 
-    roblox_username = VERIFICATIONS[user_id_str]
+    # One submission flow per user at a time, so parallel calls can't open extra DM waits or spend extra credits
+    _, source = await advertise_flight.run(ctx.author.id, lambda: _run_advertise(ctx), join=False,
+                                           cache_if=lambda ad_id: ad_id is not None)
+    if source == "busy":
+        await ctx.reply("⏳ You already have an advertisement request in progress — check your DMs.", mention_author=True)
+    elif source == "cooldown":
+        await ctx.reply("ℹ️ Your advertisement was just submitted. Please wait a moment before starting another.",
+                        mention_author=True)
+
+async def _advertise_precheck(guild, author):
+    """Return (roblox_username, None) if `author` can pay for an ad here, else (None, reason)"""
+    if not credit_ledger.ready:
+        return None, "⚠️ BEcredits are unavailable right now. Please try again later."
+
+    roblox_username = await verif_manager.get_roblox_username(author.id)
+    if not roblox_username:
+        return None, "❌ You must verify your Roblox account before submitting an advertisement."
 
     # ==== BE CREDITS CHECK ====
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute("SELECT credits FROM be_credits WHERE roblox_username = %s", (roblox_username,))
-        row = cur.fetchone()
-        if not row:
-            # First time verified -> give 5 credits
-            cur.execute(
-                "INSERT INTO be_credits (discord_id, roblox_username, credits) VALUES (%s, %s, 5)",
-                (ctx.author.id, roblox_username)
-            )
-            conn.commit()
-            remaining_credits = 5
-        else:
-            remaining_credits = row["credits"]
+    # First time verified -> welcome credits (this server's setting, 5 by default)
+    settings = guild_settings.get(guild)
+    await credit_ledger.ensure_welcome_grant(roblox_username, author.id, amount=settings["welcome_credits"])
+    if (credit_ledger.balance(roblox_username) or 0) < settings["advertisement_cost"]:
+        return None, "❌ You have no BEcredits left. Purchase more to advertise."
+    return roblox_username, None
+
+def _advertise_quick_reject(guild, author):
+    """The reason `author` certainly can't advertise, from cached state only; None if they may be able to"""
+    if not credit_ledger.ready:
+        return "⚠️ BEcredits are unavailable right now. Please try again later."
+    if author.id not in verif_manager.verified_cache:
+        return None
+    roblox_username = verif_manager.verified_cache.get(author.id)
+    if not roblox_username:
+        return "❌ You must verify your Roblox account before submitting an advertisement."
+    # An unknown balance may still get the welcome grant
+    balance = credit_ledger.balance(roblox_username)
+    if balance is not None and balance < guild_settings.get(guild)["advertisement_cost"]:
+        return "❌ You have no BEcredits left. Purchase more to advertise."
+    return None
+
+async def _check_charge_and_submit(guild, author, ad_text):
+    """_advertise_precheck() then _charge_and_submit(), for ad text collected before the check"""
+    roblox_username, problem = await _advertise_precheck(guild, author)
+    if problem:
+        return None, problem
+    return await _charge_and_submit(guild, author, roblox_username, ad_text)
+
+async def _charge_and_submit(guild, author, roblox_username, ad_text):
+    """Charge for and queue an ad whose text is already known; returns (ad_id or None, reply)"""
+    cost = guild_settings.get(guild)["advertisement_cost"]
+    remaining_credits = await credit_ledger.spend(roblox_username, cost, reason="advertisement", discord_id=author.id)
+    if remaining_credits is None:
+        return None, "❌ You have no BEcredits left. Purchase more to advertise."
+    ad_id = await _submit_ad(guild, author, roblox_username, ad_text.strip(), cost, remaining_credits)
+    return ad_id, AD_SUBMITTED_REPLY.format(remaining=remaining_credits)
+
+async def _run_advertise(ctx):
+    """DM the user for their ad, charge for it and queue it for review; returns the ad ID if submitted"""
+    roblox_username, problem = await _advertise_precheck(ctx.guild, ctx.author)
+    if problem:
+        await ctx.reply(problem, mention_author=True)
+        return
 
-        if remaining_credits <= 0:
-            await ctx.reply("❌ You have no BEcredits left. Purchase more to advertise.", mention_author=True)
-            return
+    # Charge up front so the balance can't be spent twice while waiting for the DM reply
+    cost = guild_settings.get(ctx.guild)["advertisement_cost"]
+    remaining_credits = await credit_ledger.spend(roblox_username, cost, reason="advertisement", discord_id=ctx.author.id)
+    if remaining_credits is None:
+        await ctx.reply("❌ You have no BEcredits left. Purchase more to advertise.", mention_author=True)
+        return
 
-        # Deduct 1 credit
-        cur.execute("UPDATE be_credits SET credits = credits - 1 WHERE roblox_username = %s", (roblox_username,))
-        conn.commit()
-        remaining_credits -= 1
+    outcome = await dm_delivery.send(
+        ctx.author,
+        f"Hello! Your verified Roblox username: {roblox_username}\n"
+        "📢 Please type your advertisement message here. You have 5 minutes to respond.",
+        priority=PRIORITY_PROMPT, recheck=True
+    )
+    if outcome != SENT:
+        await credit_ledger.apply_adjustments([(roblox_username, ctx.author.id, cost, None)], reason="advertisement_cancelled")
+        if outcome == OVERLOADED:
+            await ctx.reply("⏳ I'm sending a lot of DMs right now. Please try again in a minute.", mention_author=True)
+        else:
+            await ctx.reply("❌ I couldn't DM you! Please enable DMs from server members.", mention_author=True)
+        return
 
     try:
-        dm = await ctx.author.create_dm()
-        await dm.send(
-            f"Hello! Your verified Roblox username: {roblox_username}\n"
-            "📢 Please type your advertisement message here. You have 5 minutes to respond."
-        )
-
         def _ad_check(m: discord.Message):
             return m.author.id == ctx.author.id and isinstance(m.channel, discord.DMChannel)
 
         msg = await bot.wait_for("message", check=_ad_check, timeout=300)
         ad_text = msg.content.strip()
-
-    except discord.Forbidden:
-        await ctx.reply("❌ I couldn't DM you! Please enable DMs from server members.", mention_author=True)
-        return
     except Exception:
-        await ctx.reply("⏱️ Advertisement cancelled (no message provided).", mention_author=True)
+        await credit_ledger.apply_adjustments([(roblox_username, ctx.author.id, cost, None)], reason="advertisement_cancelled")
+        await ctx.reply("⏱️ Advertisement cancelled (no message provided). Your BEcredit was returned.", mention_author=True)
         return
 
-    ad_id = f"{ctx.guild.id}-{ctx.author.id}-{int(datetime.utcnow().timestamp())}"
+    ad_id = await _submit_ad(ctx.guild, ctx.author, roblox_username, ad_text, cost, remaining_credits)
+    await ctx.reply(AD_SUBMITTED_REPLY.format(remaining=remaining_credits), mention_author=True)
+    return ad_id
+
+async def _submit_ad(guild, author, roblox_username, ad_text, cost, remaining_credits):
+    """Store a paid-for ad, index it and log it for staff; returns the ad ID"""
+    ad_id = f"{guild.id}-{author.id}-{int(datetime.utcnow().timestamp())}"
     record = {
         "id": ad_id,
-        "guild_id": ctx.guild.id,
-        "user_id": ctx.author.id,
-        "username": str(ctx.author),
+        "guild_id": guild.id,
+        "user_id": author.id,
+        "username": str(author),
         "roblox_username": roblox_username,
         "ad_text": ad_text,
+        "credits_spent": cost,
         "status": "pending",
         "submitted_at": datetime.utcnow().isoformat() + "Z",
         "processed_by": None,
         "decision": None,
         "comments": None
     }
-    _append_ad(record)
-
-    ad_log_channel = discord.utils.get(ctx.guild.text_channels, name="advertisement-requests")
+    record["links"] = await ad_enricher.enrich(ad_text)
+    ad_index = await _get_ad_index()
+    record["similar_to"] = [
+        {"id": ad_id, "similarity": round(similarity, 2), "status": meta.get("status"), "username": meta.get("username")}
+        for ad_id, similarity, meta in _relevant_duplicates(ad_index.query(ad_text, limit=10), guild.id)[:5]
+    ]
+    ad_store.append_ad(record)
+    ad_stats.record_submission(record)
+    ad_index.add(ad_id, ad_text, status="pending", user_id=author.id, guild_id=guild.id,
+                 submitted_at=record["submitted_at"], username=record["username"])
+
+    audit_log.record("ad_submit", actor=author, target=ad_id, guild=guild,
+                     roblox_username=roblox_username, remaining_credits=remaining_credits,
+                     similar_to=[s["id"] for s in record["similar_to"]])
+
+    ad_log_channel = guild_settings.channel(guild, "ad_requests", verif_manager.guild_index)
     if ad_log_channel:
         emb = discord.Embed(
             title="New Advertisement Request (Pending)",
             description=(
-                f"**User:** {ctx.author} ({ctx.author.id})\n"
+                f"**User:** {author} ({author.id})\n"
                 f"**Roblox Username:** {roblox_username}\n"
                 f"**Advertisement:** {ad_text}\n"
                 f"**Request ID:** `{ad_id}`\n"
                 f"💳 Remaining BEcredits: {remaining_credits}"
             ),
-            color=discord.Color.yellow(),
+            color=discord.Color.yellow() if not record["similar_to"] else discord.Color.orange(),
             timestamp=datetime.utcnow()
         )
-        try:
-            await ad_log_channel.send(embed=emb)
-        except Exception as e:
-            print(f"[AD_LOG] Failed to send embed: {e}")
-
-    await ctx.reply(f"✅ Your advertisement request has been submitted! You have **{remaining_credits} BEcredits** remaining.", mention_author=True)
+        if record["similar_to"]:
+            emb.add_field(name="⚠️ Possible duplicate of", value=_format_duplicates(record["similar_to"])[:1024], inline=False)
+        log_dispatcher.dispatch(ad_log_channel, emb, *build_preview_embeds(record["links"]))
+    return ad_id
+
+# ===== COMMAND: !adreq (moderation queue) =====
+QUEUE_PAGE_SIZE = 25  # Select option limit
+QUEUE_FOOTER_RE = re.compile(r"Page (\d+)/(\d+)")
+
+# (message_id, staff_id): (page, [ad_id]) — selections made in a queue message. The queue view never
+# times out, so abandoned selections expire instead (and the cache's size cap bounds the rest)
+QUEUE_SELECTION_TTL = 15 * 60
+_queue_selections = TTLCache(QUEUE_SELECTION_TTL, max_size=1000)
+
+def _queue_page_from_message(message):
+    if message and message.embeds:
+        footer = message.embeds[0].footer.text or ""
+        match = QUEUE_FOOTER_RE.search(footer)
+        if match:
+            return int(match.group(1)) - 1
+    return 0
+
+def _build_queue_page(guild: discord.Guild, page: int):
+    """Return (embed, page_records, page, page_count) for the pending queue"""
+    pending = ad_store.guild_pending_ads(guild.id)
+    pending.sort(key=lambda r: r.get("submitted_at") or "")
+    page_count = max(1, -(-len(pending) // QUEUE_PAGE_SIZE))
+    page = max(0, min(page, page_count - 1))
+    records = pending[page * QUEUE_PAGE_SIZE:(page + 1) * QUEUE_PAGE_SIZE]
+
+    lines = []
+    for n, rec in enumerate(records, start=page * QUEUE_PAGE_SIZE + 1):
+        text = rec["ad_text"].replace("\n", " ")
+        if len(text) > 100:
+            text = text[:97] + "..."
+        flag = " ⚠️" if rec.get("similar_to") else ""
+        lines.append(f"**{n}.**{flag} {rec['username']} ({rec['roblox_username']}) — {text}")
+    description = "\n".join(lines) or "📭 No pending advertisement requests."
+    if len(description) > 4096:
+        description = description[:4093] + "..."
+
+    embed = discord.Embed(
+        title=f"🗂️ Advertisement Queue — {len(pending)} pending",
+        description=description,
+        color=discord.Color.yellow(),
+        timestamp=datetime.utcnow()
+    )
+    embed.set_footer(text=f"Page {page + 1}/{page_count} • Select ads, then Approve or Deny • ⚠️ possible duplicate")
+    return embed, records, page, page_count
 
-# ===== COMMAND: !adreq =====
-class AdSelect(Select):
-    def __init__(self, pending_records, guild: discord.Guild):
+class AdQueueSelect(Select):
+    def __init__(self, records=None, guild: discord.Guild = None):
         options = []
-        for rec in pending_records:
-            user = guild.get_member(rec["user_id"])
+        for rec in records or []:
+            user = guild.get_member(rec["user_id"]) if guild else None
             label = user.name if user else rec["username"]
             options.append(discord.SelectOption(
-                label=label,
+                label=label[:100],
                 value=rec["id"],
-                description=f"Submitted at {rec['submitted_at']}"
+                description=rec["ad_text"].replace("\n", " ")[:100]
             ))
-        super().__init__(placeholder="Select a pending advertisement", options=options, min_values=1, max_values=1)
-
-class DecisionSelect(Select):
-    def __init__(self):
-        options = [
-            discord.SelectOption(label="Approve", emoji="✅"),
-            discord.SelectOption(label="Deny", emoji="❌"),
-        ]
-        super().__init__(placeholder="Decision", options=options, min_values=1, max_values=1)
-
-@bot.command()
-async def adreq(ctx):
-    if ctx.channel.name != "commands":
-        await ctx.reply("❌ Use this command in #commands.", mention_author=True)
-        return
-
-    if not isinstance(ctx.author, discord.Member) or not _is_staff(ctx.author):
-        await ctx.reply("❌ You must be **Blox Entertainment Staff** to use this command.", mention_author=True)
-        return
+        if not options:
+            options = [discord.SelectOption(label="No pending requests", value="none")]
+        super().__init__(
+            custom_id="adqueue:select",
+            row=0,
+            placeholder="Select pending advertisements",
+            options=options,
+            min_values=0,
+            max_values=len(options),
+            disabled=not records and guild is not None,
+        )
 
-    pending = _guild_pending_ads(ctx.guild.id)
-    if not pending:
-        await ctx.reply("📭 No pending advertisement requests.", mention_author=True)
-        return
+    async def callback(self, interaction: discord.Interaction):
+        ad_ids = [v for v in self.values if v != "none"]
+        _queue_selections.set((interaction.message.id, interaction.user.id),
+                              (_queue_page_from_message(interaction.message), ad_ids))
+        count = len(ad_ids)
+        await interaction.response.send_message(
+            f"☑️ {count} advertisement(s) selected. Press **Approve** or **Deny**.", ephemeral=True
+        )
 
-    selector = AdSelect(pending, ctx.guild)
-    view1 = View(timeout=90)
-    view1.add_item(selector)
-    msg1 = await ctx.reply("🗂️ Select a **pending advertisement request**:", view=view1, mention_author=True)
+class AdDecisionModal(Modal):
+    comments = TextInput(
+        label="Comment for the submitters (optional)",
+        style=discord.TextStyle.paragraph,
+        required=False,
+        max_length=1000,
+    )
 
-    def _sel_done(i: discord.Interaction):
-        return i.user.id == ctx.author.id and i.data.get("component_type") == 3
+    def __init__(self, decision, ad_ids, queue_message):
+        super().__init__(title=f"{decision} {len(ad_ids)} advertisement(s)")
+        self.decision = decision
+        self.ad_ids = ad_ids
+        self.queue_message = queue_message
 
-    try:
-        inter1 = await bot.wait_for("interaction", check=_sel_done, timeout=90)
-        await inter1.response.defer()
-        ad_id = selector.values[0]
-    except Exception:
-        await msg1.edit(content="⏱️ Timed out. Try `!adreq` again.", view=None)
-        return
+    async def on_submit(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        summary = await apply_ad_decisions(
+            interaction.guild, self.ad_ids, self.decision, (self.comments.value or "").strip(), interaction.user
+        )
+        _queue_selections.pop((self.queue_message.id, interaction.user.id), None)
+        await interaction.followup.send(summary, ephemeral=True)
+        await _refresh_queue_message(self.queue_message, interaction.guild, _queue_page_from_message(self.queue_message))
+
+class AdQueueView(View):
+    """Persistent moderation queue. Page state lives in the embed footer so it survives restarts."""
+
+    def __init__(self, records=None, guild: discord.Guild = None, page=0, page_count=1):
+        super().__init__(timeout=None)
+        self.add_item(AdQueueSelect(records, guild))
+        if guild is not None:
+            self.prev_page.disabled = page <= 0
+            self.next_page.disabled = page >= page_count - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not isinstance(interaction.user, discord.Member) or not _is_staff(interaction.user):
+            await interaction.response.send_message(
+                "❌ You must be **Blox Entertainment Staff** to use this.", ephemeral=True
+            )
+            return False
+        return True
+
+    async def _show_page(self, interaction: discord.Interaction, page):
+        # The select is rebuilt empty, so drop whatever this staff member had picked on the old page
+        _queue_selections.pop((interaction.message.id, interaction.user.id))
+        embed, records, page, page_count = _build_queue_page(interaction.guild, page)
+        await interaction.response.edit_message(
+            embed=embed, view=AdQueueView(records, interaction.guild, page, page_count)
+        )
 
-    chosen = next((r for r in _guild_pending_ads(ctx.guild.id) if r["id"] == ad_id), None)
-    if not chosen:
-        await ctx.send("⚠️ That advertisement request is no longer pending.")
-        return
+    async def _decide(self, interaction: discord.Interaction, decision):
+        page, ad_ids = _queue_selections.get((interaction.message.id, interaction.user.id), (None, None))
+        if ad_ids and page != _queue_page_from_message(interaction.message):
+            # Someone else changed the page since; the selection is no longer on screen
+            _queue_selections.pop((interaction.message.id, interaction.user.id))
+            ad_ids = None
+        if not ad_ids:
+            await interaction.response.send_message("⚠️ Select one or more advertisements first.", ephemeral=True)
+            return
+        await interaction.response.send_modal(AdDecisionModal(decision, ad_ids, interaction.message))
 
-    dec_select = DecisionSelect()
-    view2 = View(timeout=60)
-    view2.add_item(dec_select)
-    msg2 = await ctx.send(
-        f"📌 Selected: **{chosen['username']}** — Advertisement preview:\n{chosen['ad_text']}\nChoose a decision:",
-        view=view2
-    )
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary, custom_id="adqueue:prev", row=1)
+    async def prev_page(self, interaction: discord.Interaction, button: Button):
+        await self._show_page(interaction, _queue_page_from_message(interaction.message) - 1)
 
-    def _dec_done(i: discord.Interaction):
-        return i.user.id == ctx.author.id and i.data.get("component_type") == 3
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary, custom_id="adqueue:next", row=1)
+    async def next_page(self, interaction: discord.Interaction, button: Button):
+        await self._show_page(interaction, _queue_page_from_message(interaction.message) + 1)
 
-    try:
-        inter2 = await bot.wait_for("interaction", check=_dec_done, timeout=60)
-        await inter2.response.defer()
-        decision = dec_select.values[0]
-    except Exception:
-        await msg2.edit(content="⏱️ Timed out. Decision not recorded.", view=None)
-        return
+    @discord.ui.button(label="Refresh", emoji="🔄", style=discord.ButtonStyle.secondary, custom_id="adqueue:refresh", row=1)
+    async def refresh(self, interaction: discord.Interaction, button: Button):
+        await self._show_page(interaction, _queue_page_from_message(interaction.message))
 
-    await ctx.send("💬 Enter any **comments** for this decision (or type `none`). You have 2 minutes.")
+    @discord.ui.button(label="Approve", emoji="✅", style=discord.ButtonStyle.success, custom_id="adqueue:approve", row=2)
+    async def approve(self, interaction: discord.Interaction, button: Button):
+        await self._decide(interaction, "Approve")
 
-    def _comment_check(m: discord.Message):
-        return m.author.id == ctx.author.id and m.channel.id == ctx.channel.id
+    @discord.ui.button(label="Deny", emoji="❌", style=discord.ButtonStyle.danger, custom_id="adqueue:deny", row=2)
+    async def deny(self, interaction: discord.Interaction, button: Button):
+        await self._decide(interaction, "Deny")
 
+async def _refresh_queue_message(message, guild, page):
+    embed, records, page, page_count = _build_queue_page(guild, page)
     try:
-        comment_msg = await bot.wait_for("message", check=_comment_check, timeout=120)
-        comments = comment_msg.content.strip()
-        if comments.lower() == "none":
-            comments = ""
-    except Exception:
-        comments = ""
-
+        await message.edit(embed=embed, view=AdQueueView(records, guild, page, page_count))
+    except discord.HTTPException as e:
+        logger.warning("Failed to refresh queue message: %s", e)
+
+async def _finalize_ad(guild: discord.Guild, final):
+    """Post, log and notify for one decided ad; returns a list of problems"""
+    problems = []
+    if final["status"] == "approved":
+        queued = ad_poster.enqueue(
+            final["id"], guild.id, guild_settings.get(guild)["approved_ads_channel_name"], final["user_id"], final["ad_text"],
+            f"📣 Advertisement by **{final['username']}** ({final['roblox_username']}):\n{final['ad_text']}",
+            embeds=[e.to_dict() for e in build_preview_embeds(final.get("links") or [])]
+        )
+        if not queued:
+            problems.append(f"⚠️ `{final['id']}` duplicates an advertisement already queued or recently posted; not posted again.")
+
+    log_channel = guild_settings.channel(guild, "ad_log", verif_manager.guild_index)
+    c = discord.Color.green() if final["status"] == "approved" else discord.Color.red()
+    emb = discord.Embed(
+        title=f"Advertisement Request {final['status'].title()}",
+        description=(
+            f"**User:** {final['username']} ({final['user_id']})\n"
+            f"**Roblox Username:** {final['roblox_username']}\n"
+            f"**Advertisement:** {final['ad_text']}\n"
+            f"**Decision:** {final['status'].title()}\n"
+            f"**Comments:** {final['comments'] or '(none)'}\n"
+            f"**Processed by:** {final['processed_by']}\n"
+            f"**Request ID:** `{final['id']}`"
+        ),
+        color=c,
+        timestamp=datetime.utcnow()
+    )
+    if log_channel:
+        log_dispatcher.dispatch(log_channel, emb)
+    else:
+        problems.append(f"⚠️ Channel **{guild_settings.channel_label(guild, 'ad_log')}** not found.")
+
+    # Already known to have DMs closed: skip the member lookup as well as the send
+    if dm_delivery.is_closed(final["user_id"]):
+        problems.append(f"ℹ️ Could not DM {final['username']} (DMs closed).")
+        return problems
+    user = guild.get_member(final["user_id"])
+    if user is None:
+        # Not cached when running without the members intent (COMMAND_MODE=slash)
+        try:
+            user = await guild.fetch_member(final["user_id"])
+        except discord.HTTPException:
+            user = None
+    if user:
+        # Queued behind verification codes and not awaited; a 403 found later is logged by dm_delivery
+        outcome = await dm_delivery.send(
+            user,
+            f"📣 Your advertisement request has been **{final['status'].upper()}**.\n"
+            f"• Advertisement: {final['ad_text']}\n"
+            f"• Comments: {final['comments'] or '(none)'}\n"
+            + (f"✅ It will be posted in {guild_settings.channel_label(guild, 'approved_ads')} shortly!" if final["status"] == "approved" else "❌ It was denied."),
+            priority=PRIORITY_NOTICE, wait=False
+        )
+        if outcome == CLOSED:
+            problems.append(f"ℹ️ Could not DM {final['username']} (DMs closed).")
+        elif outcome == OVERLOADED:
+            problems.append(f"⚠️ DM queue full; {final['username']} was not notified.")
+    return problems
+
+async def apply_ad_decisions(guild: discord.Guild, ad_ids, decision, comments, staff):
+    """Record one decision for many ads in a single store write, then post/log/notify each"""
     status_val = "approved" if decision == "Approve" else "denied"
-    _update_ad(ad_id, lambda r: r.update({
+    processed_at = datetime.utcnow().isoformat() + "Z"
+    decided = ad_store.update_ads(ad_ids, lambda r: r.update({
         "status": status_val,
-        "processed_by": str(ctx.author),
+        "processed_by": str(staff),
         "decision": decision.lower(),
         "comments": comments,
-        "processed_at": datetime.utcnow().isoformat() + "Z"
+        "processed_at": processed_at
     }))
-    final = next((r for r in _load_ads() if r["id"] == ad_id), None)
 
-    if final and status_val == "approved":
-        ad_channel = discord.utils.get(ctx.guild.text_channels, name="approved-ads")
-        if ad_channel:
-            try:
-                await ad_channel.send(f"📣 Advertisement by **{final['username']}** ({final['roblox_username']}):\n{final['ad_text']}")
-            except Exception as e:
-                await ctx.send(f"⚠️ Failed to post advertisement: {e}")
+    ad_stats.record_decisions(decided)
+    if _ad_index is not None:
+        for final in decided:
+            _ad_index.update_meta(final["id"], status=status_val)
+    for final in decided:
+        audit_log.record("ad_approve" if status_val == "approved" else "ad_deny", actor=staff, target=final["id"],
+                         target_id=final["user_id"], guild=guild, comments=comments)
+
+    problems = []
+    for final in decided:
+        problems.extend(await _finalize_ad(guild, final))
+
+    summary = f"✅ Decision **{status_val.title()}** recorded for **{len(decided)}** advertisement(s)."
+    if status_val == "approved" and decided:
+        summary += f"\n📬 {ad_poster.pending_count(guild.id)} advertisement(s) waiting in the posting queue."
+    skipped = len(set(ad_ids)) - len(decided)
+    if skipped:
+        summary += f"\n⚠️ {skipped} were no longer pending and were skipped."
+    if problems:
+        shown = problems[:10]
+        summary += "\n" + "\n".join(shown)
+        if len(problems) > len(shown):
+            summary += f"\n…and {len(problems) - len(shown)} more."
+    return summary
+
+@bot.hybrid_command(description="Open the advertisement moderation queue (staff)")
+@app_commands.guild_only()
+async def adreq(ctx):
+    if not guild_settings.is_channel(ctx.channel, "staff_commands"):
+        await ctx.reply(f"❌ Use this command in {guild_settings.channel_label(ctx.guild, 'staff_commands')}.",
+                        mention_author=True)
+        return
 
-    log_channel = discord.utils.get(ctx.guild.text_channels, name="advertisement-logs")
-    if final:
-        c = discord.Color.green() if final["status"] == "approved" else discord.Color.red()
-        emb = discord.Embed(
-            title=f"Advertisement Request {final['status'].title()}",
-            description=(
-                f"**User:** {final['username']} ({final['user_id']})\n"
-                f"**Roblox Username:** {final['roblox_username']}\n"
-                f"**Advertisement:** {final['ad_text']}\n"
-                f"**Decision:** {final['status'].title()}\n"
-                f"**Comments:** {final['comments'] or '(none)'}\n"
-                f"**Processed by:** {final['processed_by']}\n"
-                f"**Request ID:** `{final['id']}`"
-            ),
-            color=c,
-            timestamp=datetime.utcnow()
-        )
-        if log_channel:
-            await log_channel.send(embed=emb)
-        else:
-            await ctx.send("⚠️ Channel **#advertisement-logs** not found.")
+    if not isinstance(ctx.author, discord.Member) or not _is_staff(ctx.author):
+        await ctx.reply("❌ You must be **Blox Entertainment Staff** to use this command.", mention_author=True)
+        return
 
-    user = ctx.guild.get_member(final["user_id"]) if final else None
-    if user:
-        try:
-            dm = await user.create_dm()
-            await dm.send(
-                f"📣 Your advertisement request has been **{final['status'].upper()}**.\n"
-                f"• Advertisement: {final['ad_text']}\n"
-                f"• Comments: {final['comments'] or '(none)'}\n"
-                + ("✅ It has been posted!" if final["status"] == "approved" else "❌ It was denied.")
-            )
-        except discord.Forbidden:
-            await ctx.send("ℹ️ Could not DM the submitter (DMs closed).")
+    embed, records, page, page_count = _build_queue_page(ctx.guild, 0)
+    if not records:
+        await ctx.reply("📭 No pending advertisement requests.", mention_author=True)
+        return
 
-    await ctx.send(f"✅ Decision **{final['status'].title()}** recorded for **{final['username']}**.")
+    await ctx.reply(embed=embed, view=AdQueueView(records, ctx.guild, page, page_count), mention_author=True)
+
+# ===== COMMAND: !adstats =====
+def _format_duration(seconds):
+    if seconds is None:
+        return "—"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 48 * 3600:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+def _format_rate(rate):
+    return "—" if rate is None else f"{rate:.0%}"
+
+@bot.hybrid_group(invoke_without_command=True, fallback="show", description="Advertisement dashboard for this server (staff)")
+@app_commands.describe(days="Window for the recent figures (default 30)")
+@app_commands.guild_only()
+async def adstats(ctx, days: int = 30):
+    """Advertisement dashboard for this server: `!adstats [days]`, `!adstats rebuild`"""
+    if not isinstance(ctx.author, discord.Member) or not _is_staff(ctx.author):
+        await ctx.reply("❌ You must be **Blox Entertainment Staff** to use this command.", mention_author=True)
+        return
+
+    days = max(1, min(days, 365))
+    stats = ad_stats.summary(ctx.guild.id, days=days)
+    status, window = stats["status"], stats["window"]
+    embed = discord.Embed(title="📊 Advertisement Stats", color=discord.Color.blurple(), timestamp=datetime.utcnow())
+    embed.add_field(name="Now", value=(f"⏳ Pending: **{status['pending']}**\n"
+                                       f"✅ Approved: {status['approved']}\n"
+                                       f"❌ Denied: {status['denied']}"), inline=True)
+    embed.add_field(name=f"Last {days} day(s)", value=(f"📝 Submitted: **{window['submitted']}**\n"
+                                                       f"✅ Approved: {window['approved']}\n"
+                                                       f"❌ Denied: {window['denied']}"), inline=True)
+    embed.add_field(name="Approval rate", value=(f"Last {days}d: **{_format_rate(stats['approval_rate_window'])}**\n"
+                                                 f"All time: {_format_rate(stats['approval_rate'])}"), inline=True)
+    embed.add_field(name="Time to decision", value=(f"Median: **≈{_format_duration(stats['median_decision_seconds'])}**\n"
+                                                    f"p90: ≈{_format_duration(stats['p90_decision_seconds'])}\n"
+                                                    f"Mean: {_format_duration(stats['mean_decision_seconds'])}"), inline=True)
+    top = "\n".join(f"<@{user_id}> — {s['submitted']} submitted, {s['approved']} approved"
+                    for user_id, s in stats["top_advertisers"])
+    embed.add_field(name="Top advertisers", value=top or "None yet", inline=False)
+    if stats["rebuilt_at"]:
+        embed.set_footer(text=f"Last rebuilt {stats['rebuilt_at'][:16].replace('T', ' ')} UTC")
+    await ctx.reply(embed=embed, mention_author=True)
+
+@adstats.command(name="rebuild", description="Recompute the stats from every stored advertisement")
+async def adstats_rebuild(ctx):
+    """Recompute the aggregates from every stored advertisement"""
+    if not isinstance(ctx.author, discord.Member) or not _is_staff(ctx.author):
+        await ctx.reply("❌ You must be **Blox Entertainment Staff** to use this command.", mention_author=True)
+        return
+    await ctx.defer()
+    records = ad_store.load_ads()
+    records = await asyncio.to_thread(lambda: list(ad_store.iter_archived_ads())) + records
+    counted = ad_stats.rebuild(records)
+    await ctx.reply(f"✅ Advertisement stats rebuilt from **{counted}** record(s).", mention_author=True)
+
+# ===== COMMAND: !adlookup =====
+@bot.hybrid_command(description="Find advertisements by request ID or member, archived ones included (staff)")
+@app_commands.describe(target="Request ID, @member or member ID")
+@app_commands.guild_only()
+async def adlookup(ctx, target: str = None):
+    """Find advertisements by request ID or member, archived ones included: `!adlookup <ad_id | @member>`"""
+    if not isinstance(ctx.author, discord.Member) or not _is_staff(ctx.author):
+        await ctx.reply("❌ You must be **Blox Entertainment Staff** to use this command.", mention_author=True)
+        return
+    if target is None:
+        await ctx.reply("❌ Usage: `!adlookup <ad_id | @member | member ID>`", mention_author=True)
+        return
+
+    await ctx.defer()
+    match = MENTION_RE.match(target)
+    if match or target.isdigit():
+        user_id = int(match.group(1) if match else target)
+        live = [r for r in ad_store.load_ads() if r.get("user_id") == user_id]
+        archived = await asyncio.to_thread(ad_store.archived_user_ads, user_id)
+    else:
+        live = [r for r in ad_store.load_ads() if r.get("id") == target]
+        archived = [] if live else await asyncio.to_thread(ad_store.find_archived_ads, [target])
+    archived_ids = {r["id"] for r in archived}
+    records = [r for r in archived + live if r.get("guild_id") == ctx.guild.id]
+    if not records:
+        await ctx.reply("📭 No advertisements found.", mention_author=True)
+        return
+
+    records.sort(key=lambda r: r.get("submitted_at") or "", reverse=True)
+    lines = [
+        f"{'🗄️' if r['id'] in archived_ids else '📄'} `{r['id']}` — **{r.get('status', '?')}**, "
+        f"{(r.get('submitted_at') or '?')[:10]}, by {r.get('username')}\n> {(r.get('ad_text') or '')[:120]}"
+        for r in records[:10]
+    ]
+    embed = discord.Embed(title="🔎 Advertisement Lookup", description="\n".join(lines)[:4000],
+                          color=discord.Color.blurple(), timestamp=datetime.utcnow())
+    embed.set_footer(text=f"{len(records)} found ({len(archived_ids)} archived); newest 10 shown. 🗄️ = archived")
+    await ctx.reply(embed=embed, mention_author=True)
 
 # ===== CHANNEL PURGE TASK =====
 @tasks.loop(minutes=1)
 async def purge_channels():
-    channel_names = ["verify", "advertisement-commands"]
-    for name in channel_names:
-        channel = discord.utils.get(bot.get_all_channels(), name=name)
-        if channel and isinstance(channel, discord.TextChannel):
+    for guild in bot.guilds:
+        for kind in ("verify", "advertise"):
+            channel = guild_settings.channel(guild, kind, verif_manager.guild_index)
+            if channel is None:
+                continue
             try:
                 await channel.purge(limit=100, bulk=True)
             except Exception as e:
-                print(f"[PURGE] Failed to purge #{name}: {e}")
+                logger.warning("Failed to purge #%s: %s", channel.name, e, extra={"guild_id": guild.id})
+
+# ===== ARCHIVAL TASK =====
+@tasks.loop(minutes=Config.AD_ARCHIVE_INTERVAL_MINUTES)
+async def archive_ads():
+    """Move ads decided more than AD_ARCHIVE_AFTER_DAYS ago from the live store to the archive"""
+    batches = ad_store.select_for_archive(Config.AD_ARCHIVE_AFTER_DAYS)
+    if not batches:
+        return
+    archived = [r for records in batches.values() for r in records]
+    try:
+        # Archive files first, off the loop; the records only leave the live store once that succeeded
+        await asyncio.to_thread(ad_store.write_archive, batches)
+    except Exception as e:
+        logger.error("Failed to archive advertisements: %s", e)
+        return
+    removed = ad_store.drop_ads(r["id"] for r in archived)
+    if _ad_index is not None:
+        for r in archived:
+            if r.get("status") != "denied":
+                _ad_index.remove(r["id"])
+    logger.info("Archived %d advertisement(s) into %d partition(s)", removed, len(batches))
+
+_queue_view_registered = False
 
 @bot.event
 async def on_ready():
-    purge_channels.start()
-    print(f"[BOT3] Logged in as {bot.user} (ID: {bot.user.id})")
+    global _queue_view_registered
+    if not _queue_view_registered:
+        # Re-attach handlers to every !adreq queue message sent before a restart
+        bot.add_view(AdQueueView())
+        _queue_view_registered = True
+    if not purge_channels.is_running():
+        purge_channels.start()
+    if not archive_ads.is_running():
+        archive_ads.start()
+    ad_poster.start()
+    await guild_settings.start()
+    await credit_ledger.start()
+    if ad_stats.missing:
+        records = ad_store.load_ads()
+        ad_stats.rebuild(await asyncio.to_thread(lambda: list(ad_store.iter_archived_ads())) + records)
+    await _get_ad_index()
+    logger.info("Logged in as %s (ID: %s)", bot.user, bot.user.id)
 
 # ===== RUN BOT =====
 async def run_bot():
     if not TOKEN:
-        print("❌ bot3: No token — not starting.")
+        logger.error("No token — not starting.")
         return
-    await bot.start(TOKEN)
+    # Warm the caches before connecting so the first commands after a deploy don't all miss
+    await cache_snapshot.start()
+    try:
+        await bot.start(TOKEN)
+    finally:
+        await cache_snapshot.stop()
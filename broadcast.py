@@ -0,0 +1,80 @@
+import asyncio
+import time
+import discord
+
+
+class BroadcastResult:
+    """Outcome of sending to a single channel"""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.ok = False
+        self.attempts = 0
+        self.error = None
+        self.message_id = None
+        self.elapsed = 0.0
+
+
+class Broadcaster:
+    """Sends one payload to many channels concurrently.
+
+    Channels are fed through a queue to a bounded pool of workers. Transient
+    failures (429s and 5xx responses, network errors) are retried with
+    exponential backoff; permission and missing-channel errors are final.
+    """
+
+    def __init__(self, concurrency=5, max_retries=3, base_delay=1.0):
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+    @staticmethod
+    def _is_transient(error):
+        if isinstance(error, (discord.Forbidden, discord.NotFound)):
+            return False
+        if isinstance(error, discord.HTTPException):
+            return error.status == 429 or error.status >= 500
+        return isinstance(error, (asyncio.TimeoutError, OSError))
+
+    def _retry_delay(self, error, attempt):
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            return float(retry_after)
+        return self.base_delay * (2 ** (attempt - 1))
+
+    async def _send_one(self, channel, kwargs):
+        result = BroadcastResult(channel)
+        started = time.monotonic()
+        while True:
+            result.attempts += 1
+            try:
+                message = await channel.send(**kwargs)
+                result.ok = True
+                result.message_id = message.id
+                break
+            except Exception as e:
+                result.error = e
+                if result.attempts > self.max_retries or not self._is_transient(e):
+                    break
+                await asyncio.sleep(self._retry_delay(e, result.attempts))
+        result.elapsed = time.monotonic() - started
+        return result
+
+    async def send(self, channels, **kwargs):
+        """Send `kwargs` (e.g. embed=...) to every channel; returns results in input order"""
+        queue = asyncio.Queue()
+        for position, channel in enumerate(channels):
+            queue.put_nowait((position, channel))
+        results = [None] * len(channels)
+
+        async def worker():
+            while True:
+                try:
+                    position, channel = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[position] = await self._send_one(channel, kwargs)
+
+        workers = min(self.concurrency, len(channels))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        return results
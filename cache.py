@@ -0,0 +1,90 @@
+import time
+
+
+class TTLCache:
+    """Small dict-backed cache whose entries expire `ttl` seconds after being set.
+
+    dump()/warm() carry entries across restarts (see cache_snapshot.py).
+    Warmed entries are only moved into the cache when first looked up.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = {}  # key: (expires_at, value)
+        self._warm = {}  # key: (wall-clock expires_at, value) restored from a snapshot
+        self.warm_hits = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, self._MISSING) is not self._MISSING
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            if not self._warm or not self._promote(key):
+                return default
+            item = self._data[key]
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        return value
+
+    def set(self, key, value, ttl=None):
+        if self._warm:
+            self._warm.pop(key, None)
+        if len(self._data) >= self.max_size and key not in self._data:
+            self._evict()
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def pop(self, key, default=None):
+        self._warm.pop(key, None)
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+        self._warm.clear()
+
+    # ===== Snapshots =====
+    def dump(self):
+        """Unexpired entries as [(key, value, wall-clock expires_at)]"""
+        now, wall_now = time.monotonic(), time.time()
+        entries = [(key, value, wall_now + expires_at - now)
+                   for key, (expires_at, value) in self._data.items() if expires_at > now]
+        entries.extend((key, value, expires_at) for key, (expires_at, value) in self._warm.items()
+                       if expires_at > wall_now and key not in self._data)
+        return entries
+
+    def warm(self, entries):
+        """Queue snapshot entries; each is used on first lookup if it hasn't expired by then"""
+        wall_now = time.time()
+        for key, value, expires_at in entries:
+            if expires_at > wall_now and key not in self._data:
+                self._warm[key] = (expires_at, value)
+
+    def _promote(self, key):
+        item = self._warm.pop(key, None)
+        if item is None:
+            return False
+        remaining = item[0] - time.time()
+        if remaining <= 0:
+            return False
+        self.set(key, item[1], ttl=remaining)
+        self.warm_hits += 1
+        return True
+
+    def _evict(self):
+        now = time.monotonic()
+        expired = [k for k, (expires_at, _) in self._data.items() if expires_at < now]
+        for key in expired:
+            del self._data[key]
+        if len(self._data) >= self.max_size:
+            # Still full: drop the oldest tenth (dicts keep insertion order)
+            for key in list(self._data)[:max(1, self.max_size // 10)]:
+                del self._data[key]
@@ -0,0 +1,132 @@
+import logging
+import os
+import sys
+import time
+import zlib
+import marshal
+import asyncio
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# marshal's format is tied to the interpreter version, so snapshots from another version are ignored
+MAGIC = b"BESNAP1 " + f"{sys.version_info[0]}.{sys.version_info[1]}".encode() + b"\n"
+
+
+class CacheSnapshot:
+    """Warm-start snapshots of a bot's TTLCaches.
+
+    register() names the caches to keep. save() writes every unexpired entry
+    with its wall-clock expiry to one zlib-compressed marshal file (written to
+    a temp file and renamed, so a crash mid-write leaves the old snapshot).
+    restore() reads it off the event loop and hands the entries to each
+    cache's warm(); entries are only moved in when first looked up, and
+    anything that expired while the bot was down is skipped, so TTLs hold
+    across restarts. start() restores once and then saves every `interval`
+    seconds; call stop() on shutdown for a final save.
+    """
+
+    def __init__(self, name, directory=None, interval=None, enabled=None):
+        self.name = name
+        self.path = os.path.join(directory or Config.CACHE_SNAPSHOT_DIR, f"{name}.bin")
+        self.interval = interval or Config.CACHE_SNAPSHOT_INTERVAL_SECONDS
+        self.enabled = Config.CACHE_SNAPSHOTS if enabled is None else enabled
+        self.caches = {}  # section name: TTLCache
+        self.restored = False
+        self._task = None
+        self.stats = {"saves": 0, "saved_entries": 0, "restored_entries": 0, "save_ms": 0.0}
+
+    def register(self, section, cache):
+        self.caches[section] = cache
+        return cache
+
+    def warm_hits(self):
+        return {section: cache.warm_hits for section, cache in self.caches.items()}
+
+    # ===== Lifecycle =====
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        await self.restore()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.restored:
+            logger.info("Cache snapshot warm hits: %s", self.warm_hits())
+        await self.save()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
+
+    # ===== Saving =====
+    async def save(self):
+        """Write the current cache contents; returns the number of entries written"""
+        if not self.enabled or not self.caches:
+            return 0
+        started = time.perf_counter()
+        # Collect on the loop (caches aren't thread-safe); encode and write in a thread
+        sections = {section: cache.dump() for section, cache in self.caches.items()}
+        try:
+            written = await asyncio.to_thread(self._write, sections)
+        except Exception as e:
+            logger.warning("Failed to write cache snapshot %s: %s", self.path, e)
+            return 0
+        self.stats["saves"] += 1
+        self.stats["saved_entries"] = written
+        self.stats["save_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.debug("Cache snapshot written: %d entries in %sms", written, self.stats["save_ms"])
+        return written
+
+    def _write(self, sections):
+        payload, written = {}, 0
+        for section, entries in sections.items():
+            try:
+                payload[section] = marshal.dumps(entries)
+                written += len(entries)
+            except ValueError as e:
+                logger.warning("Cache section %s is not snapshot-able: %s", section, e)
+        data = MAGIC + zlib.compress(marshal.dumps(payload), 6)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+        return written
+
+    # ===== Restoring =====
+    async def restore(self):
+        """Load the last snapshot into the registered caches; returns the number of entries queued"""
+        if self.restored or not self.enabled:
+            return 0
+        self.restored = True
+        try:
+            sections = await asyncio.to_thread(self._read)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache snapshot %s: %s", self.path, e)
+            return 0
+
+        restored = 0
+        for section, entries in sections.items():
+            cache = self.caches.get(section)
+            if cache is None:
+                continue
+            cache.warm(entries)
+            restored += len(entries)
+        self.stats["restored_entries"] = restored
+        logger.info("Cache snapshot restored: %d entries from %s", restored, self.path)
+        return restored
+
+    def _read(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError("written by a different snapshot format or Python version")
+        payload = marshal.loads(zlib.decompress(data[len(MAGIC):]))
+        return {section: marshal.loads(blob) for section, blob in payload.items()}
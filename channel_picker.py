@@ -0,0 +1,210 @@
+import discord
+from discord.ui import View, Select, Button, Modal, TextInput
+
+SELECT_OPTION_LIMIT = 25
+
+
+class SendableChannelCache:
+    """Per-guild cache of text channels the bot can send messages in.
+
+    permissions_for() walks every role and overwrite, so the result is kept
+    until something that can change it happens: a channel is created, updated
+    (overwrites) or deleted, a role changes, or the bot's own roles change.
+    """
+
+    CHANNEL_EVENTS = ("on_guild_channel_create", "on_guild_channel_update", "on_guild_channel_delete")
+    ROLE_EVENTS = ("on_guild_role_create", "on_guild_role_update", "on_guild_role_delete")
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._channels = {}  # guild_id: [text_channel]
+
+        for event in self.CHANNEL_EVENTS:
+            bot.add_listener(self._on_channel_event, event)
+        for event in self.ROLE_EVENTS:
+            bot.add_listener(self._on_role_event, event)
+        bot.add_listener(self._on_member_update, "on_member_update")
+        bot.add_listener(self._on_guild_remove, "on_guild_remove")
+
+    async def _on_channel_event(self, *args):
+        guild = getattr(args[-1], "guild", None)
+        if guild is not None:
+            self.invalidate(guild.id)
+
+    async def _on_role_event(self, *args):
+        self.invalidate(args[-1].guild.id)
+
+    async def _on_member_update(self, before, after):
+        if self.bot.user and after.id == self.bot.user.id and before.roles != after.roles:
+            self.invalidate(after.guild.id)
+
+    async def _on_guild_remove(self, guild):
+        self.invalidate(guild.id)
+
+    def invalidate(self, guild_id):
+        self._channels.pop(guild_id, None)
+
+    def get(self, guild):
+        channels = self._channels.get(guild.id)
+        if channels is None:
+            me = guild.me
+            channels = [c for c in guild.text_channels if c.permissions_for(me).send_messages]
+            self._channels[guild.id] = channels
+        return channels
+
+
+class ChannelSearchModal(Modal, title="Search channels"):
+    query = TextInput(label="Channel or category name", required=False, max_length=100,
+                      placeholder="Leave empty to show all channels")
+
+    def __init__(self, picker):
+        super().__init__()
+        self.picker = picker
+        self.query.default = picker.query
+
+    async def on_submit(self, interaction: discord.Interaction):
+        self.picker.set_query(self.query.value or "")
+        await interaction.response.edit_message(content=self.picker.status(), view=self.picker)
+
+
+class ChannelPageSelect(Select):
+    def __init__(self, picker):
+        super().__init__(placeholder="Select channel", options=[discord.SelectOption(label="-")])
+        self.picker = picker
+
+    async def callback(self, interaction: discord.Interaction):
+        picker = self.picker
+        page_ids = {o.value for o in self.options}
+        picker.selected = [cid for cid in picker.selected if str(cid) not in page_ids]
+        picker.selected.extend(int(v) for v in self.values)
+        if picker.max_values == 1:
+            picker.finish()
+            await interaction.response.edit_message(content=picker.status(), view=None)
+            return
+        if picker.max_values and len(picker.selected) > picker.max_values:
+            picker.selected = picker.selected[-picker.max_values:]
+        picker.refresh()
+        await interaction.response.edit_message(content=picker.status(), view=picker)
+
+
+class ChannelPicker(View):
+    """Paginated, searchable channel picker.
+
+    Works around the 25-option Select limit by paging through the channel list;
+    a Search button filters by channel or category name. Multi-select pickers
+    keep their selection across pages until Done is pressed.
+    """
+
+    def __init__(self, author, channels, prompt, max_values=1, timeout=120):
+        super().__init__(timeout=timeout)
+        self.author = author
+        self.prompt = prompt
+        self.all_channels = list(channels)
+        self.max_values = max_values  # None = unlimited
+        self.query = ""
+        self.page = 0
+        self.selected = []  # channel ids, in selection order
+        self.completed = False
+
+        self.select = ChannelPageSelect(self)
+        self.prev_button = Button(label="◀", style=discord.ButtonStyle.secondary)
+        self.next_button = Button(label="▶", style=discord.ButtonStyle.secondary)
+        self.search_button = Button(label="Search", emoji="🔎", style=discord.ButtonStyle.primary)
+        self.done_button = Button(label="Done", style=discord.ButtonStyle.success)
+        self.prev_button.callback = self._prev
+        self.next_button.callback = self._next
+        self.search_button.callback = self._search
+        self.done_button.callback = self._done
+
+        self.add_item(self.select)
+        self.add_item(self.prev_button)
+        self.add_item(self.next_button)
+        self.add_item(self.search_button)
+        if max_values != 1:
+            self.add_item(self.done_button)
+        self.refresh()
+
+    # ===== State =====
+    @staticmethod
+    def _matches(channel, query):
+        if not query:
+            return True
+        category = channel.category.name.lower() if channel.category else ""
+        return query in channel.name.lower() or query in category
+
+    @property
+    def filtered(self):
+        query = self.query.lower()
+        return [c for c in self.all_channels if self._matches(c, query)]
+
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.filtered) // SELECT_OPTION_LIMIT))
+
+    def set_query(self, query):
+        self.query = query.strip()
+        self.page = 0
+        self.refresh()
+
+    def refresh(self):
+        channels = self.filtered
+        self.page = min(self.page, self.page_count - 1)
+        start = self.page * SELECT_OPTION_LIMIT
+        page_channels = channels[start:start + SELECT_OPTION_LIMIT]
+        selected = set(self.selected)
+
+        if page_channels:
+            self.select.options = [
+                discord.SelectOption(
+                    label=c.name[:100],
+                    value=str(c.id),
+                    description=(c.category.name[:100] if c.category else None),
+                    default=c.id in selected and self.max_values != 1,
+                )
+                for c in page_channels
+            ]
+            self.select.disabled = False
+        else:
+            self.select.options = [discord.SelectOption(label="No matching channels", value="0")]
+            self.select.disabled = True
+        limit = self.max_values or SELECT_OPTION_LIMIT
+        self.select.min_values = 0 if self.max_values != 1 else 1
+        self.select.max_values = max(1, min(limit, len(self.select.options)))
+        self.select.placeholder = f"Select channel{'s' if self.max_values != 1 else ''} (page {self.page + 1}/{self.page_count})"
+        self.prev_button.disabled = self.page == 0
+        self.next_button.disabled = self.page >= self.page_count - 1
+        self.done_button.disabled = not self.selected
+
+    def status(self):
+        parts = [self.prompt]
+        if self.query:
+            parts.append(f"🔎 Filter: `{self.query}` — {len(self.filtered)} match(es)")
+        if self.selected:
+            parts.append(f"✅ Selected: " + ", ".join(f"<#{cid}>" for cid in self.selected[:40])
+                         + (f" (+{len(self.selected) - 40} more)" if len(self.selected) > 40 else ""))
+        return "\n".join(parts)
+
+    def finish(self):
+        self.completed = True
+        self.stop()
+
+    # ===== Callbacks =====
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.author.id
+
+    async def _prev(self, interaction: discord.Interaction):
+        self.page -= 1
+        self.refresh()
+        await interaction.response.edit_message(content=self.status(), view=self)
+
+    async def _next(self, interaction: discord.Interaction):
+        self.page += 1
+        self.refresh()
+        await interaction.response.edit_message(content=self.status(), view=self)
+
+    async def _search(self, interaction: discord.Interaction):
+        await interaction.response.send_modal(ChannelSearchModal(self))
+
+    async def _done(self, interaction: discord.Interaction):
+        self.finish()
+        await interaction.response.edit_message(content=self.status(), view=None)
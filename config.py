@@ -6,20 +6,123 @@ class Config:
     # Discord Bot Token (from environment variable)
     DISCORD_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
     
+    # Roblox API hosts (ROBLOX_API_BASE points all of them at one server, e.g. roblox_emulator.py)
+    ROBLOX_API_BASE = os.getenv("ROBLOX_API_BASE")
+    ROBLOX_USERS_HOST = ROBLOX_API_BASE or os.getenv("ROBLOX_USERS_HOST", "https://users.roblox.com")
+    ROBLOX_THUMBNAILS_HOST = ROBLOX_API_BASE or os.getenv("ROBLOX_THUMBNAILS_HOST", "https://thumbnails.roblox.com")
+    ROBLOX_GAMES_HOST = ROBLOX_API_BASE or os.getenv("ROBLOX_GAMES_HOST", "https://games.roblox.com")
+    ROBLOX_CATALOG_HOST = ROBLOX_API_BASE or os.getenv("ROBLOX_CATALOG_HOST", "https://catalog.roblox.com")
+    ROBLOX_GROUPS_HOST = ROBLOX_API_BASE or os.getenv("ROBLOX_GROUPS_HOST", "https://groups.roblox.com")
+
     # Roblox API endpoints
-    ROBLOX_USER_API = "https://users.roblox.com/v1/users/{user_id}"
-    ROBLOX_USERNAME_API = "https://users.roblox.com/v1/usernames/users"
+    ROBLOX_USER_API = ROBLOX_USERS_HOST + "/v1/users/{user_id}"
+    ROBLOX_USERNAME_API = ROBLOX_USERS_HOST + "/v1/usernames/users"
+    ROBLOX_INFO_CACHE_TTL = 600  # seconds to cache game/catalog/group lookups
+    ROBLOX_THUMBNAIL_CACHE_TTL = 3600
+    VERIFIED_CACHE_TTL = 300  # seconds to cache discord_id -> verified Roblox username
+    VERIFIED_MISS_CACHE_TTL = 5  # seconds to remember that a discord_id is not verified
+    ROBLOX_USER_CACHE_TTL = 6 * 3600  # seconds to cache username -> Roblox user ID
+
+    # Warm-start snapshots of the caches above, written periodically and on shutdown
+    CACHE_SNAPSHOTS = os.getenv("CACHE_SNAPSHOTS", "1") != "0"
+    CACHE_SNAPSHOT_DIR = os.getenv("CACHE_SNAPSHOT_DIR", "data/snapshots")
+    CACHE_SNAPSHOT_INTERVAL_SECONDS = 300
     
     # Verification settings
     CODE_LENGTH = 4
     CODE_EXPIRY_MINUTES = 10
+    # Repeated commands from one user within these windows reuse the last result
+    VERIFY_COOLDOWN_SECONDS = 30
+    CHECK_COOLDOWN_SECONDS = 5
+    ADVERTISE_COOLDOWN_SECONDS = 30
     
     # File paths
     VERIFICATION_DATA_FILE = "data/verifications.json"
+    EMBED_TEMPLATE_FILE = "data/embed_templates.json"
+    AD_POST_QUEUE_FILE = "data/ad_post_queue.json"
+    AD_STATS_FILE = "data/ad_stats.json"
+
+    # Approved-ad posting (seconds between posts per channel, e.g. "approved-ads=60,partner-ads=300")
+    AD_POST_SPACING_SECONDS = int(os.getenv("AD_POST_SPACING_SECONDS", "30"))
+    AD_POST_CHANNEL_SPACING = os.getenv("AD_POST_CHANNEL_SPACING", "")
+    AD_POST_MAX_ATTEMPTS = 5
+    AD_POST_RETRY_BASE_SECONDS = 30
+    AD_POST_DEDUPE_HOURS = 24
+
+    # Ads decided more than this many days ago move from the live store to gzipped monthly archive files
+    AD_ARCHIVE_AFTER_DAYS = int(os.getenv("AD_ARCHIVE_AFTER_DAYS", "30"))
+    AD_ARCHIVE_INTERVAL_MINUTES = 60
+
+    # Near-duplicate ad detection (flag matches of denied ads, or any ad this recent)
+    AD_SIMILARITY_THRESHOLD = 0.6
+    AD_SIMILARITY_RECENT_DAYS = 30
     
+    # DM delivery (dm_delivery.py). Discord allows ~50 requests/s per bot and a first DM costs two (open, send),
+    # so the default leaves room for replies, role changes and logs. DM_WORKERS=0 sizes the pool from the rate.
+    DM_SENDS_PER_SECOND = float(os.getenv("DM_SENDS_PER_SECOND", "10"))
+    DM_WORKERS = int(os.getenv("DM_WORKERS", "0"))
+    DM_QUEUE_SIZE = int(os.getenv("DM_QUEUE_SIZE", "1000"))
+    DM_CLOSED_TTL_SECONDS = 6 * 3600  # how long a 403 marks a user's DMs closed
+
+    # Sampling profiler (profiler.py), started by !profile or the /profile HTTP endpoint (which needs PROFILER_TOKEN)
+    PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+    PROFILER_MAX_SECONDS = 600
+    PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+
     # Bot settings
     COMMAND_PREFIX = "!"
+
+    # Command surface: "hybrid" (prefix and slash, default), "prefix", or "slash" (slash only, which drops the
+    # message_content intent and message events entirely)
+    COMMAND_MODE = os.getenv("COMMAND_MODE", "hybrid").strip().lower()
+    SYNC_APP_COMMANDS = os.getenv("SYNC_APP_COMMANDS", "1") != "0"
+    GATEWAY_METER_LOG_SECONDS = int(os.getenv("GATEWAY_METER_LOG_SECONDS", "300"))
+
+    # Multi-guild: per-guild settings live in the guild_settings table; the home guild is seeded with the original IDs
+    HOME_GUILD_ID = int(os.getenv("HOME_GUILD_ID", "1406058084484518021"))
+    GUILD_SETTINGS_RELOAD_SECONDS = 300
+
+    # Sharding (opt-in): SHARD_COUNT="auto" or a number, optionally per bot (BOT1_SHARD_COUNT=...);
+    # SHARD_IDS="0,1" runs only those shards, for splitting one bot across processes
+    SHARD_COUNT = os.getenv("SHARD_COUNT", "")
+    SHARD_IDS = os.getenv("SHARD_IDS", "")
     
+    @classmethod
+    def ad_post_channel_spacing(cls):
+        """Parse AD_POST_CHANNEL_SPACING into {channel_name: seconds}"""
+        spacing = {}
+        for item in cls.AD_POST_CHANNEL_SPACING.split(","):
+            name, _, seconds = item.partition("=")
+            if name.strip() and seconds.strip():
+                spacing[name.strip()] = float(seconds)
+        return spacing
+
+    @classmethod
+    def shard_options(cls, bot_name):
+        """AutoShardedBot keyword arguments for `bot_name`, or None to run unsharded"""
+        count = (os.getenv(f"{bot_name.upper()}_SHARD_COUNT") or cls.SHARD_COUNT).strip().lower()
+        ids = (os.getenv(f"{bot_name.upper()}_SHARD_IDS") or cls.SHARD_IDS).strip()
+        if not count or count in ("0", "off", "false"):
+            return None
+        options = {}
+        if count != "auto":
+            options["shard_count"] = int(count)
+        if ids:
+            if "shard_count" not in options:
+                raise ValueError("SHARD_IDS requires a numeric SHARD_COUNT")
+            options["shard_ids"] = [int(i) for i in ids.split(",") if i.strip()]
+        return options
+
+    @classmethod
+    def set_roblox_hosts(cls, base=None, **hosts):
+        """Point the Roblox hosts at `base` (all of them) and/or per-service URLs (users=..., games=...)"""
+        for service in ("users", "thumbnails", "games", "catalog", "groups"):
+            url = hosts.get(service) or base
+            if url:
+                setattr(cls, f"ROBLOX_{service.upper()}_HOST", url.rstrip("/"))
+        cls.ROBLOX_USER_API = cls.ROBLOX_USERS_HOST + "/v1/users/{user_id}"
+        cls.ROBLOX_USERNAME_API = cls.ROBLOX_USERS_HOST + "/v1/usernames/users"
+
     @classmethod
     def validate_config(cls):
         """Validate that required configuration is present"""
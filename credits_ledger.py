@@ -0,0 +1,226 @@
+import logging
+import os
+import asyncio
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+WELCOME_CREDITS = 5
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS credit_ledger (
+        id BIGSERIAL PRIMARY KEY,
+        account TEXT NOT NULL,
+        discord_id BIGINT,
+        delta INT NOT NULL,
+        reason TEXT NOT NULL,
+        ref TEXT,
+        actor_id BIGINT,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS credit_ledger_account_idx ON credit_ledger (account, created_at DESC);
+    CREATE UNIQUE INDEX IF NOT EXISTS credit_ledger_ref_idx ON credit_ledger (ref) WHERE ref IS NOT NULL;
+    CREATE OR REPLACE RULE credit_ledger_no_update AS ON UPDATE TO credit_ledger DO INSTEAD NOTHING;
+    CREATE OR REPLACE RULE credit_ledger_no_delete AS ON DELETE TO credit_ledger DO INSTEAD NOTHING;
+
+    CREATE TABLE IF NOT EXISTS credit_balances (
+        account TEXT PRIMARY KEY,
+        discord_id BIGINT,
+        balance INT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    );
+    CREATE INDEX IF NOT EXISTS credit_balances_discord_idx ON credit_balances (discord_id);
+"""
+
+LEDGER_COLUMNS = ("account", "discord_id", "delta", "reason", "ref", "actor_id")
+
+# Adds summed deltas per account in one statement; $1..$3 are parallel arrays
+APPLY_DELTAS = """
+    INSERT INTO credit_balances (account, discord_id, balance, updated_at)
+    SELECT account, discord_id, delta, now()
+    FROM unnest($1::text[], $2::bigint[], $3::int[]) AS t(account, discord_id, delta)
+    ON CONFLICT (account) DO UPDATE
+    SET balance = credit_balances.balance + EXCLUDED.balance,
+        discord_id = COALESCE(EXCLUDED.discord_id, credit_balances.discord_id),
+        updated_at = now()
+    RETURNING account, discord_id, balance
+"""
+
+
+def account_key(roblox_username):
+    """Credits follow the Roblox account, so a new Discord account can't claim a second welcome grant"""
+    return roblox_username.strip().lower()
+
+
+class CreditLedger:
+    """BEcredits as an append-only ledger with a materialized balance per account.
+
+    Every change is a credit_ledger row; credit_balances holds the running total
+    and is updated in the same transaction. All balances are loaded at start()
+    and kept current after each write, so balance reads are dict lookups. Rows
+    with a `ref` are idempotent: the welcome grant and per-ad refunds can be
+    retried without double-crediting.
+    """
+
+    def __init__(self, dsn=None):
+        self.dsn = dsn if dsn is not None else (os.getenv("BOT3_POSTGRES_URL") or os.getenv("DATABASE_URL"))
+        self.pool = None
+        self.ready = False
+        self._balances = {}  # account: balance
+        self._accounts = {}  # discord_id: account
+        self._start_lock = asyncio.Lock()
+
+    # ===== Startup =====
+    async def start(self):
+        async with self._start_lock:
+            if self.ready:
+                return
+            if not self.dsn:
+                logger.error("BOT3_POSTGRES_URL/DATABASE_URL not set; BEcredits are unavailable.")
+                return
+            try:
+                self.pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=5)
+                async with self.pool.acquire() as conn:
+                    await conn.execute(SCHEMA)
+                    await self._migrate_legacy(conn)
+                await self.reload()
+                self.ready = True
+                logger.info("Credit ledger ready with %d account(s)", len(self._balances))
+            except Exception as e:
+                logger.error("Failed to start credit ledger: %s", e)
+
+    async def reload(self):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT account, discord_id, balance FROM credit_balances")
+        self._balances = {r["account"]: r["balance"] for r in rows}
+        self._accounts = {r["discord_id"]: r["account"] for r in rows if r["discord_id"] is not None}
+
+    async def _migrate_legacy(self, conn):
+        """One-time import of be_credits balances and credits_received markers into an empty ledger"""
+        if await conn.fetchval("SELECT EXISTS (SELECT 1 FROM credit_ledger)"):
+            return
+        rows = []
+        if await conn.fetchval("SELECT to_regclass('be_credits') IS NOT NULL"):
+            for r in await conn.fetch("SELECT discord_id, roblox_username, credits FROM be_credits"):
+                account = account_key(r["roblox_username"])
+                rows.append((account, r["discord_id"], r["credits"], "migrated_balance", None, None))
+                rows.append((account, r["discord_id"], 0, "welcome", f"welcome:{account}", None))
+        if await conn.fetchval("SELECT to_regclass('credits_received') IS NOT NULL"):
+            for r in await conn.fetch("SELECT roblox_username FROM credits_received"):
+                account = account_key(r["roblox_username"])
+                rows.append((account, None, 0, "welcome", f"welcome:{account}", None))
+        if not rows:
+            return
+        # Keep only the first welcome marker per account
+        seen, unique = set(), []
+        for row in rows:
+            if row[4] is None or row[4] not in seen:
+                seen.add(row[4])
+                unique.append(row)
+        async with conn.transaction():
+            await self._write(conn, unique)
+        logger.info("Migrated %d legacy credit record(s) into the ledger", len(unique))
+
+    # ===== Reads =====
+    def balance(self, account):
+        return self._balances.get(account_key(account))
+
+    def balance_for(self, discord_id):
+        account = self._accounts.get(discord_id)
+        return self._balances.get(account) if account else None
+
+    def account_for(self, discord_id):
+        return self._accounts.get(discord_id)
+
+    def accounts(self):
+        return list(self._balances)
+
+    async def history(self, account, limit=10):
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(
+                "SELECT delta, reason, ref, actor_id, created_at FROM credit_ledger "
+                "WHERE account = $1 ORDER BY created_at DESC, id DESC LIMIT $2",
+                account_key(account), limit)
+
+    # ===== Writes =====
+    async def _write(self, conn, rows):
+        """Append ledger rows and apply their summed deltas; call inside a transaction"""
+        await conn.copy_records_to_table("credit_ledger", records=rows, columns=LEDGER_COLUMNS)
+        totals, discord_ids = {}, {}
+        for account, discord_id, delta, *_ in rows:
+            totals[account] = totals.get(account, 0) + delta
+            if discord_id is not None:
+                discord_ids[account] = discord_id
+        accounts = list(totals)
+        return await conn.fetch(APPLY_DELTAS, accounts, [discord_ids.get(a) for a in accounts],
+                                [totals[a] for a in accounts])
+
+    def _remember(self, updated):
+        for r in updated:
+            self._balances[r["account"]] = r["balance"]
+            if r["discord_id"] is not None:
+                self._accounts[r["discord_id"]] = r["account"]
+
+    async def ensure_welcome_grant(self, roblox_username, discord_id, amount=WELCOME_CREDITS):
+        """Grant the one-time welcome credits to this Roblox account; returns True if granted now"""
+        account = account_key(roblox_username)
+        if account in self._balances:
+            if discord_id is not None and self._accounts.get(discord_id) != account:
+                self._accounts[discord_id] = account
+            return False
+        ref = f"welcome:{account}"
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    if await conn.fetchval("SELECT 1 FROM credit_ledger WHERE ref = $1", ref):
+                        return False
+                    self._remember(await self._write(conn, [(account, discord_id, amount, "welcome", ref, None)]))
+        except asyncpg.UniqueViolationError:
+            return False  # granted concurrently
+        return True
+
+    async def spend(self, roblox_username, amount=1, reason="advertisement", discord_id=None, ref=None):
+        """Deduct `amount` if the balance allows it; returns the new balance, or None if insufficient"""
+        account = account_key(roblox_username)
+        if self._balances.get(account, 0) < amount:
+            return None
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(
+                    "UPDATE credit_balances SET balance = balance - $2, updated_at = now() "
+                    "WHERE account = $1 AND balance >= $2 RETURNING balance",
+                    account, amount)
+                if row is None:
+                    return None
+                await conn.execute(
+                    "INSERT INTO credit_ledger (account, discord_id, delta, reason, ref) VALUES ($1, $2, $3, $4, $5)",
+                    account, discord_id, -amount, reason, ref)
+        self._balances[account] = row["balance"]
+        return row["balance"]
+
+    async def apply_adjustments(self, adjustments, reason, actor_id=None):
+        """Apply many (roblox_username, discord_id, delta, ref) adjustments in one transaction.
+
+        Adjustments whose ref was already used are skipped. Returns
+        {account: new balance} for the accounts that changed.
+        """
+        rows, refs = [], set()
+        for roblox_username, discord_id, delta, ref in adjustments:
+            if ref is not None:
+                if ref in refs:
+                    continue
+                refs.add(ref)
+            rows.append((account_key(roblox_username), discord_id, int(delta), reason, ref, actor_id))
+        if not rows:
+            return {}
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if refs:
+                    used = {r["ref"] for r in await conn.fetch(
+                        "SELECT ref FROM credit_ledger WHERE ref = ANY($1::text[])", list(refs))}
+                    rows = [r for r in rows if r[4] is None or r[4] not in used]
+                    if not rows:
+                        return {}
+                updated = await self._write(conn, rows)
+        self._remember(updated)
+        return {r["account"]: r["balance"] for r in updated}
@@ -0,0 +1,205 @@
+import logging
+import math
+import time
+import asyncio
+import itertools
+from collections import deque
+import discord
+from config import Config
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Lower numbers are delivered first
+PRIORITY_VERIFICATION = 0  # verification codes: a member is waiting on them
+PRIORITY_PROMPT = 1  # prompts that start a DM conversation (!advertise)
+PRIORITY_NOTICE = 2  # decision notices and other announcements
+PRIORITY_NAMES = {PRIORITY_VERIFICATION: "verification", PRIORITY_PROMPT: "prompt", PRIORITY_NOTICE: "notice"}
+
+# Outcomes returned by DMDelivery.send()
+SENT, QUEUED, CLOSED, FAILED, OVERLOADED = "sent", "queued", "closed", "failed", "overloaded"
+
+# Rough time one DM takes (opening the DM channel, then the send), used to size the worker pool
+DM_SEND_SECONDS = 0.4
+
+# bot_name: DMDelivery, so one command can report on every bot in the process
+DELIVERIES = {}
+
+
+class _Job:
+    __slots__ = ("user", "kwargs", "priority", "recheck", "future", "enqueued_at")
+
+    def __init__(self, user, kwargs, priority, recheck, future):
+        self.user = user
+        self.kwargs = kwargs
+        self.priority = priority
+        self.recheck = recheck
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class DMDelivery:
+    """Sends DMs from a bounded priority queue through a small worker pool.
+
+    send() queues the message and (unless wait=False) waits for the outcome,
+    so a command handler never holds a rate-limit slot itself. Workers take
+    the lowest priority number first and are paced to `rate` DMs/second
+    across the pool; there are just enough of them to keep that rate busy.
+    The queue holds at most `max_queued` messages, and the last
+    `reserved` slots only take verification codes, so a burst of notices
+    can't lock members out of verifying; past that send() returns
+    "overloaded" straight away. A 403 marks the user's DMs closed for
+    `closed_ttl` seconds and later sends to them return "closed" without
+    a request; pass recheck=True when the member asked for the DM (they may
+    have just opened their DMs). Transient errors are retried with backoff.
+    """
+
+    def __init__(self, bot_name, rate=None, workers=None, max_queued=None, closed_ttl=None,
+                 max_retries=3, base_delay=1.0, latency_samples=500):
+        self.bot_name = bot_name
+        self.rate = Config.DM_SENDS_PER_SECOND if rate is None else rate  # 0 disables pacing
+        self.workers = workers or Config.DM_WORKERS or max(1, math.ceil(self.rate * DM_SEND_SECONDS))
+        self.max_queued = max_queued or Config.DM_QUEUE_SIZE
+        self.reserved = max(1, self.max_queued // 5)
+        self.closed = TTLCache(closed_ttl or Config.DM_CLOSED_TTL_SECONDS)  # user_id: True
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._queue = None
+        self._seq = itertools.count()
+        self._tasks = []
+        self._next_slot = 0.0
+        self.queued = {p: 0 for p in PRIORITY_NAMES}
+        self.max_depth = 0
+        self.latencies = {p: deque(maxlen=latency_samples) for p in PRIORITY_NAMES}  # enqueue -> delivered, seconds
+        # "closed" counts every DM to a closed user; "closed_skipped" those that never reached Discord
+        self.stats = {"queued": 0, "sent": 0, "closed": 0, "closed_skipped": 0, "failed": 0, "retries": 0,
+                      "overloaded": 0}
+        DELIVERIES[bot_name] = self
+
+    @property
+    def depth(self):
+        return sum(self.queued.values())
+
+    def is_closed(self, user):
+        return self.closed.get(getattr(user, "id", user)) is not None
+
+    # ===== Queueing =====
+    async def send(self, user, content=None, priority=PRIORITY_NOTICE, wait=True, recheck=False, **kwargs):
+        """DM `user`; returns "sent", "closed", "failed" or "overloaded" ("queued" with wait=False)"""
+        if not recheck and self.is_closed(user):
+            self.stats["closed"] += 1
+            self.stats["closed_skipped"] += 1
+            return CLOSED
+        limit = self.max_queued if priority == PRIORITY_VERIFICATION else self.max_queued - self.reserved
+        if self.depth >= limit:
+            self.stats["overloaded"] += 1
+            logger.warning("DM queue full (%d queued); %s DM not sent", self.depth, PRIORITY_NAMES[priority],
+                           extra={"bot": self.bot_name, "user_id": getattr(user, "id", None)})
+            return OVERLOADED
+
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._seq), _Job(user, dict(kwargs, content=content), priority, recheck, future)))
+        self.queued[priority] += 1
+        self.max_depth = max(self.max_depth, self.depth)
+        self.stats["queued"] += 1
+        if not wait:
+            return QUEUED
+        return await asyncio.shield(future)
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        self._tasks = [t for t in self._tasks if not t.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    # ===== Delivery =====
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            self.queued[job.priority] -= 1
+            try:
+                outcome = await self._deliver(job)
+            except Exception as e:
+                logger.exception("DM delivery crashed: %s", e, extra={"bot": self.bot_name})
+                outcome = FAILED
+            if outcome == SENT:
+                self.latencies[job.priority].append(time.monotonic() - job.enqueued_at)
+            self.stats[outcome] += 1
+            if not job.future.done():
+                job.future.set_result(outcome)
+
+    async def _pace(self):
+        """Wait for the next send slot shared by every worker"""
+        if not self.rate:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _deliver(self, job):
+        user_id = getattr(job.user, "id", None)
+        # Another queued DM may have found this user's DMs closed in the meantime
+        if not job.recheck and self.is_closed(job.user):
+            self.stats["closed_skipped"] += 1
+            return CLOSED
+        attempt = 0
+        while True:
+            attempt += 1
+            await self._pace()
+            try:
+                await job.user.send(**job.kwargs)
+                self.closed.pop(user_id)
+                return SENT
+            except discord.Forbidden:
+                # 50007 "Cannot send messages to this user": DMs closed or the bot is blocked
+                self.closed.set(user_id, True)
+                logger.info("DMs closed", extra={"bot": self.bot_name, "user_id": user_id})
+                return CLOSED
+            except Exception as e:
+                if attempt > self.max_retries or not self._is_transient(e):
+                    logger.warning("Failed to deliver %s DM: %s", PRIORITY_NAMES[job.priority], e,
+                                   extra={"bot": self.bot_name, "user_id": user_id})
+                    return FAILED
+                self.stats["retries"] += 1
+                await asyncio.sleep(getattr(e, "retry_after", None) or self.base_delay * (2 ** (attempt - 1)))
+
+    @staticmethod
+    def _is_transient(error):
+        if isinstance(error, discord.NotFound):
+            return False
+        if isinstance(error, discord.HTTPException):
+            return error.status == 429 or error.status >= 500
+        return isinstance(error, (asyncio.TimeoutError, OSError))
+
+    # ===== Metrics =====
+    @staticmethod
+    def _percentile(samples, q):
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self):
+        latency = {}
+        for priority, samples in self.latencies.items():
+            p50, p95 = self._percentile(samples, 0.5), self._percentile(samples, 0.95)
+            latency[PRIORITY_NAMES[priority]] = {
+                "samples": len(samples),
+                "p50_ms": None if p50 is None else round(p50 * 1000),
+                "p95_ms": None if p95 is None else round(p95 * 1000),
+            }
+        return {
+            "depth": self.depth,
+            "depth_by_priority": {PRIORITY_NAMES[p]: n for p, n in self.queued.items()},
+            "max_depth": self.max_depth,
+            "max_queued": self.max_queued,
+            "workers": self.workers,
+            "rate": self.rate,
+            "closed_users": len(self.closed),
+            "latency": latency,
+            **self.stats,
+        }
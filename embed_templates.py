@@ -0,0 +1,151 @@
+import logging
+import os
+import re
+import json
+from collections import OrderedDict
+from datetime import datetime
+import discord
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+VARIABLE_RE = re.compile(r"\{(\w+)\}")
+TEMPLATE_FIELDS = ("title", "description", "footer")
+
+
+class CompiledTemplate:
+    """A template split once into literal/variable parts so rendering is a join.
+
+    Templates without variables keep a ready discord.Embed that is reused as-is.
+    """
+
+    def __init__(self, name, data, color_map):
+        self.name = name
+        self.data = data
+        self.color = color_map.get(data.get("color"), discord.Color.default())
+        self.parts = {}
+        self.variables = set()
+        for field in TEMPLATE_FIELDS:
+            text = data.get(field)
+            if text is None:
+                self.parts[field] = None
+                continue
+            # re.split with one group alternates literal, variable, literal, ...
+            parts = VARIABLE_RE.split(text)
+            self.parts[field] = parts
+            self.variables.update(parts[1::2])
+        self.static_embed = self._build({}) if not self.variables else None
+
+    def _render(self, field, values):
+        parts = self.parts[field]
+        if parts is None:
+            return None
+        if len(parts) == 1:
+            return parts[0]
+        out = []
+        for i, part in enumerate(parts):
+            if i % 2:
+                out.append(str(values.get(part, "{" + part + "}")))
+            else:
+                out.append(part)
+        return "".join(out)
+
+    def _build(self, values):
+        embed = discord.Embed(
+            title=self._render("title", values),
+            description=self._render("description", values),
+            color=self.color,
+        )
+        footer = self._render("footer", values)
+        if footer:
+            embed.set_footer(text=footer)
+        return embed
+
+    def render(self, values):
+        if self.static_embed is not None:
+            return self.static_embed
+        return self._build(values)
+
+
+class EmbedTemplateStore:
+    """Named embed templates persisted to JSON and kept compiled in memory"""
+
+    RENDER_CACHE_SIZE = 128
+
+    def __init__(self, color_map, path=Config.EMBED_TEMPLATE_FILE):
+        self.color_map = color_map
+        self.path = path
+        self.templates = {}  # name: CompiledTemplate
+        self._rendered = OrderedDict()  # (name, frozen values): discord.Embed
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            raw = {}
+        except Exception as e:
+            logger.error("Failed to load %s: %s", self.path, e)
+            raw = {}
+        self.templates = {name: CompiledTemplate(name, data, self.color_map) for name, data in raw.items()}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({name: t.data for name, t in self.templates.items()}, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def _drop_rendered(self, name):
+        for key in [k for k in self._rendered if k[0] == name]:
+            del self._rendered[key]
+
+    @staticmethod
+    def normalize_name(name):
+        return name.strip().lower()
+
+    def names(self):
+        return sorted(self.templates)
+
+    def get(self, name):
+        return self.templates.get(self.normalize_name(name))
+
+    def save(self, name, embed_data, author):
+        name = self.normalize_name(name)
+        data = {field: embed_data.get(field) for field in TEMPLATE_FIELDS}
+        data["color"] = embed_data.get("color", "Default")
+        data["updated_by"] = str(author)
+        data["updated_at"] = datetime.utcnow().isoformat() + "Z"
+        self.templates[name] = CompiledTemplate(name, data, self.color_map)
+        self._drop_rendered(name)
+        self._save()
+        return self.templates[name]
+
+    def delete(self, name):
+        name = self.normalize_name(name)
+        if self.templates.pop(name, None) is None:
+            return False
+        self._drop_rendered(name)
+        self._save()
+        return True
+
+    def render(self, name, values):
+        """Return a ready discord.Embed for template `name`, or None if it doesn't exist"""
+        template = self.get(name)
+        if template is None:
+            return None
+        if template.static_embed is not None:
+            return template.static_embed
+
+        used = tuple(sorted((k, str(values[k])) for k in template.variables if k in values))
+        key = (template.name, used)
+        embed = self._rendered.get(key)
+        if embed is None:
+            embed = template.render(values)
+            self._rendered[key] = embed
+            if len(self._rendered) > self.RENDER_CACHE_SIZE:
+                self._rendered.popitem(last=False)
+        else:
+            self._rendered.move_to_end(key)
+        return embed
@@ -0,0 +1,80 @@
+import logging
+import time
+import asyncio
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+# bot_name: GatewayEventMeter, so one command can report on every bot in the process
+METERS = {}
+
+
+class GatewayEventMeter:
+    """Counts gateway events received by a bot, by type.
+
+    Listens to on_socket_event_type, which discord.py dispatches for every
+    gateway event before parsing it, so the counts include events the bot has
+    no handler for (MESSAGE_CREATE without message commands, TYPING_START,
+    PRESENCE_UPDATE ...). Use it to compare intents and COMMAND_MODE settings:
+    snapshot() has totals and events/second since start and over the last
+    `window` seconds, and every `log_interval` seconds a summary is logged.
+    """
+
+    def __init__(self, bot, bot_name, window=60, log_interval=300, top=8):
+        self.bot_name = bot_name
+        self.window = window
+        self.log_interval = log_interval
+        self.top = top
+        self.counts = Counter()
+        self.started = time.monotonic()
+        self._seconds = deque()  # [second, count] for the last `window` seconds
+        self._task = None
+        METERS[bot_name] = self
+        bot.add_listener(self._on_socket_event_type, "on_socket_event_type")
+
+    async def _on_socket_event_type(self, event_type):
+        self.counts[event_type] += 1
+        now = int(time.monotonic())
+        if self._seconds and self._seconds[-1][0] == now:
+            self._seconds[-1][1] += 1
+        else:
+            self._seconds.append([now, 1])
+            self._trim(now)
+        if self.log_interval and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    def _trim(self, now):
+        while self._seconds and self._seconds[0][0] <= now - self.window:
+            self._seconds.popleft()
+
+    def recent_rate(self):
+        """Events/second over the last `window` seconds"""
+        self._trim(int(time.monotonic()))
+        return sum(count for _, count in self._seconds) / self.window
+
+    def snapshot(self):
+        uptime = max(time.monotonic() - self.started, 1.0)
+        total = sum(self.counts.values())
+        return {
+            "events": total,
+            "uptime_s": round(uptime, 1),
+            "per_second": round(total / uptime, 3),
+            "per_second_recent": round(self.recent_rate(), 3),
+            "by_type": {event: {"count": count, "per_second": round(count / uptime, 3)}
+                        for event, count in self.counts.most_common()},
+        }
+
+    def reset(self):
+        self.counts.clear()
+        self._seconds.clear()
+        self.started = time.monotonic()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.log_interval)
+            snapshot = self.snapshot()
+            top = ", ".join(f"{event}={stats['per_second']}/s"
+                            for event, stats in list(snapshot["by_type"].items())[:self.top])
+            logger.info("gateway events: %s total, %s/s (last %ss: %s/s) — %s",
+                        snapshot["events"], snapshot["per_second"], self.window,
+                        snapshot["per_second_recent"], top or "none", extra={"bot": self.bot_name})
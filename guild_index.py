@@ -0,0 +1,102 @@
+import logging
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class GuildIndex:
+    """Per-guild name -> object index for roles and text channels.
+
+    Each guild's index is built lazily on first lookup and dropped whenever a
+    channel or role in that guild is created, updated or deleted, so lookups
+    are O(1) dict hits instead of linear scans over guild.roles/text_channels.
+    """
+
+    CHANNEL_EVENTS = ("on_guild_channel_create", "on_guild_channel_update", "on_guild_channel_delete")
+    ROLE_EVENTS = ("on_guild_role_create", "on_guild_role_update", "on_guild_role_delete")
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._roles = {}  # guild_id: {name: role}
+        self._channels = {}  # guild_id: {name: text_channel}
+        self._warned_missing = set()  # (guild_id, kind, name)
+
+        for event in self.CHANNEL_EVENTS:
+            bot.add_listener(self._on_channel_event, event)
+        for event in self.ROLE_EVENTS:
+            bot.add_listener(self._on_role_event, event)
+        bot.add_listener(self._on_guild_remove, "on_guild_remove")
+
+    # ===== Invalidation =====
+    async def _on_channel_event(self, *args):
+        channel = args[-1]
+        guild = getattr(channel, "guild", None)
+        if guild is not None:
+            self.invalidate(guild.id, channels=True, roles=False)
+
+    async def _on_role_event(self, *args):
+        role = args[-1]
+        self.invalidate(role.guild.id, channels=False, roles=True)
+
+    async def _on_guild_remove(self, guild):
+        self.invalidate(guild.id)
+
+    def invalidate(self, guild_id, channels=True, roles=True):
+        if channels:
+            self._channels.pop(guild_id, None)
+        if roles:
+            self._roles.pop(guild_id, None)
+        self._warned_missing = {k for k in self._warned_missing if k[0] != guild_id}
+
+    # ===== Building =====
+    @staticmethod
+    def _build(guild, objects, kind):
+        index = {}
+        for obj in objects:
+            if obj.name in index:
+                logger.warning("Duplicate %s name '%s' in guild %s; using %s, ignoring %s",
+                               kind, obj.name, guild.id, index[obj.name].id, obj.id)
+                continue
+            index[obj.name] = obj
+        return index
+
+    def _role_index(self, guild):
+        index = self._roles.get(guild.id)
+        if index is None:
+            # guild.roles is sorted bottom-up; keep the first match like discord.utils.get
+            index = self._roles[guild.id] = self._build(guild, guild.roles, "role")
+        return index
+
+    def _channel_index(self, guild):
+        index = self._channels.get(guild.id)
+        if index is None:
+            index = self._channels[guild.id] = self._build(guild, guild.text_channels, "channel")
+        return index
+
+    def _warn_missing(self, guild, kind, name):
+        key = (guild.id, kind, name)
+        if key not in self._warned_missing:
+            self._warned_missing.add(key)
+            logger.warning("No %s named '%s' in guild %s (%s)", kind, name, guild.name, guild.id)
+
+    # ===== Lookups =====
+    def get_role(self, guild, name) -> discord.Role | None:
+        role = self._role_index(guild).get(name)
+        if role is None:
+            self._warn_missing(guild, "role", name)
+        return role
+
+    def get_text_channel(self, guild, name) -> discord.TextChannel | None:
+        channel = self._channel_index(guild).get(name)
+        if channel is None:
+            self._warn_missing(guild, "channel", name)
+        return channel
+
+    def find_text_channels(self, name):
+        """Return the text channel called `name` in every guild the bot is in"""
+        channels = []
+        for guild in self.bot.guilds:
+            channel = self._channel_index(guild).get(name)
+            if channel is not None:
+                channels.append(channel)
+        return channels
@@ -0,0 +1,256 @@
+import logging
+import os
+import json
+import asyncio
+from types import MappingProxyType
+import asyncpg
+import discord
+from discord.ext import commands
+from config import Config
+from credits_ledger import WELCOME_CREDITS
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "guild_settings"
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS guild_settings (
+        guild_id BIGINT PRIMARY KEY,
+        settings JSONB NOT NULL DEFAULT '{}',
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        updated_by BIGINT
+    );
+"""
+
+# key: (type, default). Channels are matched by *_channel_id when set, otherwise by *_channel_name.
+SETTINGS = {
+    "verify_channel_id": (int, None),
+    "verify_channel_name": (str, "verify"),
+    "verification_log_channel_id": (int, None),
+    "verification_log_channel_name": (str, "verification-logs"),
+    "admin_log_channel_id": (int, None),
+    "admin_log_channel_name": (str, "administration-logs"),
+    "advertise_channel_id": (int, None),
+    "advertise_channel_name": (str, "advertisement-commands"),
+    "ad_log_channel_name": (str, "advertisement-logs"),
+    "ad_requests_channel_name": (str, "advertisement-requests"),
+    "staff_commands_channel_id": (int, None),
+    "staff_commands_channel_name": (str, "commands"),
+    "approved_ads_channel_name": (str, "approved-ads"),
+    "verified_role_name": (str, "Verified"),
+    "staff_role_id": (int, None),
+    "staff_role_name": (str, "Blox Entertainment Staff"),
+    "code_expiry_minutes": (int, Config.CODE_EXPIRY_MINUTES),
+    "welcome_credits": (int, WELCOME_CREDITS),
+    "advertisement_cost": (int, 1),
+}
+DEFAULTS = {key: default for key, (_, default) in SETTINGS.items()}
+
+# The original server's channel and role IDs, seeded for Config.HOME_GUILD_ID
+HOME_GUILD_SETTINGS = {
+    "verify_channel_id": 1406090150953615372,
+    "verification_log_channel_id": 1406142661752131634,
+    "admin_log_channel_id": 1406145134558711920,
+    "advertise_channel_id": 1406102298463043636,
+    "staff_role_id": 1406082203393462403,
+}
+
+UPSERT = """
+    INSERT INTO guild_settings (guild_id, settings, updated_by) VALUES ($1, $2::jsonb, $3)
+    ON CONFLICT (guild_id) DO UPDATE
+    SET settings = guild_settings.settings || EXCLUDED.settings, updated_at = now(), updated_by = EXCLUDED.updated_by
+    RETURNING settings
+"""
+
+RESET = """
+    UPDATE guild_settings SET settings = settings - $2::text, updated_at = now(), updated_by = $3
+    WHERE guild_id = $1 RETURNING settings
+"""
+
+
+def parse_value(key, raw):
+    """Convert user input to the setting's type; "default" or "none" clears the override (returns None)"""
+    if key not in SETTINGS:
+        raise KeyError(key)
+    kind, _ = SETTINGS[key]
+    if raw is None or str(raw).strip().lower() in ("default", "none", "reset"):
+        return None
+    raw = str(raw).strip()
+    if kind is int:
+        # Accept channel/role mentions as well as bare IDs
+        return int(raw.strip("<#@&!>"))
+    return raw.lstrip("#")
+
+
+class GuildSettings:
+    """Per-guild settings stored in Postgres and served from memory.
+
+    Each guild's overrides live in one JSONB row and are merged over DEFAULTS;
+    get() is a dict lookup. Writers send a NOTIFY in the same transaction, so
+    every process (and every bot in this one) listening on the channel reloads
+    that guild within moments. A periodic full reload covers notifications
+    missed while the listener connection was down. Without DATABASE_URL the
+    defaults and the home guild's seed are used and changes stay in memory.
+    """
+
+    def __init__(self, dsn=None, home_guild_id=None, reload_interval=None):
+        self.dsn = dsn if dsn is not None else os.getenv("DATABASE_URL")
+        self.home_guild_id = home_guild_id if home_guild_id is not None else Config.HOME_GUILD_ID
+        self.reload_interval = reload_interval or Config.GUILD_SETTINGS_RELOAD_SECONDS
+        self.pool = None
+        self.ready = False
+        self._overrides = {self.home_guild_id: dict(HOME_GUILD_SETTINGS)}  # guild_id: {key: value}
+        self._merged = {}  # guild_id: read-only merged settings
+        self._listen_conn = None
+        self._task = None
+        self._start_lock = asyncio.Lock()
+        self.stats = {"reloads": 0, "notifications": 0, "writes": 0}
+
+    # ===== Startup =====
+    async def start(self):
+        async with self._start_lock:
+            if self.ready:
+                return
+            if not self.dsn:
+                logger.warning("DATABASE_URL not set; guild settings use defaults and are not persisted.")
+                return
+            try:
+                self.pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2)
+                async with self.pool.acquire() as conn:
+                    await conn.execute(SCHEMA)
+                    await conn.execute(
+                        "INSERT INTO guild_settings (guild_id, settings) VALUES ($1, $2::jsonb) ON CONFLICT DO NOTHING",
+                        self.home_guild_id, json.dumps(HOME_GUILD_SETTINGS))
+                await self.reload()
+                await self._listen()
+                self._task = asyncio.create_task(self._run())
+                self.ready = True
+                logger.info("Guild settings loaded for %d guild(s)", len(self._overrides))
+            except Exception as e:
+                logger.error("Failed to load guild settings: %s", e)
+
+    async def _listen(self):
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        await self._listen_conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+
+    def _on_notify(self, conn, pid, channel, payload):
+        self.stats["notifications"] += 1
+        try:
+            guild_id = int(payload)
+        except ValueError:
+            return
+        asyncio.create_task(self.reload(guild_id))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                if self._listen_conn is None or self._listen_conn.is_closed():
+                    await self._listen()
+                await self.reload()
+            except Exception as e:
+                logger.warning("Guild settings refresh failed: %s", e)
+
+    async def reload(self, guild_id=None):
+        """Re-read one guild's row, or every row when guild_id is None"""
+        async with self.pool.acquire() as conn:
+            if guild_id is None:
+                rows = await conn.fetch("SELECT guild_id, settings FROM guild_settings")
+                self._overrides = {r["guild_id"]: self._decode(r["settings"]) for r in rows}
+                self._merged.clear()
+            else:
+                raw = await conn.fetchval("SELECT settings FROM guild_settings WHERE guild_id = $1", guild_id)
+                self._apply(guild_id, raw)
+        self.stats["reloads"] += 1
+
+    @staticmethod
+    def _decode(raw):
+        overrides = json.loads(raw) if isinstance(raw, str) else dict(raw or {})
+        return {k: v for k, v in overrides.items() if k in SETTINGS}
+
+    def _apply(self, guild_id, raw):
+        if raw is None:
+            self._overrides.pop(guild_id, None)
+        else:
+            self._overrides[guild_id] = self._decode(raw)
+        self._merged.pop(guild_id, None)
+
+    # ===== Reads =====
+    def get(self, guild):
+        """Settings for a guild (object or ID) as a read-only mapping"""
+        guild_id = getattr(guild, "id", guild)
+        merged = self._merged.get(guild_id)
+        if merged is None:
+            merged = self._merged[guild_id] = MappingProxyType({**DEFAULTS, **self._overrides.get(guild_id, {})})
+        return merged
+
+    def overrides(self, guild):
+        return dict(self._overrides.get(getattr(guild, "id", guild), {}))
+
+    def is_channel(self, channel, kind):
+        """Whether `channel` is this guild's configured channel of `kind` (e.g. "verify")"""
+        guild = getattr(channel, "guild", None)
+        if guild is None:
+            return False
+        settings = self.get(guild.id)
+        channel_id = settings.get(f"{kind}_channel_id")
+        if channel_id:
+            return channel.id == channel_id
+        return channel.name == settings[f"{kind}_channel_name"]
+
+    def channel(self, guild, kind, guild_index=None):
+        """Resolve the configured channel of `kind` in `guild`, or None"""
+        if guild is None:
+            return None
+        settings = self.get(guild.id)
+        channel_id = settings.get(f"{kind}_channel_id")
+        if channel_id:
+            return guild.get_channel(channel_id)
+        name = settings[f"{kind}_channel_name"]
+        if guild_index is not None:
+            return guild_index.get_text_channel(guild, name)
+        return discord.utils.get(guild.text_channels, name=name)
+
+    def channel_label(self, guild, kind):
+        """How to name the channel in replies: a mention when the ID is known, else #name"""
+        settings = self.get(guild)
+        channel_id = settings.get(f"{kind}_channel_id")
+        return f"<#{channel_id}>" if channel_id else f"#{settings[f'{kind}_channel_name']}"
+
+    def is_staff(self, member):
+        guild = getattr(member, "guild", None)
+        roles = getattr(member, "roles", None)
+        if guild is None or not roles:
+            return False
+        settings = self.get(guild.id)
+        if settings["staff_role_id"]:
+            return any(r.id == settings["staff_role_id"] for r in roles)
+        return any(r.name == settings["staff_role_name"] for r in roles)
+
+    def staff_only(self):
+        """Command check: the author has this guild's staff role"""
+        return commands.check(lambda ctx: self.is_staff(ctx.author))
+
+    # ===== Writes =====
+    async def set(self, guild_id, key, raw_value, actor_id=None):
+        """Set (or with "default", clear) one setting; returns the parsed value"""
+        value = parse_value(key, raw_value)
+        self.stats["writes"] += 1
+        if not self.ready:
+            overrides = self._overrides.setdefault(guild_id, {})
+            if value is None:
+                overrides.pop(key, None)
+            else:
+                overrides[key] = value
+            self._merged.pop(guild_id, None)
+            return value
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if value is None:
+                    raw = await conn.fetchval(RESET, guild_id, key, actor_id)
+                else:
+                    raw = await conn.fetchval(UPSERT, guild_id, json.dumps({key: value}), actor_id)
+                await conn.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, str(guild_id))
+        if raw is not None:
+            self._apply(guild_id, raw)
+        return value
@@ -0,0 +1,134 @@
+import logging
+import asyncio
+import time
+from collections import deque
+import discord
+
+logger = logging.getLogger(__name__)
+
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+
+class LogDispatcher:
+    """Sends log embeds in the background, packed up to 10 per message per channel.
+
+    dispatch() only appends to a per-channel queue, so commands can reply to the
+    user without waiting on log sends. A background task flushes each channel
+    every `flush_interval` seconds (sooner once a full message is waiting).
+    Above `sample_above` queued entries only one in `sample_rate` new entries is
+    kept; above `max_queued` new entries are dropped. Both are counted and
+    reported in the next flush.
+    """
+
+    def __init__(self, bot, flush_interval=2.0, max_queued=500, sample_above=250, sample_rate=4):
+        self.bot = bot
+        self.flush_interval = flush_interval
+        self.max_queued = max_queued
+        self.sample_above = sample_above
+        self.sample_rate = sample_rate
+        self._queues = {}  # channel_id: deque of embed groups
+        self._channels = {}  # channel_id: channel
+        self._queued = 0
+        self._seen_while_sampling = 0
+        self._pending_drops = {}  # channel_id: count not yet reported
+        self.stats = {"dispatched": 0, "sent_messages": 0, "sent_embeds": 0, "dropped": 0, "sampled_out": 0, "failed": 0}
+        self._task = None
+        self._wakeup = None
+
+    # ===== Queueing =====
+    def dispatch(self, channel, *embeds):
+        """Queue one log entry (one or more embeds that stay together); returns False if it was shed"""
+        if channel is None or not embeds:
+            return False
+        self._ensure_started()
+        self.stats["dispatched"] += 1
+
+        if self._queued >= self.max_queued:
+            return self._shed(channel, "dropped")
+        if self._queued >= self.sample_above:
+            self._seen_while_sampling += 1
+            if self._seen_while_sampling % self.sample_rate:
+                return self._shed(channel, "sampled_out")
+        else:
+            self._seen_while_sampling = 0
+
+        self._channels[channel.id] = channel
+        queue = self._queues.setdefault(channel.id, deque())
+        queue.append(list(embeds[:MAX_EMBEDS_PER_MESSAGE]))
+        self._queued += 1
+        if len(queue) >= MAX_EMBEDS_PER_MESSAGE:
+            self._wakeup.set()
+        return True
+
+    def _shed(self, channel, reason):
+        self.stats[reason] += 1
+        self._channels.setdefault(channel.id, channel)
+        self._pending_drops[channel.id] = self._pending_drops.get(channel.id, 0) + 1
+        return False
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    # ===== Flushing =====
+    @staticmethod
+    def _pack(queue):
+        """Pop as many whole entries as fit in one message"""
+        batch, chars = [], 0
+        while queue:
+            group = queue[0]
+            size = sum(len(e) for e in group)
+            if batch and (len(batch) + len(group) > MAX_EMBEDS_PER_MESSAGE or chars + size > MAX_EMBED_CHARS_PER_MESSAGE):
+                break
+            queue.popleft()
+            batch.extend(group)
+            chars += size
+        return batch
+
+    async def _send(self, channel, embeds):
+        try:
+            await channel.send(embeds=embeds)
+            self.stats["sent_messages"] += 1
+            self.stats["sent_embeds"] += len(embeds)
+        except discord.HTTPException as e:
+            self.stats["failed"] += len(embeds)
+            logger.warning("Failed to send %d log embed(s) to #%s: %s", len(embeds), getattr(channel, "name", channel.id), e)
+
+    async def _flush_channel(self, channel_id):
+        channel = self._channels[channel_id]
+        queue = self._queues.get(channel_id)
+        while queue:
+            before = len(queue)
+            batch = self._pack(queue)
+            self._queued -= before - len(queue)
+            await self._send(channel, batch)
+
+        dropped = self._pending_drops.pop(channel_id, 0)
+        if dropped:
+            notice = discord.Embed(
+                title="⚠️ Log entries dropped",
+                description=f"{dropped} log entr{'y was' if dropped == 1 else 'ies were'} dropped or sampled out under load.",
+                color=discord.Color.dark_orange(),
+            )
+            await self._send(channel, [notice])
+
+    async def flush(self):
+        for channel_id in list(set(self._queues) | set(self._pending_drops)):
+            await self._flush_channel(channel_id)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            started = time.monotonic()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Flush failed: %s", e)
+            # Keep a minimum gap between flushes so a steady stream still gets batched
+            await asyncio.sleep(max(0.0, 0.25 - (time.monotonic() - started)))
@@ -0,0 +1,208 @@
+import os
+import re
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from discord.ext import commands
+from profiler import PROFILER
+
+# Environment variables whose values must never reach the logs
+SECRET_ENV_VARS = (
+    "BOT1_TOKEN", "INFORMATION_TICKET", "BOT2_TOKEN", "DISCORD_BOT_TOKEN",
+    "BOT3_ADVERTISE", "BOT3_TOKEN", "DISCORD_BOT3_TOKEN",
+    "DATABASE_URL", "BOT3_POSTGRES_URL", "PROFILER_TOKEN",
+)
+# Discord bot tokens and passwords embedded in connection URLs
+SECRET_PATTERNS = (
+    re.compile(r"[MNO][\w-]{23,25}\.[\w-]{6}\.[\w-]{27,}"),
+    re.compile(r"(?<=://)([^:/@\s]+):([^@\s]+)@"),
+)
+# Structured fields callers may pass via `extra=`
+FIELDS = ("bot", "command", "user_id", "guild_id", "latency_ms", "status")
+DEFAULT_LEVELS = "discord=WARNING,aiohttp=WARNING,asyncio=WARNING"
+
+_listener = None
+
+
+class Redactor:
+    """Replaces secret values and token-shaped strings in rendered log text"""
+
+    def __init__(self):
+        self.secrets = sorted({v for v in (os.getenv(n) for n in SECRET_ENV_VARS) if v and len(v) >= 8},
+                              key=len, reverse=True)
+
+    def redact(self, text):
+        for secret in self.secrets:
+            if secret in text:
+                text = text.replace(secret, "[REDACTED]")
+        text = SECRET_PATTERNS[0].sub("[REDACTED]", text)
+        return SECRET_PATTERNS[1].sub(r"\1:[REDACTED]@", text)
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `burst` identical warnings/errors per `interval` seconds.
+
+    Records are grouped by logger and unformatted message, so a failing call
+    logged in a loop is reported a few times per interval; the next record let
+    through carries a `suppressed` count.
+    """
+
+    def __init__(self, burst=5, interval=60.0, min_level=logging.WARNING):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.min_level = min_level
+        self._windows = {}  # key: [window_start, count, suppressed]
+
+    def filter(self, record):
+        if record.levelno < self.min_level:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else repr(record.msg))
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                record.suppressed = suppressed
+            if len(self._windows) > 10000:
+                self._windows.clear()
+            return True
+        window[1] += 1
+        if window[1] > self.burst:
+            window[2] += 1
+            return False
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Renders and redacts the message and traceback in-thread but keeps the record's fields"""
+
+    def __init__(self, log_queue, redactor):
+        super().__init__(log_queue)
+        self.redactor = redactor
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = self.redactor.redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self.redactor.redact(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the structured fields lifted to the top level"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in FIELDS + ("suppressed",):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        extras = [f"{f}={getattr(record, f)}" for f in FIELDS + ("suppressed",) if getattr(record, f, None) is not None]
+        return f"{text} [{' '.join(extras)}]" if extras else text
+
+
+def _parse_levels(spec):
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """Route all logging through a queue to a background thread.
+
+    LOG_LEVEL sets the root level, LOG_LEVELS overrides per logger
+    ("bot3=DEBUG,roblox_api=WARNING") and LOG_FORMAT=text switches from JSON
+    lines to plain text. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(TextFormatter() if os.getenv("LOG_FORMAT", "json").lower() == "text" else JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue, Redactor())
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in {**_parse_levels(DEFAULT_LEVELS), **_parse_levels(os.getenv("LOG_LEVELS", ""))}.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def install_command_logging(bot, bot_name):
+    """Log every prefix command with bot, command, user id and latency fields.
+
+    The same hooks tag the command's task for the sampling profiler.
+    """
+    logger = logging.getLogger(bot_name)
+
+    @bot.before_invoke
+    async def _start_timer(ctx):
+        ctx.command_started_at = time.perf_counter()
+        PROFILER.enter(bot_name, ctx.command.qualified_name if ctx.command else "?")
+
+    @bot.after_invoke
+    async def _log_command(ctx):
+        PROFILER.exit()
+        started = getattr(ctx, "command_started_at", None)
+        latency = round((time.perf_counter() - started) * 1000, 1) if started else None
+        logger.info("command completed", extra={
+            "bot": bot_name,
+            "command": ctx.command.qualified_name if ctx.command else None,
+            "user_id": ctx.author.id,
+            "guild_id": ctx.guild.id if ctx.guild else None,
+            "latency_ms": latency,
+            "status": "failed" if ctx.command_failed else "ok",
+        })
+
+    async def _log_command_error(ctx, error):
+        fields = {
+            "bot": bot_name,
+            "command": ctx.command.qualified_name if ctx.command else None,
+            "user_id": ctx.author.id,
+            "status": type(error).__name__,
+        }
+        if isinstance(error, commands.CommandNotFound):
+            return
+        if isinstance(error, (commands.CheckFailure, commands.UserInputError)):
+            logger.info("command rejected: %s", error, extra=fields)
+            return
+        original = getattr(error, "original", error)
+        logger.error("command raised", exc_info=(type(original), original, original.__traceback__), extra=fields)
+
+    bot.add_listener(_log_command_error, "on_command_error")
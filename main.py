@@ -1,13 +1,17 @@
 import os
+import hmac
 import asyncio
+import logging
 import importlib
 import threading
-from flask import Flask
+from flask import Flask, Response, abort, request
+from config import Config
+from logging_setup import setup_logging
+from profiler import PROFILER
 
-# ===== ENV PRINT (optional debug) =====
-print("BOT1_TOKEN:", os.getenv("BOT1_TOKEN"))
-print("BOT2_TOKEN:", os.getenv("INFORMATION_TICKET"))
-print("BOT3_TOKEN:", os.getenv("BOT3_ADVERTISE"))
+# ===== LOGGING =====
+setup_logging()
+logger = logging.getLogger("main")
 
 # ===== FLASK APP =====
 app = Flask(__name__)
@@ -16,6 +20,41 @@ app = Flask(__name__)
 def ping():
     return "Bots running!"
 
+def _profiler_authorized():
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ") or request.args.get("token", "")
+    return hmac.compare_digest(supplied.encode(), Config.PROFILER_TOKEN.encode())
+
+@app.route("/profile", methods=["GET", "POST"])
+def profile():
+    """Profile the bots' event loop: ?seconds=30 samples a window, ?action=start / ?action=stop toggle a run.
+
+    Returns collapsed stacks (text/plain) for flamegraph.pl or speedscope. Disabled unless PROFILER_TOKEN is set.
+    """
+    if not Config.PROFILER_TOKEN:
+        abort(404)
+    if not _profiler_authorized():
+        abort(403)
+    action = request.args.get("action")
+    if action == "start":
+        if not PROFILER.start():
+            return "Profiler is already running (or the bots haven't started).\n", 409
+        return f"Profiler started; stops by itself after {PROFILER.max_seconds}s.\n"
+    if action == "stop":
+        result = PROFILER.stop()
+    else:
+        try:
+            seconds = PROFILER.window(request.args.get("seconds", "30"))
+        except ValueError:
+            return "seconds must be a number greater than 0.\n", 400
+        result = PROFILER.profile_blocking(seconds)
+    if result is None:
+        return "Profiler is not running.\n" if action == "stop" else "Profiler is already running.\n", 409
+    return Response(result.collapsed(), mimetype="text/plain", headers={
+        "X-Profile-Samples": str(result.samples),
+        "X-Profile-Busy": f"{result.busy:.3f}",
+        "X-Profile-Overhead": f"{result.overhead:.4f}",
+    })
+
 def run_flask():
     port = int(os.environ.get("PORT", 10000))  # Render or other hosting
     app.run(host="0.0.0.0", port=port, debug=False, use_reloader=False)
@@ -28,17 +67,18 @@ BOT_MODULES = ["bot1", "bot2", "bot3"]
 
 async def start_bots():
     tasks = []
+    PROFILER.attach()  # the loop every bot runs on, so /profile can sample it
 
     for module_name in BOT_MODULES:
         try:
             module = importlib.import_module(module_name)
             if hasattr(module, "run_bot"):
-                print(f"[INFO] Starting {module_name}...")
+                logger.info("Starting %s...", module_name)
                 tasks.append(asyncio.create_task(module.run_bot()))
             else:
-                print(f"[WARNING] {module_name} does not have a run_bot() function.")
+                logger.warning("%s does not have a run_bot() function.", module_name)
         except Exception as e:
-            print(f"[ERROR] Failed to import {module_name}: {e}")
+            logger.exception("Failed to import %s: %s", module_name, e)
 
     if tasks:
         await asyncio.gather(*tasks)
@@ -47,4 +87,4 @@ if __name__ == "__main__":
     try:
         asyncio.run(start_bots())
     except KeyboardInterrupt:
-        print("Shutting down bots...")
+        logger.info("Shutting down bots...")
@@ -0,0 +1,219 @@
+import logging
+import math
+import os
+import sys
+import time
+import asyncio
+import threading
+import weakref
+from collections import Counter
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Frames the loop sits in while waiting for I/O; samples ending here count as idle
+IDLE_FRAMES = {("selectors.py", "select"), ("selectors.py", "EpollSelector.select")}
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class Profile:
+    """Samples collected over one profiling window"""
+
+    def __init__(self, counts, samples, idle, duration, sampling_seconds, interval):
+        self.counts = counts  # (tag, (code, ...) outermost first): samples
+        self.samples = samples
+        self.idle = idle
+        self.duration = duration
+        self.sampling_seconds = sampling_seconds
+        self.interval = interval
+
+    @property
+    def busy(self):
+        """Fraction of samples in which the event loop was running Python code"""
+        return (self.samples - self.idle) / self.samples if self.samples else 0.0
+
+    @property
+    def overhead(self):
+        """Fraction of the window the sampler itself held the interpreter"""
+        return self.sampling_seconds / self.duration if self.duration else 0.0
+
+    def collapsed(self):
+        """Collapsed stacks ("tag;outer;...;inner count" per line) for flamegraph.pl, speedscope or inferno"""
+        lines = [";".join([tag] + [_frame_label(code) for code in stack]) + f" {count}"
+                 for (tag, stack), count in self.counts.items()]
+        return "\n".join(sorted(lines)) + "\n"
+
+    def by_tag(self):
+        tags = Counter()
+        for (tag, _), count in self.counts.items():
+            tags[tag] += count
+        return tags.most_common()
+
+    def top_functions(self, limit=10):
+        """Functions by self time (samples where they were the innermost frame)"""
+        functions = Counter()
+        for (_, stack), count in self.counts.items():
+            if stack:
+                functions[_frame_label(stack[-1])] += count
+        return functions.most_common(limit)
+
+
+class SamplingProfiler:
+    """Opt-in statistical profiler for the event loop thread.
+
+    While running, a daemon thread wakes every `interval` seconds and records
+    the loop thread's current stack (sys._current_frames), tagged with the
+    bot and command whose task is on the loop at that moment; commands are
+    tagged between the before/after invoke hooks (see
+    logging_setup.install_command_logging), other tasks by their name. Each
+    sample costs tens of microseconds of GIL time, so at the default 100 Hz
+    the loop (and its gateway heartbeats) loses well under 1%; `overhead`
+    reports the measured figure. Runs stop by themselves after `max_seconds`.
+    """
+
+    def __init__(self, interval=None, max_seconds=None, max_depth=64):
+        self.interval = interval or Config.PROFILER_INTERVAL_MS / 1000
+        self.max_seconds = max_seconds or Config.PROFILER_MAX_SECONDS
+        self.max_depth = max_depth
+        self._loop = None
+        self._thread_id = None
+        self._tags = weakref.WeakKeyDictionary()  # task: "bot/command"
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self._counts = Counter()
+        self._samples = 0
+        self._idle = 0
+        self._sampling_seconds = 0.0
+        self._started = None
+        self._ended = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # ===== Command tagging =====
+    def attach(self, loop=None):
+        """Remember the loop to sample; call from the loop's thread"""
+        if self._loop is None:
+            self._loop = loop or asyncio.get_running_loop()
+            self._thread_id = threading.get_ident()
+
+    def enter(self, bot_name, command_name):
+        task = asyncio.current_task()
+        if task is not None:
+            self.attach()
+            self._tags[task] = f"{bot_name}/{command_name}"
+
+    def exit(self):
+        task = asyncio.current_task()
+        if task is not None:
+            self._tags.pop(task, None)
+
+    def _current_tag(self):
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "loop"
+        tag = self._tags.get(task)
+        if tag is None:
+            name = task.get_name()
+            tag = "task" if name.startswith("Task-") else name
+        return tag
+
+    # ===== Start / stop (any thread) =====
+    def start(self):
+        """Begin sampling; returns False if a run is already going or no loop is attached"""
+        with self._lock:
+            if self.running or self._thread_id is None:
+                return False
+            self._reset()
+            self._stop.clear()
+            self._started = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+        logger.info("Profiler started at %.0f Hz", 1 / self.interval)
+        return True
+
+    def stop(self):
+        """Stop sampling and return the Profile, or None if nothing was started"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return None
+            self._stop.set()
+        thread.join()
+        with self._lock:
+            self._thread = None
+            profile = Profile(self._counts, self._samples, self._idle, self._ended - self._started,
+                              self._sampling_seconds, self.interval)
+        logger.info("Profiler stopped: %d samples in %.1fs, overhead %.2f%%",
+                    profile.samples, profile.duration, profile.overhead * 100)
+        return profile
+
+    def window(self, seconds):
+        """`seconds` capped at max_seconds; raises ValueError unless it is a finite number above 0"""
+        seconds = float(seconds)
+        if not math.isfinite(seconds) or seconds <= 0:
+            raise ValueError(f"profiling window must be a positive number of seconds, not {seconds}")
+        return min(seconds, self.max_seconds)
+
+    async def profile(self, seconds):
+        """Sample for `seconds` without blocking the loop; returns the Profile or None if busy"""
+        seconds = self.window(seconds)
+        if not self.start():
+            return None
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile = self.stop()
+        return profile
+
+    def profile_blocking(self, seconds):
+        """profile() for other threads (the HTTP endpoint)"""
+        seconds = self.window(seconds)
+        if not self.start():
+            return None
+        try:
+            time.sleep(seconds)
+        finally:
+            profile = self.stop()
+        return profile
+
+    # ===== Sampling thread =====
+    def _run(self):
+        deadline = self._started + self.max_seconds
+        try:
+            while not self._stop.wait(self.interval):
+                started = time.perf_counter()
+                self._sample()
+                self._sampling_seconds += time.perf_counter() - started
+                if time.monotonic() >= deadline:
+                    logger.info("Profiler reached its %ss limit; stopping sampling", self.max_seconds)
+                    break
+        finally:
+            self._ended = time.monotonic()
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return
+        self._samples += 1
+        if (os.path.basename(frame.f_code.co_filename), getattr(frame.f_code, "co_qualname", frame.f_code.co_name)) in IDLE_FRAMES:
+            self._idle += 1
+            return
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        stack.reverse()
+        self._counts[(self._current_tag(), tuple(stack))] += 1
+
+
+# One per process: every bot shares the event loop thread
+PROFILER = SamplingProfiler()
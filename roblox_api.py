@@ -1,12 +1,20 @@
+import logging
 import aiohttp
 import asyncio
 from config import Config
+from thumbnails import ThumbnailService
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
 
 class RobloxAPI:
     """Handles interactions with the Roblox API"""
 
     def __init__(self):
         self.session = None
+        self._csrf_token = None
+        self.thumbnails = ThumbnailService(self._get_session)
+        self.users = TTLCache(Config.ROBLOX_USER_CACHE_TTL)  # lower(username): {id, name, displayName}
 
     async def _get_session(self):
         """Get or create aiohttp session"""
@@ -18,6 +26,9 @@ class RobloxAPI:
 
     # ===== Existing user methods =====
     async def get_user_by_username(self, username):
+        cached = self.users.get(username.lower())
+        if cached is not None:
+            return cached
         try:
             session = await self._get_session()
             url = Config.ROBLOX_USERNAME_API
@@ -28,17 +39,19 @@ class RobloxAPI:
                     users = data.get('data', [])
                     if users:
                         user = users[0]
-                        return {
+                        user = {
                             'id': user.get('id'),
                             'name': user.get('name'),
                             'displayName': user.get('displayName')
                         }
+                        self.users.set(username.lower(), user)
+                        return user
                     return None
                 else:
-                    print(f"Roblox API error for username lookup: {response.status}")
+                    logger.warning("Roblox API error for username lookup: %s", response.status)
                     return None
         except Exception as e:
-            print(f"Error fetching Roblox user by username: {e}")
+            logger.warning("Error fetching Roblox user by username: %s", e)
             return None
 
     async def get_user_bio(self, user_id):
@@ -50,13 +63,13 @@ class RobloxAPI:
                     data = await response.json()
                     return data.get('description', '')
                 elif response.status == 404:
-                    print(f"Roblox user {user_id} not found")
+                    logger.info("Roblox user %s not found", user_id)
                     return None
                 else:
-                    print(f"Roblox API error for user {user_id}: {response.status}")
+                    logger.warning("Roblox API error for user %s: %s", user_id, response.status)
                     return None
         except Exception as e:
-            print(f"Error fetching Roblox user bio: {e}")
+            logger.warning("Error fetching Roblox user bio: %s", e)
             return None
 
     async def get_user_details(self, user_id):
@@ -75,86 +88,162 @@ class RobloxAPI:
                         'isBanned': data.get('isBanned', False)
                     }
                 else:
-                    print(f"Roblox API error for user details: {response.status}")
+                    logger.warning("Roblox API error for user details: %s", response.status)
                     return None
         except Exception as e:
-            print(f"Error fetching Roblox user details: {e}")
+            logger.warning("Error fetching Roblox user details: %s", e)
             return None
 
     # ===== Advertisement-related methods =====
-    async def get_game_info(self, link: str):
-        """Fetch Roblox game info by link"""
+    GAMES_BATCH_SIZE = 50
+    CATALOG_BATCH_SIZE = 100
+
+    @staticmethod
+    def _link_id(link, marker):
         try:
-            place_id = int(link.rstrip("/").split("/games/")[1].split("/")[0])
+            return int(link.rstrip("/").split(marker)[1].split("/")[0])
         except Exception:
             return None
-        url = f"https://games.roblox.com/v1/games/multiget-place-details?placeIds={place_id}"
+
+    @staticmethod
+    def _game_info(info):
+        return {
+            "type": "game",
+            "id": info.get("placeId") or info.get("id"),
+            "title": f"Play {info.get('name', 'Unknown Game')} Today!",
+            "name": info.get("name", "Unknown Game"),
+            "creator": info.get("builder") or info.get("creator", {}).get("name", "Unknown"),
+            "description": info.get("description", ""),
+            "created": info.get("created", ""),
+            "url": info.get("url") or f"https://www.roblox.com/games/{info.get('placeId') or info.get('id')}",
+            "thumbnail_url": None
+        }
+
+    @staticmethod
+    def _ugc_info(item):
+        return {
+            "type": "catalog",
+            "id": item.get("id"),
+            "title": item.get("name", "UGC Item"),
+            "name": item.get("name", "UGC Item"),
+            "creator": item.get("creatorName") or item.get("creator", {}).get("name", "Unknown"),
+            "description": item.get("description", ""),
+            "price": item.get("price"),
+            "url": f"https://www.roblox.com/catalog/{item.get('id')}",
+            "thumbnail_url": None
+        }
+
+    @staticmethod
+    def _group_info(group_id, info):
+        return {
+            "type": "group",
+            "id": group_id,
+            "title": info.get("name", "Roblox Group"),
+            "name": info.get("name", "Roblox Group"),
+            "creator": (info.get("owner") or {}).get("username", "Unknown"),
+            "description": info.get("description", ""),
+            "members": info.get("memberCount"),
+            "url": f"https://www.roblox.com/groups/{group_id}",
+            "thumbnail_url": None
+        }
+
+    async def get_games_info(self, place_ids):
+        """Fetch many places with multiget-place-details; returns {place_id: info}"""
+        place_ids = list(dict.fromkeys(place_ids))
+        results = {}
+        session = await self._get_session()
+        for i in range(0, len(place_ids), self.GAMES_BATCH_SIZE):
+            chunk = place_ids[i:i + self.GAMES_BATCH_SIZE]
+            url = Config.ROBLOX_GAMES_HOST + "/v1/games/multiget-place-details"
+            try:
+                async with session.get(url, params=[("placeIds", str(pid)) for pid in chunk]) as resp:
+                    if resp.status != 200:
+                        logger.warning("Roblox API error for game lookup: %s", resp.status)
+                        continue
+                    for info in await resp.json() or []:
+                        game = self._game_info(info)
+                        results[int(game["id"])] = game
+            except Exception as e:
+                logger.warning("Error fetching game info: %s", e)
+        await self._attach_thumbnails("place", results)
+        return results
+
+    async def _attach_thumbnails(self, kind, infos):
+        """Fill thumbnail_url on {id: info} from one batched thumbnails request"""
+        if not infos:
+            return
+        urls = await self.thumbnails.get_many(kind, list(infos))
+        for target_id, info in infos.items():
+            info["thumbnail_url"] = urls.get(target_id)
+
+    async def get_ugc_items_info(self, item_ids):
+        """Fetch many catalog assets with one items/details call per batch; returns {item_id: info}"""
+        item_ids = list(dict.fromkeys(item_ids))
+        results = {}
+        session = await self._get_session()
+        url = Config.ROBLOX_CATALOG_HOST + "/v1/catalog/items/details"
+        for i in range(0, len(item_ids), self.CATALOG_BATCH_SIZE):
+            payload = {"items": [{"itemType": "Asset", "id": iid} for iid in item_ids[i:i + self.CATALOG_BATCH_SIZE]]}
+            try:
+                for _ in range(2):
+                    headers = {"x-csrf-token": self._csrf_token} if self._csrf_token else {}
+                    async with session.post(url, json=payload, headers=headers) as resp:
+                        # Roblox answers the first POST with 403 and a token to retry with
+                        if resp.status == 403 and resp.headers.get("x-csrf-token"):
+                            self._csrf_token = resp.headers["x-csrf-token"]
+                            continue
+                        if resp.status != 200:
+                            logger.warning("Roblox API error for catalog lookup: %s", resp.status)
+                            break
+                        data = await resp.json()
+                        for item in data.get("data", []):
+                            info = self._ugc_info(item)
+                            results[int(info["id"])] = info
+                        break
+            except Exception as e:
+                logger.warning("Error fetching UGC info: %s", e)
+        await self._attach_thumbnails("asset", results)
+        return results
+
+    async def _get_group(self, group_id):
         try:
             session = await self._get_session()
-            async with session.get(url) as resp:
+            async with session.get(f"{Config.ROBLOX_GROUPS_HOST}/v1/groups/{group_id}") as resp:
                 if resp.status != 200:
                     return None
-                data = await resp.json()
-                if not data:
-                    return None
-                info = data[0]
-                return {
-                    "title": f"Play {info.get('name', 'Unknown Game')} Today!",
-                    "creator": info.get("creator", {}).get("name", "Unknown"),
-                    "description": info.get("description", ""),
-                    "created": info.get("created", ""),
-                    "thumbnail_url": f"https://www.roblox.com/asset-thumbnail/image?assetId={info.get('id')}&width=420&height=420&format=png"
-                }
+                return self._group_info(group_id, await resp.json())
         except Exception as e:
-            print(f"Error fetching game info: {e}")
+            logger.warning("Error fetching group info: %s", e)
             return None
 
+    async def get_groups_info(self, group_ids):
+        """Fetch many groups concurrently (the groups API has no batch endpoint); returns {group_id: info}"""
+        group_ids = list(dict.fromkeys(group_ids))
+        infos = await asyncio.gather(*(self._get_group(gid) for gid in group_ids))
+        results = {gid: info for gid, info in zip(group_ids, infos) if info}
+        await self._attach_thumbnails("group", results)
+        return results
+
+    async def get_game_info(self, link: str):
+        """Fetch Roblox game info by link"""
+        place_id = self._link_id(link, "/games/")
+        if place_id is None:
+            return None
+        return (await self.get_games_info([place_id])).get(place_id)
+
     async def get_ugc_info(self, link: str):
         """Fetch Roblox UGC info by link"""
-        try:
-            item_id = int(link.rstrip("/").split("/catalog/")[1].split("/")[0])
-        except Exception:
-            return None
-        url = f"https://catalog.roblox.com/v1/catalog/items/details?itemIds={item_id}"
-        try:
-            session = await self._get_session()
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    return None
-                data = await resp.json()
-                item = data.get("data", [{}])[0]
-                return {
-                    "title": item.get("name", "UGC Item"),
-                    "creator": item.get("creator", {}).get("name", "Unknown"),
-                    "description": item.get("description", ""),
-                    "thumbnail_url": item.get("productImages", [{}])[0].get("targetId", "")
-                }
-        except Exception as e:
-            print(f"Error fetching UGC info: {e}")
+        item_id = self._link_id(link, "/catalog/")
+        if item_id is None:
             return None
+        return (await self.get_ugc_items_info([item_id])).get(item_id)
 
     async def get_group_info(self, link: str):
         """Fetch Roblox group info by link"""
-        try:
-            group_id = int(link.rstrip("/").split("/groups/")[1].split("/")[0])
-        except Exception:
-            return None
-        url = f"https://groups.roblox.com/v1/groups/{group_id}"
-        try:
-            session = await self._get_session()
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    return None
-                info = await resp.json()
-                return {
-                    "title": info.get("name", "Roblox Group"),
-                    "creator": info.get("owner", {}).get("username", "Unknown"),
-                    "description": info.get("description", ""),
-                    "thumbnail_url": f"https://www.roblox.com/Thumbs/Group.ashx?gid={group_id}&x=420&y=420"
-                }
-        except Exception as e:
-            print(f"Error fetching group info: {e}")
+        group_id = self._link_id(link, "/groups/")
+        if group_id is None:
             return None
+        return (await self.get_groups_info([group_id])).get(group_id)
 
     # ===== Session cleanup =====
     async def close_session(self):
@@ -0,0 +1,414 @@
+"""Local emulator of the Roblox web APIs this repo uses, with fault injection.
+
+Serves users, thumbnails, games, catalog and groups endpoints (including the
+batch variants) from one aiohttp app backed by a synthetic dataset, so
+performance and resilience work needs no network:
+
+    python roblox_emulator.py --port 8900 --latency lognormal:0.08:0.5 --error-rate 0.01
+    ROBLOX_API_BASE=http://127.0.0.1:8900 python main.py
+
+In-process use (benchmarks): `await RobloxEmulator(...).start()` also points
+Config at the emulator until stop().
+"""
+import math
+import time
+import random
+import asyncio
+import logging
+import argparse
+from collections import Counter
+from aiohttp import web
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SERVICES = ("users", "thumbnails", "games", "catalog", "groups")
+THUMBNAIL_TYPES = {"AvatarHeadShot": "headshot", "GameIcon": "place", "GroupIcon": "group", "Asset": "asset"}
+
+
+def parse_latency(spec):
+    """Build a latency sampler (seconds) from a number or "fixed:s", "uniform:a:b",
+    "lognormal:median:sigma" or "exponential:mean"."""
+    if callable(spec):
+        return spec
+    if spec is None:
+        return lambda rng: 0.0
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, *params = str(spec).split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(params[0]), params[1])
+    if kind == "exponential":
+        return lambda rng: rng.expovariate(1 / params[0])
+    try:
+        value = float(spec)
+    except ValueError:
+        raise ValueError(f"Unknown latency spec: {spec}") from None
+    return lambda rng: value
+
+
+class FaultProfile:
+    """How one service misbehaves.
+
+    latency: seconds or a spec understood by parse_latency()
+    rate_limit: requests per second allowed before 429 (token bucket, `rate_limit_burst` deep)
+    throttle_rate: probability of a 429 regardless of the bucket
+    retry_after: Retry-After seconds sent with probabilistic 429s
+    error_rate: probability that a request starts a burst of `error_burst` 5xx responses
+    timeout_rate: probability that a request hangs for `hang_seconds` (past client timeouts)
+    """
+
+    def __init__(self, latency=0.0, rate_limit=None, rate_limit_burst=None, throttle_rate=0.0, retry_after=1,
+                 error_rate=0.0, error_burst=1, error_statuses=(500, 502, 503), timeout_rate=0.0, hang_seconds=30.0):
+        self.latency = parse_latency(latency)
+        self.rate_limit = rate_limit
+        self.rate_limit_burst = rate_limit_burst or (rate_limit or 0)
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.error_burst = error_burst
+        self.error_statuses = tuple(error_statuses)
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+
+
+class SyntheticDataset:
+    """Deterministic users, games, groups and catalog assets generated from `seed`.
+
+    User IDs are 1..users, named name_format.format(id). Place IDs start at
+    1000 (universe = place + 5,000,000), group IDs at 1 and asset IDs at 100000.
+    """
+
+    BIO_WORDS = ("builder", "scripter", "obby", "fan", "trader", "ugc", "creator", "gamer", "art", "music")
+
+    def __init__(self, users=10000, games=1000, groups=500, assets=1000, seed=1, name_format="BenchUser{}"):
+        rng = random.Random(seed)
+        self.users = {}
+        for i in range(1, users + 1):
+            bio = " ".join(rng.choice(self.BIO_WORDS) for _ in range(rng.randint(0, 8)))
+            self.users[i] = {"id": i, "name": name_format.format(i), "displayName": f"User {i}",
+                             "description": bio, "created": "2015-01-01T00:00:00.000Z", "isBanned": False,
+                             "hasVerifiedBadge": False}
+        self.by_name = {u["name"].lower(): u for u in self.users.values()}
+        self.games = {}
+        for i in range(games):
+            place_id = 1000 + i
+            owner = self.users.get(rng.randint(1, max(1, users)))
+            self.games[place_id] = {
+                "placeId": place_id, "universeId": place_id + 5_000_000, "name": f"Synthetic Game {i}",
+                "description": f"An emulated experience number {i}.", "url": f"https://www.roblox.com/games/{place_id}",
+                "builder": owner["name"] if owner else "Roblox", "builderId": owner["id"] if owner else 1,
+                "isPlayable": True, "price": None, "playing": rng.randint(0, 50000), "visits": rng.randint(0, 10**8),
+                "created": "2020-01-01T00:00:00.000Z",
+            }
+        self.universes = {g["universeId"]: g for g in self.games.values()}
+        self.groups = {}
+        for i in range(1, groups + 1):
+            owner = self.users.get(rng.randint(1, max(1, users)))
+            self.groups[i] = {
+                "id": i, "name": f"Synthetic Group {i}", "description": f"Emulated group {i}.",
+                "owner": {"userId": owner["id"], "username": owner["name"], "displayName": owner["displayName"]}
+                if owner else None,
+                "memberCount": rng.randint(1, 500000), "publicEntryAllowed": True, "hasVerifiedBadge": False,
+            }
+        self.assets = {}
+        for i in range(assets):
+            asset_id = 100000 + i
+            owner = self.users.get(rng.randint(1, max(1, users)))
+            self.assets[asset_id] = {
+                "id": asset_id, "itemType": "Asset", "assetType": 8, "name": f"Synthetic Item {i}",
+                "description": f"Emulated catalog item {i}.", "creatorName": owner["name"] if owner else "Roblox",
+                "creatorType": "User", "price": rng.choice((None, 50, 75, 100, 250)),
+            }
+
+    def exists(self, kind, target_id):
+        table = {"headshot": self.users, "place": self.games, "group": self.groups, "asset": self.assets}[kind]
+        return target_id in table
+
+
+class RobloxEmulator:
+    """The emulator server. Per-service faults live in `faults` and can be changed
+    at any time with set_faults(), fail_next() or a timed schedule()."""
+
+    def __init__(self, users=10000, games=1000, groups=500, assets=1000, seed=1, latency=0.0,
+                 host="127.0.0.1", port=0, name_format="BenchUser{}", pending_rate=0.0):
+        self.data = SyntheticDataset(users, games, groups, assets, seed, name_format)
+        self.host = host
+        self.port = port
+        self.pending_rate = pending_rate
+        self.faults = {service: FaultProfile(latency=latency) for service in SERVICES}
+        self.requests = Counter()  # endpoint: count
+        self.responses = Counter()  # (service, status): count
+        self._rng = random.Random(seed)
+        self._buckets = {}  # service: [tokens, last_refill]
+        self._bursts = Counter()  # service: remaining forced errors
+        self._burst_status = {}
+        self._csrf_token = f"emulated-{seed}"
+        self._runner = None
+        self._schedule_task = None
+        self._saved_hosts = None
+
+    # ===== Scripting =====
+    def set_bio(self, user_id, text):
+        self.data.users[user_id]["description"] = text
+
+    def set_faults(self, service="*", profile=None, **kwargs):
+        """Replace the fault profile of one service (or all with "*")"""
+        for name in SERVICES if service == "*" else (service,):
+            self.faults[name] = profile or FaultProfile(**kwargs)
+            self._buckets.pop(name, None)
+
+    def fail_next(self, service, count=1, status=503):
+        """Force the next `count` requests to `service` to fail with `status`"""
+        self._bursts[service] += count
+        self._burst_status[service] = status
+
+    def schedule(self, phases):
+        """Apply [(at_seconds, service, FaultProfile), ...] at the given offsets from now"""
+        async def run():
+            started = time.monotonic()
+            for at, service, profile in sorted(phases, key=lambda p: p[0]):
+                await asyncio.sleep(max(0.0, at - (time.monotonic() - started)))
+                logger.info("Applying fault phase for %s at +%ss", service, at)
+                self.set_faults(service, profile)
+        if self._schedule_task:
+            self._schedule_task.cancel()
+        self._schedule_task = asyncio.create_task(run())
+
+    # ===== Fault injection =====
+    def _take_token(self, service, profile):
+        """Return 0 if a token was available, else seconds until the next one"""
+        now = time.monotonic()
+        bucket = self._buckets.setdefault(service, [profile.rate_limit_burst, now])
+        bucket[0] = min(profile.rate_limit_burst, bucket[0] + (now - bucket[1]) * profile.rate_limit)
+        bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0
+        return (1 - bucket[0]) / profile.rate_limit
+
+    async def _inject(self, service):
+        """Sleep for the sampled latency, then return an error response or None"""
+        profile = self.faults[service]
+        delay = profile.latency(self._rng)
+        if profile.timeout_rate and self._rng.random() < profile.timeout_rate:
+            delay = profile.hang_seconds
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if profile.rate_limit:
+            wait = self._take_token(service, profile)
+            if wait:
+                return self._error(429, "TooManyRequests", retry_after=max(1, math.ceil(wait)))
+        if profile.throttle_rate and self._rng.random() < profile.throttle_rate:
+            return self._error(429, "TooManyRequests", retry_after=profile.retry_after)
+
+        if not self._bursts[service] and profile.error_rate and self._rng.random() < profile.error_rate:
+            self._bursts[service] = profile.error_burst
+            self._burst_status[service] = self._rng.choice(profile.error_statuses)
+        if self._bursts[service]:
+            self._bursts[service] -= 1
+            return self._error(self._burst_status.get(service, 503), "InternalServerError")
+        return None
+
+    @staticmethod
+    def _error(status, message, retry_after=None):
+        headers = {"Retry-After": str(retry_after)} if retry_after is not None else None
+        return web.json_response({"errors": [{"code": 0, "message": message}]}, status=status, headers=headers)
+
+    def _route(self, service, endpoint, handler):
+        async def wrapped(request):
+            self.requests[endpoint] += 1
+            response = await self._inject(service)
+            if response is None:
+                response = await handler(request)
+            self.responses[(service, response.status)] += 1
+            return response
+        return wrapped
+
+    # ===== users.roblox.com =====
+    async def usernames(self, request):
+        body = await request.json()
+        data = []
+        for name in body.get("usernames", []):
+            user = self.data.by_name.get(str(name).lower())
+            if user and not (user["isBanned"] and body.get("excludeBannedUsers")):
+                data.append({"requestedUsername": name, "id": user["id"], "name": user["name"],
+                             "displayName": user["displayName"], "hasVerifiedBadge": user["hasVerifiedBadge"]})
+        return web.json_response({"data": data})
+
+    async def user(self, request):
+        user = self.data.users.get(int(request.match_info["user_id"]))
+        if user is None:
+            return self._error(404, "The user id is invalid.")
+        return web.json_response(user)
+
+    async def users_batch(self, request):
+        body = await request.json()
+        data = [{"id": u["id"], "name": u["name"], "displayName": u["displayName"],
+                 "hasVerifiedBadge": u["hasVerifiedBadge"]}
+                for u in (self.data.users.get(int(i)) for i in body.get("userIds", [])) if u]
+        return web.json_response({"data": data})
+
+    # ===== thumbnails.roblox.com =====
+    def _thumbnail(self, kind, target_id, size="150x150"):
+        if not self.data.exists(kind, target_id):
+            return {"targetId": target_id, "state": "Blocked", "imageUrl": None}
+        if self.pending_rate and self._rng.random() < self.pending_rate:
+            return {"targetId": target_id, "state": "Pending", "imageUrl": None}
+        return {"targetId": target_id, "state": "Completed",
+                "imageUrl": f"https://tr.rbxcdn.com/emulated/{kind}/{target_id}/{size}/Image/Png"}
+
+    def _thumbnails_handler(self, kind, id_param):
+        async def handler(request):
+            ids = [int(i) for i in request.query.get(id_param, "").split(",") if i.strip()]
+            if len(ids) > 100:
+                return self._error(400, "Too many ids.")
+            size = request.query.get("size", "150x150")
+            return web.json_response({"data": [self._thumbnail(kind, i, size) for i in ids]})
+        return handler
+
+    async def thumbnails_batch(self, request):
+        body = await request.json()
+        data = []
+        for item in body:
+            kind = THUMBNAIL_TYPES.get(item.get("type"))
+            if kind is None:
+                data.append({"requestId": item.get("requestId"), "errorCode": 1, "errorMessage": "Invalid type"})
+                continue
+            result = self._thumbnail(kind, int(item.get("targetId", 0)), item.get("size", "150x150"))
+            data.append({"requestId": item.get("requestId"), "errorCode": 0, **result})
+        return web.json_response({"data": data})
+
+    # ===== games.roblox.com =====
+    async def games_multiget(self, request):
+        ids = [int(i) for value in request.query.getall("placeIds", []) for i in value.split(",") if i.strip()]
+        if len(ids) > 50:
+            return self._error(400, "Too many place ids.")
+        return web.json_response([self.data.games[i] for i in ids if i in self.data.games])
+
+    async def games(self, request):
+        ids = [int(i) for i in request.query.get("universeIds", "").split(",") if i.strip()]
+        data = [{"id": g["universeId"], "rootPlaceId": g["placeId"], "name": g["name"],
+                 "description": g["description"], "creator": {"id": g["builderId"], "name": g["builder"]},
+                 "playing": g["playing"], "visits": g["visits"], "created": g["created"]}
+                for g in (self.data.universes.get(i) for i in ids) if g]
+        return web.json_response({"data": data})
+
+    # ===== catalog.roblox.com =====
+    async def catalog_details(self, request):
+        if request.headers.get("x-csrf-token") != self._csrf_token:
+            return web.json_response({"errors": [{"code": 0, "message": "Token Validation Failed"}]},
+                                     status=403, headers={"x-csrf-token": self._csrf_token})
+        body = await request.json()
+        items = body.get("items", [])
+        if len(items) > 120:
+            return self._error(400, "Too many items.")
+        data = [self.data.assets[int(i["id"])] for i in items if int(i.get("id", 0)) in self.data.assets]
+        return web.json_response({"data": data})
+
+    # ===== groups.roblox.com =====
+    async def group(self, request):
+        group = self.data.groups.get(int(request.match_info["group_id"]))
+        if group is None:
+            return self._error(400, "Group is invalid or does not exist.")
+        return web.json_response(group)
+
+    async def groups_batch(self, request):
+        ids = [int(i) for i in request.query.get("groupIds", "").split(",") if i.strip()]
+        data = [{"id": g["id"], "name": g["name"], "description": g["description"],
+                 "owner": {"id": g["owner"]["userId"], "type": "User"} if g["owner"] else None,
+                 "hasVerifiedBadge": g["hasVerifiedBadge"]}
+                for g in (self.data.groups.get(i) for i in ids) if g]
+        return web.json_response({"data": data})
+
+    # ===== Lifecycle =====
+    def make_app(self):
+        app = web.Application()
+        r = app.router
+        r.add_post("/v1/usernames/users", self._route("users", "usernames", self.usernames))
+        r.add_post("/v1/users", self._route("users", "users_batch", self.users_batch))
+        r.add_get(r"/v1/users/{user_id:\d+}", self._route("users", "user", self.user))
+        for path, kind, id_param in (("/v1/users/avatar-headshot", "headshot", "userIds"),
+                                     ("/v1/places/gameicons", "place", "placeIds"),
+                                     ("/v1/groups/icons", "group", "groupIds"),
+                                     ("/v1/assets", "asset", "assetIds")):
+            r.add_get(path, self._route("thumbnails", f"thumbnails:{kind}", self._thumbnails_handler(kind, id_param)))
+        r.add_post("/v1/batch", self._route("thumbnails", "thumbnails_batch", self.thumbnails_batch))
+        r.add_get("/v1/games/multiget-place-details", self._route("games", "games_multiget", self.games_multiget))
+        r.add_get("/v1/games", self._route("games", "games", self.games))
+        r.add_post("/v1/catalog/items/details", self._route("catalog", "catalog_details", self.catalog_details))
+        r.add_get(r"/v1/groups/{group_id:\d+}", self._route("groups", "group", self.group))
+        r.add_get("/v2/groups", self._route("groups", "groups_batch", self.groups_batch))
+        return app
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self, configure=True):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        if configure:
+            self._saved_hosts = {s: getattr(Config, f"ROBLOX_{s.upper()}_HOST") for s in SERVICES}
+            Config.set_roblox_hosts(self.base_url)
+        return self
+
+    async def stop(self):
+        if self._schedule_task:
+            self._schedule_task.cancel()
+        if self._saved_hosts:
+            Config.set_roblox_hosts(**self._saved_hosts)
+            self._saved_hosts = None
+        if self._runner:
+            await self._runner.cleanup()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=500)
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--name-format", default="BenchUser{}")
+    parser.add_argument("--latency", default="0", help='e.g. "0.05", "uniform:0.02:0.2", "lognormal:0.08:0.5"')
+    parser.add_argument("--rate-limit", type=float, help="requests/second per service before 429s")
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-burst", type=int, default=1)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--pending-rate", type=float, default=0.0, help="share of thumbnails returned as Pending")
+    args = parser.parse_args(argv)
+
+    from logging_setup import setup_logging
+    setup_logging()
+
+    async def serve():
+        emulator = RobloxEmulator(args.users, args.games, args.groups, args.assets, args.seed, host=args.host,
+                                  port=args.port, name_format=args.name_format, pending_rate=args.pending_rate)
+        emulator.set_faults("*", latency=args.latency, rate_limit=args.rate_limit,
+                            throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                            error_burst=args.error_burst, timeout_rate=args.timeout_rate)
+        await emulator.start(configure=False)
+        logger.info("Roblox emulator listening on %s", emulator.base_url)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import logging
+import math
+import discord
+from discord.ext import commands
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def bot_intents():
+    """Gateway intents for Config.COMMAND_MODE.
+
+    Prefix commands need message content and the message/member events. In
+    slash mode commands arrive as interactions, so only guild events (channel
+    and role caches) are subscribed to.
+    """
+    if Config.COMMAND_MODE == "slash":
+        intents = discord.Intents.none()
+        intents.guilds = True
+        return intents
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    return intents
+
+
+def make_bot(bot_name, intents=None, command_prefix="!", **options):
+    """A commands.Bot, or an AutoShardedBot when sharding is configured for `bot_name`.
+
+    Unless COMMAND_MODE is "prefix", the bot's application commands (slash and
+    hybrid) are synced with Discord at startup.
+    """
+    intents = intents or bot_intents()
+    shard_options = Config.shard_options(bot_name)
+    if shard_options is None:
+        bot = commands.Bot(command_prefix=command_prefix, intents=intents, **options)
+    else:
+        bot = commands.AutoShardedBot(command_prefix=command_prefix, intents=intents, **shard_options, **options)
+        logger.info("Starting %s with sharding (%s)", bot_name,
+                    ", ".join(f"{k}={v}" for k, v in shard_options.items()) or "shard_count=auto")
+
+        async def _on_shard_ready(shard_id):
+            guilds = sum(1 for g in bot.guilds if g.shard_id == shard_id)
+            logger.info("Shard %s ready with %d guild(s)", shard_id, guilds, extra={"bot": bot_name})
+
+        bot.add_listener(_on_shard_ready, "on_shard_ready")
+
+    if Config.COMMAND_MODE != "prefix" and Config.SYNC_APP_COMMANDS:
+        async def _sync_app_commands():
+            try:
+                synced = await bot.tree.sync()
+                logger.info("Synced %d application command(s)", len(synced), extra={"bot": bot_name})
+            except discord.HTTPException as e:
+                logger.warning("Failed to sync application commands: %s", e, extra={"bot": bot_name})
+
+        bot.setup_hook = _sync_app_commands
+    return bot
+
+
+def shard_summary(bot):
+    """[(shard_id, latency_ms, guild_count)] for every shard this process runs"""
+    if not isinstance(bot, commands.AutoShardedBot):
+        return [(0, _ms(bot.latency), len(bot.guilds))]
+    counts = {}
+    for guild in bot.guilds:
+        counts[guild.shard_id] = counts.get(guild.shard_id, 0) + 1
+    return [(shard_id, _ms(latency), counts.get(shard_id, 0)) for shard_id, latency in bot.latencies]
+
+
+def _ms(latency):
+    return round(latency * 1000) if math.isfinite(latency) else None
@@ -0,0 +1,96 @@
+import time
+import asyncio
+
+# name: SingleFlight, so one command can report on every guard in the process
+REGISTRY = {}
+
+
+class SingleFlight:
+    """Collapses duplicate concurrent calls for the same key into one execution.
+
+    run(key, factory) awaits factory() once per key at a time: callers that
+    arrive while it is running share its result ("shared"), and for `cooldown`
+    seconds after it finishes callers get that result back without running it
+    again ("cooldown"). Exceptions are propagated to every waiter but never
+    cached. `stats` counts how much duplicate work was avoided.
+    """
+
+    def __init__(self, name, cooldown=0.0, max_entries=10000):
+        self.name = name
+        self.cooldown = cooldown
+        self.max_entries = max_entries
+        self._inflight = {}  # key: Future
+        self._recent = {}  # key: (finished_at, result)
+        self.stats = {"calls": 0, "executed": 0, "shared": 0, "cooldown": 0, "busy": 0, "errors": 0}
+        REGISTRY[name] = self
+
+    @property
+    def avoided(self):
+        return self.stats["shared"] + self.stats["cooldown"] + self.stats["busy"]
+
+    def running(self, key):
+        return key in self._inflight
+
+    def forget(self, key):
+        """Drop a cooled-down result, e.g. after the user's state changed"""
+        self._recent.pop(key, None)
+
+    def _cached(self, key):
+        item = self._recent.get(key)
+        if item is None:
+            return None
+        if time.monotonic() - item[0] > self.cooldown:
+            del self._recent[key]
+            return None
+        return item
+
+    async def run(self, key, factory, join=True, cache_if=None):
+        """Return (result, source) with source "executed", "shared", "cooldown" or "busy".
+
+        With join=False a caller arriving while the key is running gets
+        (None, "busy") immediately instead of waiting for the result. With
+        `cache_if`, only results it accepts start a cooldown.
+        """
+        self.stats["calls"] += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            if not join:
+                self.stats["busy"] += 1
+                return None, "busy"
+            self.stats["shared"] += 1
+            return await asyncio.shield(future), "shared"
+
+        if self.cooldown:
+            cached = self._cached(key)
+            if cached is not None:
+                self.stats["cooldown"] += 1
+                return cached[1], "cooldown"
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        self.stats["executed"] += 1
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            if not future.done():
+                future.set_exception(e)
+                future.exception()  # mark retrieved so an unshared failure isn't logged as unhandled
+            raise
+        else:
+            future.set_result(result)
+            if self.cooldown and (cache_if is None or cache_if(result)):
+                if len(self._recent) >= self.max_entries:
+                    self._prune()
+                self._recent[key] = (time.monotonic(), result)
+            return result, "executed"
+        finally:
+            self._inflight.pop(key, None)
+
+    def _prune(self):
+        now = time.monotonic()
+        self._recent = {k: v for k, v in self._recent.items() if now - v[0] <= self.cooldown}
+        if len(self._recent) >= self.max_entries:
+            self._recent.clear()
@@ -0,0 +1,117 @@
+import logging
+import asyncio
+from cache import TTLCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailService:
+    """Resolves Roblox image URLs through the batch thumbnails endpoints.
+
+    Lookups made within `window` seconds of each other are coalesced into one
+    request per kind (up to `batch_size` IDs), and resolved URLs are cached for
+    `ttl` seconds. Thumbnails Roblox is still generating ("Pending") are only
+    cached briefly so they are picked up once ready.
+    """
+
+    ENDPOINTS = {
+        # kind: (path, id parameter, size, circular)
+        "place": ("/v1/places/gameicons", "placeIds", "512x512", False),
+        "group": ("/v1/groups/icons", "groupIds", "420x420", False),
+        "asset": ("/v1/assets", "assetIds", "420x420", False),
+        "headshot": ("/v1/users/avatar-headshot", "userIds", "150x150", True),
+    }
+    PENDING_TTL = 30
+    MISS_TTL = 60
+
+    def __init__(self, get_session, ttl=Config.ROBLOX_THUMBNAIL_CACHE_TTL, window=0.05, batch_size=100):
+        self._get_session = get_session
+        self.window = window
+        self.batch_size = batch_size
+        self.cache = TTLCache(ttl)  # (kind, id): url | None
+        self._waiting = {kind: {} for kind in self.ENDPOINTS}  # kind: {id: Future}
+        self._flush_tasks = {}  # kind: Task
+        self._fetch_tasks = set()  # running batch requests, referenced so they aren't garbage-collected
+        self.requests_made = 0
+
+    async def get(self, kind, target_id):
+        """Return the image URL for one place/group/asset/headshot, or None"""
+        return (await self.get_many(kind, [target_id])).get(int(target_id))
+
+    async def get_many(self, kind, target_ids):
+        """Return {id: url} for the given IDs, batching uncached ones with other callers"""
+        if kind not in self.ENDPOINTS:
+            raise ValueError(f"Unknown thumbnail kind: {kind}")
+        loop = asyncio.get_running_loop()
+        results = {}
+        futures = {}
+        waiting = self._waiting[kind]
+        for target_id in dict.fromkeys(int(t) for t in target_ids):
+            key = (kind, target_id)
+            if key in self.cache:
+                results[target_id] = self.cache.get(key)
+                continue
+            future = waiting.get(target_id)
+            if future is None:
+                future = waiting[target_id] = loop.create_future()
+            futures[target_id] = future
+
+        if futures:
+            if len(waiting) >= self.batch_size:
+                self._flush_now(kind)
+            elif kind not in self._flush_tasks:
+                self._flush_tasks[kind] = asyncio.create_task(self._flush_later(kind))
+            for target_id, future in futures.items():
+                # Other callers share this future; cancelling one of them mustn't cancel it for the rest
+                results[target_id] = await asyncio.shield(future)
+        return results
+
+    async def _flush_later(self, kind):
+        await asyncio.sleep(self.window)
+        self._flush_tasks.pop(kind, None)
+        self._flush_now(kind)
+
+    def _flush_now(self, kind):
+        waiting = self._waiting[kind]
+        while waiting:
+            batch = dict(list(waiting.items())[:self.batch_size])
+            for target_id in batch:
+                del waiting[target_id]
+            task = asyncio.create_task(self._fetch(kind, batch))
+            self._fetch_tasks.add(task)
+            task.add_done_callback(self._fetch_tasks.discard)
+
+    async def _fetch(self, kind, batch):
+        path, id_param, size, circular = self.ENDPOINTS[kind]
+        params = {
+            id_param: ",".join(str(t) for t in batch),
+            "size": size,
+            "format": "Png",
+            "isCircular": "true" if circular else "false",
+        }
+        found = {}
+        try:
+            session = await self._get_session()
+            self.requests_made += 1
+            async with session.get(Config.ROBLOX_THUMBNAILS_HOST + path, params=params) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    for item in data.get("data") or []:
+                        found[int(item.get("targetId", 0))] = item
+                else:
+                    logger.warning("Roblox API error for %s thumbnails: %s", kind, resp.status)
+        except Exception as e:
+            logger.warning("Error fetching %s thumbnails: %s", kind, e)
+
+        for target_id, future in batch.items():
+            item = found.get(target_id)
+            url = item.get("imageUrl") if item and item.get("state") == "Completed" else None
+            if url:
+                self.cache.set((kind, target_id), url)
+            elif item and item.get("state") == "Pending":
+                self.cache.set((kind, target_id), None, ttl=self.PENDING_TTL)
+            else:
+                self.cache.set((kind, target_id), None, ttl=self.MISS_TTL)
+            if not future.done():
+                future.set_result(url)
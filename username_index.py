@@ -0,0 +1,178 @@
+import bisect
+from array import array
+from collections import Counter
+
+ROBLOX, DISCORD = 0, 1  # which name an entry is
+MAX_SUGGESTIONS = 25  # Discord's autocomplete limit
+
+
+def _trigrams(key):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class UsernameIndex:
+    """In-memory lookup of verified users by Roblox username or Discord name.
+
+    Names are kept lowercase in one sorted list of (name, kind, discord_id)
+    tuples, so a prefix search is a bisect plus a short scan: microseconds
+    at 100k+ users. When no name starts with the query, fuzzy() ranks names
+    by shared trigrams (Dice coefficient) using compact per-trigram posting
+    arrays; removed names are only marked dead there and the postings are
+    rebuilt once half of them are. set_roblox()/set_discord()/remove() keep
+    it current as members verify and are revoked.
+    """
+
+    def __init__(self, fuzzy_threshold=0.3):
+        self.fuzzy_threshold = fuzzy_threshold
+        self._reset()
+
+    def _reset(self):
+        self._sorted = []  # (name, kind, discord_id), sorted
+        self._names = {}  # discord_id: [roblox_name, discord_name] as given (original case)
+        self._entry_ids = {}  # (name, kind, discord_id): posting id
+        self._entries = []  # posting id: (name, kind, discord_id) or None once removed
+        self._gram_counts = array("H")  # posting id: number of distinct trigrams in the name
+        self._postings = {}  # trigram: array of posting ids
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._names)
+
+    # ===== Updates =====
+    def load(self, rows):
+        """Replace the contents with (discord_id, roblox_username) rows, building the index in one pass"""
+        self._reset()
+        for discord_id, roblox_username in rows:
+            if roblox_username:
+                self._names[discord_id] = [roblox_username, None]
+        self._sorted = sorted((names[0].lower(), ROBLOX, discord_id) for discord_id, names in self._names.items())
+        for entry in self._sorted:
+            self._post(entry)
+        return self
+
+    def set_roblox(self, discord_id, roblox_username):
+        self._set(discord_id, ROBLOX, roblox_username)
+
+    def set_discord(self, discord_id, name):
+        """Record a verified member's Discord name (ignored for members who aren't verified)"""
+        if discord_id in self._names:
+            self._set(discord_id, DISCORD, name)
+
+    def remove(self, discord_id):
+        names = self._names.pop(discord_id, None)
+        for kind, name in enumerate(names or ()):
+            if name:
+                self._discard((name.lower(), kind, discord_id))
+
+    def _set(self, discord_id, kind, name):
+        names = self._names.setdefault(discord_id, [None, None])
+        if names[kind] == name:
+            return
+        if names[kind]:
+            self._discard((names[kind].lower(), kind, discord_id))
+        names[kind] = name
+        if name:
+            entry = (name.lower(), kind, discord_id)
+            bisect.insort(self._sorted, entry)
+            self._post(entry)
+
+    def _discard(self, entry):
+        i = bisect.bisect_left(self._sorted, entry)
+        if i < len(self._sorted) and self._sorted[i] == entry:
+            del self._sorted[i]
+        posting_id = self._entry_ids.pop(entry, None)
+        if posting_id is not None:
+            self._entries[posting_id] = None
+            self._dead += 1
+            if self._dead > len(self._entries) // 2:
+                self._rebuild_postings()
+
+    def _post(self, entry):
+        posting_id = len(self._entries)
+        grams = _trigrams(entry[0])
+        self._entries.append(entry)
+        self._gram_counts.append(min(len(grams), 0xFFFF))
+        self._entry_ids[entry] = posting_id
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("I")
+            postings.append(posting_id)
+
+    def _rebuild_postings(self):
+        live = [entry for entry in self._entries if entry is not None]
+        self._entries, self._entry_ids, self._postings, self._dead = [], {}, {}, 0
+        self._gram_counts = array("H")
+        for entry in live:
+            self._post(entry)
+
+    # ===== Lookups =====
+    def roblox_username(self, discord_id):
+        names = self._names.get(discord_id)
+        return names[ROBLOX] if names else None
+
+    def find_roblox(self, roblox_username):
+        """Discord ID verified as exactly this Roblox username (any case), or None"""
+        key = roblox_username.lower()
+        i = bisect.bisect_left(self._sorted, (key, ROBLOX))
+        if i < len(self._sorted) and self._sorted[i][:2] == (key, ROBLOX):
+            return self._sorted[i][2]
+        return None
+
+    def _result(self, entry, score):
+        name, kind, discord_id = entry
+        roblox_name, discord_name = self._names[discord_id]
+        return {"discord_id": discord_id, "roblox_username": roblox_name, "discord_name": discord_name,
+                "matched": kind, "score": score}
+
+    def prefix(self, query, limit=MAX_SUGGESTIONS):
+        """Users with a Roblox or Discord name starting with `query`, alphabetically, one result per user"""
+        key = query.strip().lower()
+        results, seen = [], set()
+        for i in range(bisect.bisect_left(self._sorted, (key,)), len(self._sorted)):
+            entry = self._sorted[i]
+            if not entry[0].startswith(key) or len(results) >= limit:
+                break
+            if entry[2] not in seen:
+                seen.add(entry[2])
+                results.append(self._result(entry, 1.0))
+        return results
+
+    def fuzzy(self, query, limit=MAX_SUGGESTIONS, max_postings=5000):
+        """Users whose names share the most trigrams with `query`, best first"""
+        key = query.strip().lower()
+        if len(key) < 3 or not self._entries:
+            return []
+        grams = _trigrams(key)
+        lists = sorted((self._postings[g] for g in grams if g in self._postings), key=len)
+        # Very common trigrams barely narrow the candidates; skip them unless nothing else matched
+        selective = [p for p in lists if len(p) <= max_postings] or lists[:1]
+        hits = Counter()
+        for postings in selective:
+            hits.update(postings)
+
+        scored = []
+        for posting_id, shared in hits.most_common(limit * 4):
+            entry = self._entries[posting_id]
+            if entry is None:
+                continue
+            score = 2 * shared / (len(grams) + self._gram_counts[posting_id])
+            if score >= self.fuzzy_threshold:
+                scored.append((score, entry))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        results, seen = [], set()
+        for score, entry in scored:
+            if entry[2] not in seen:
+                seen.add(entry[2])
+                results.append(self._result(entry, round(score, 3)))
+                if len(results) >= limit:
+                    break
+        return results
+
+    def suggest(self, query, limit=MAX_SUGGESTIONS):
+        """Prefix matches, or fuzzy matches when nothing starts with `query`"""
+        if not query.strip():
+            return []
+        return self.prefix(query, limit) or self.fuzzy(query, limit)
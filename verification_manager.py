@@ -1,18 +1,41 @@
+import logging
 import random
 import aiohttp
 import os
+import json
 import asyncio
 import discord
 import asyncpg
 from datetime import datetime
 from roblox_api import RobloxAPI
+from guild_index import GuildIndex
 from config import Config
+from cache import TTLCache
+from dm_delivery import DMDelivery, OVERLOADED, PRIORITY_VERIFICATION, SENT
+from username_index import UsernameIndex
+
+logger = logging.getLogger(__name__)
+
+# discord_id: roblox_username | None. One per process so every bot's manager sees a verify or
+# revoke made through another bot straight away
+VERIFIED_CACHE = TTLCache(Config.VERIFIED_CACHE_TTL)
 
 class VerificationManager:
-    def __init__(self, bot):
+    _NOT_CACHED = object()
+    DM_SENT_REPLY = "📬 Check your DMs for verification instructions!"
+    DM_FAILED_REPLY = "❌ I couldn't DM you. Please enable DMs and try again."
+    DM_BUSY_REPLY = "⏳ Lots of members are verifying right now. Please try again in a minute."
+
+    def __init__(self, bot, dm_delivery=None, index_usernames=False):
         self.bot = bot
+        self.dm_delivery = dm_delivery or DMDelivery("verification")
+        # Verified Roblox usernames and Discord names, for staff autocomplete (loaded with index_usernames)
+        self.usernames = UsernameIndex()
+        self.index_usernames = index_usernames
         self.codes = {}  # discord_id: code
         self.roblox_usernames = {}  # discord_id: roblox_username
+        self.guild_ids = {}  # discord_id: guild the pending !verify came from, so a DM !check knows where to assign the role
+        self.verified_cache = VERIFIED_CACHE
         self.data_file = Config.VERIFICATION_DATA_FILE
         os.makedirs("data", exist_ok=True)
         if not os.path.exists(self.data_file):
@@ -20,39 +43,55 @@ class VerificationManager:
                 f.write("{}")
 
         self.roblox_api = RobloxAPI()
+        self.guild_index = GuildIndex(bot)
         self.db_url = os.getenv("DATABASE_URL")
         self.pool = None
         asyncio.create_task(self.init_db())
 
     async def init_db(self):
         if not self.db_url:
-            print("❌ DATABASE_URL not set. Supabase/Postgres connection failed.")
+            logger.error("DATABASE_URL not set. Supabase/Postgres connection failed.")
             return
         try:
             self.pool = await asyncpg.create_pool(self.db_url)
-            async with self.pool.acquire() as conn:
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS verifications (
-                        discord_id BIGINT PRIMARY KEY,
-                        roblox_username TEXT,
-                        verified_at TIMESTAMP,
-                        BEcredits INT DEFAULT 5
-                    )
-                """)
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS credits_received (
-                        roblox_username TEXT PRIMARY KEY
-                    )
-                """)
-            print("✅ Connected to database and ensured tables exist.")
+            await self.ensure_schema()
+            logger.info("Connected to database and ensured tables exist.")
         except Exception as e:
-            print(f"❌ Failed to connect to DB: {e}")
+            logger.error("Failed to connect to DB: %s", e)
             self.pool = None
+            return
+        if self.index_usernames:
+            await self.load_username_index()
+
+    async def load_username_index(self):
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch("SELECT discord_id, roblox_username FROM verifications")
+        self.usernames.load((r["discord_id"], r["roblox_username"]) for r in rows)
+        self.index_discord_names(self.bot.get_all_members())
+        logger.info("Username index loaded with %d verified user(s)", len(self.usernames))
+
+    def index_discord_names(self, members):
+        for member in members:
+            self.usernames.set_discord(member.id, member.name)
+
+    async def ensure_schema(self):
+        async with self.pool.acquire() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS verifications (
+                    discord_id BIGINT PRIMARY KEY,
+                    roblox_username TEXT,
+                    verified_at TIMESTAMP,
+                    BEcredits INT DEFAULT 5
+                )
+            """)
 
-    async def start_verification(self, ctx, roblox_username):
+    async def start_verification(self, ctx, roblox_username, expiry_minutes=None):
+        """DM a fresh code to ctx.author; returns whether the DM was delivered"""
+        expiry_minutes = expiry_minutes or Config.CODE_EXPIRY_MINUTES
         code = str(random.randint(10**(Config.CODE_LENGTH-1), 10**Config.CODE_LENGTH -1))
         self.codes[ctx.author.id] = code
         self.roblox_usernames[ctx.author.id] = roblox_username
+        self.guild_ids[ctx.author.id] = ctx.guild.id if ctx.guild else None
 
         message = (
             f"**Blox Entertainment Verification**\n\n"
@@ -62,35 +101,37 @@ class VerificationManager:
             f"`{code}`\n\n"
             f"**Step 2:** Once you’ve saved the bio, return here and type:\n"
             f"`!check`\n\n"
-            f"This code will expire in {Config.CODE_EXPIRY_MINUTES} minutes."
+            f"This code will expire in {expiry_minutes} minutes."
         )
 
-        try:
-            await ctx.author.send(message)
-            print(f"[START_VERIF] Sent DM instructions to {ctx.author}")
-            await ctx.reply("📬 Check your DMs for verification instructions!", mention_author=True)
-        except Exception as e:
-            print(f"[START_VERIF] Failed to DM {ctx.author}: {e}")
-            await ctx.reply("❌ I couldn't DM you. Please enable DMs and try again.", mention_author=True)
-
-        asyncio.create_task(self.expire_code(ctx.author.id, Config.CODE_EXPIRY_MINUTES * 60))
+        asyncio.create_task(self.expire_code(ctx.author.id, expiry_minutes * 60))
+        # Codes go ahead of every other queued DM; recheck since the member may have just opened their DMs
+        outcome = await self.dm_delivery.send(ctx.author, message, priority=PRIORITY_VERIFICATION, recheck=True)
+        if outcome == SENT:
+            logger.info("Sent DM instructions", extra={"command": "verify", "user_id": ctx.author.id})
+            await ctx.reply(self.DM_SENT_REPLY, mention_author=True)
+            return True
+        logger.warning("Failed to DM verification instructions: %s", outcome, extra={"command": "verify", "user_id": ctx.author.id})
+        await ctx.reply(self.DM_BUSY_REPLY if outcome == OVERLOADED else self.DM_FAILED_REPLY, mention_author=True)
+        return False
 
     async def expire_code(self, discord_id, delay_seconds):
         await asyncio.sleep(delay_seconds)
         if discord_id in self.codes:
-            print(f"[EXPIRE] Expiring verification code for Discord ID {discord_id}")
+            logger.info("Expiring verification code", extra={"user_id": discord_id})
             self.codes.pop(discord_id, None)
             self.roblox_usernames.pop(discord_id, None)
+            self.guild_ids.pop(discord_id, None)
 
     async def check_verification(self, ctx):
         discord_id = ctx.author.id
         code = self.codes.get(discord_id)
         roblox_username = self.roblox_usernames.get(discord_id)
         if not code or not roblox_username:
-            print(f"[CHECK_VERIF] No pending verification for {ctx.author}")
+            logger.info("No pending verification", extra={"command": "check", "user_id": ctx.author.id})
             return False, None, None
 
-        print(f"[CHECK_VERIF] Checking Roblox username '{roblox_username}' for code '{code}' for {ctx.author}")
+        logger.debug("Checking Roblox username '%s' for verification code", roblox_username, extra={"command": "check", "user_id": ctx.author.id})
         user_data = await self.roblox_api.get_user_by_username(roblox_username)
         if not user_data:
             return False, None, None
@@ -100,10 +141,11 @@ class VerificationManager:
             return False, None, None
 
         if code in bio:
-            print(f"[CHECK_VERIF] Code found in bio! Verification successful.")
+            logger.info("Code found in bio, verification successful", extra={"command": "check", "user_id": discord_id})
             await self.save_verification(discord_id, roblox_username)
             self.codes.pop(discord_id, None)
             self.roblox_usernames.pop(discord_id, None)
+            self.guild_ids.pop(discord_id, None)
             return True, roblox_username, user_data['id']
         return False, None, None
 
@@ -119,50 +161,65 @@ class VerificationManager:
                     SET roblox_username = EXCLUDED.roblox_username,
                         verified_at = EXCLUDED.verified_at
                 """, discord_id, roblox_username, timestamp)
-            print(f"[SAVE_VERIF] Saved verification for {discord_id} -> {roblox_username}")
+            self.verified_cache.set(discord_id, roblox_username)
+            self.usernames.set_roblox(discord_id, roblox_username)
+            logger.info("Saved verification -> %s", roblox_username, extra={"user_id": discord_id})
         except Exception as e:
-            print(f"[SAVE_VERIF] DB error: {e}")
+            logger.error("Failed to save verification: %s", e, extra={"user_id": discord_id})
 
-    async def has_received_credits(self, roblox_username: str):
-        """Check if the user has already received 5 credits."""
+    async def get_roblox_usernames(self, discord_ids):
+        """Return {discord_id: roblox_username} for the verified users among `discord_ids`"""
+        discord_ids = list(dict.fromkeys(discord_ids))
+        found = {}
+        missing = []
+        for discord_id in discord_ids:
+            name = self.verified_cache.get(discord_id, self._NOT_CACHED)
+            if name is self._NOT_CACHED:
+                missing.append(discord_id)
+            elif name:
+                found[discord_id] = name
+        if not missing:
+            return found
         if self.pool:
             async with self.pool.acquire() as conn:
-                row = await conn.fetchrow("""
-                    SELECT roblox_username FROM credits_received WHERE roblox_username=$1
-                """, roblox_username)
-                return bool(row)
+                rows = await conn.fetch(
+                    "SELECT discord_id, roblox_username FROM verifications WHERE discord_id = ANY($1::bigint[])",
+                    missing)
+            names = {r["discord_id"]: r["roblox_username"] for r in rows}
         else:
             try:
-                file = os.path.join("data", "received_credits.json")
-                with open(file, "r") as f:
+                with open(self.data_file, "r") as f:
                     data = json.load(f)
-                    return roblox_username in data
             except Exception:
-                return False
+                data = {}
+            names = {i: data[str(i)] for i in missing if str(i) in data}
+        for discord_id in missing:
+            # Misses are cached too, but only briefly: a member who verifies (possibly in a bot running
+            # in another process) shouldn't be refused for long
+            name = names.get(discord_id)
+            self.verified_cache.set(discord_id, name, ttl=None if name else Config.VERIFIED_MISS_CACHE_TTL)
+        found.update(names)
+        return found
 
-    async def mark_received_credits(self, roblox_username: str):
-        """Mark user as having received the 5 credits."""
-        if self.pool:
+    async def get_roblox_username(self, discord_id):
+        return (await self.get_roblox_usernames([discord_id])).get(discord_id)
+
+    async def find_verification(self, roblox_username, conn=None):
+        """The verification row for a Roblox username (any case), or None.
+
+        Names in the username index are looked up by primary key; the
+        LOWER(roblox_username) scan only runs when the index doesn't know the
+        name (or is out of date).
+        """
+        if conn is None:
             async with self.pool.acquire() as conn:
-                await conn.execute("""
-                    INSERT INTO credits_received(roblox_username)
-                    VALUES($1)
-                    ON CONFLICT DO NOTHING
-                """, roblox_username)
-        else:
-            try:
-                file = os.path.join("data", "received_credits.json")
-                try:
-                    with open(file, "r") as f:
-                        data = json.load(f)
-                except Exception:
-                    data = []
-                if roblox_username not in data:
-                    data.append(roblox_username)
-                    with open(file, "w") as f:
-                        json.dump(data, f, indent=2)
-            except Exception as e:
-                print(f"[CREDITS_FILE] Failed to mark {roblox_username}: {e}")
+                return await self.find_verification(roblox_username, conn)
+        discord_id = self.usernames.find_roblox(roblox_username)
+        if discord_id is not None:
+            record = await conn.fetchrow("SELECT * FROM verifications WHERE discord_id=$1", discord_id)
+            if record and (record["roblox_username"] or "").lower() == roblox_username.lower():
+                return record
+        return await conn.fetchrow("SELECT * FROM verifications WHERE LOWER(roblox_username)=$1", roblox_username.lower())
 
     async def revoke_verification(self, guild, target, verified_role_name):
         affected_discord_user = None
@@ -178,7 +235,7 @@ class VerificationManager:
             if discord_id:
                 record = await conn.fetchrow("SELECT * FROM verifications WHERE discord_id=$1", discord_id)
             else:
-                record = await conn.fetchrow("SELECT * FROM verifications WHERE LOWER(roblox_username)=$1", target.lower())
+                record = await self.find_verification(target, conn)
                 if record:
                     discord_id = record['discord_id']
 
@@ -197,6 +254,8 @@ class VerificationManager:
 
             # Remove DB entry
             await conn.execute("DELETE FROM verifications WHERE discord_id=$1", discord_id)
+            self.verified_cache.pop(discord_id)
+            self.usernames.remove(discord_id)
             # Remove role
             await self.remove_verified_role(guild, discord_id, verified_role_name)
             return True, affected_discord_user, affected_roblox_username
@@ -208,9 +267,9 @@ class VerificationManager:
                 member = await guild.fetch_member(discord_id)
             except Exception:
                 return
-        role = discord.utils.get(guild.roles, name=verified_role_name)
+        role = self.guild_index.get_role(guild, verified_role_name)
         if role and role in member.roles:
             try:
                 await member.remove_roles(role, reason="Verification revoked")
             except Exception as e:
-                print(f"[REMOVE_ROLE] Failed: {e}")
+                logger.warning("Failed to remove verified role: %s", e, extra={"user_id": discord_id})